@@ -31,6 +31,21 @@ const center = {
   lng: -74.0060
 }
 
+// Map zoom for the precision reported with server-side coordinates: gazetteer place types
+// and Google location types
+const PRECISION_ZOOM = {
+  landmark: 16,
+  locality: 15,
+  police_station: 14,
+  town: 13,
+  district: 10,
+  state: 7,
+  rooftop: 17,
+  range_interpolated: 16,
+  geometric_center: 15,
+  approximate: 13
+}
+
 export default function Home() {
   const [map, setMap] = useState(null)
   const [searchValue, setSearchValue] = useState('')
@@ -391,37 +406,47 @@ export default function Home() {
         console.log('Extracted fields:', data.extractedFields)
         console.log('Raw LLM data:', data.rawData)
         
-        // Use Google Geocoding to get coordinates and zoom to location
-        const geocoder = new window.google.maps.Geocoder()
-        geocoder.geocode({ address: data.location }, (results, status) => {
-          if (status === 'OK' && results[0]) {
-            const location = {
-              lat: results[0].geometry.location.lat(),
-              lng: results[0].geometry.location.lng()
+        const showLocation = (location, zoom = 15) => {
+          if (map) {
+            map.panTo(location)
+            map.setZoom(zoom)
+            
+            // Remove previous marker
+            if (currentMarker) {
+              currentMarker.setMap(null)
             }
             
-            if (map) {
-              map.panTo(location)
-              map.setZoom(15)
-              
-              // Remove previous marker
-              if (currentMarker) {
-                currentMarker.setMap(null)
-              }
-              
-              // Add new marker
-              const marker = new window.google.maps.Marker({
-                position: location,
-                map: map,
-                title: data.location
+            // Add new marker
+            const marker = new window.google.maps.Marker({
+              position: location,
+              map: map,
+              title: data.location
+            })
+            
+            setCurrentMarker(marker)
+          }
+        }
+
+        if (data.coordinates) {
+          // Already geocoded (and cached) by the server; zoom to how precise the answer is
+          showLocation(
+            { lat: data.coordinates.lat, lng: data.coordinates.lng },
+            PRECISION_ZOOM[data.coordinates.precision] || 13
+          )
+        } else {
+          // Use Google Geocoding to get coordinates and zoom to location
+          const geocoder = new window.google.maps.Geocoder()
+          geocoder.geocode({ address: data.location }, (results, status) => {
+            if (status === 'OK' && results[0]) {
+              showLocation({
+                lat: results[0].geometry.location.lat(),
+                lng: results[0].geometry.location.lng()
               })
-              
-              setCurrentMarker(marker)
+            } else {
+              setExtractionStatus('Location found but could not geocode: ' + data.location)
             }
-          } else {
-            setExtractionStatus('Location found but could not geocode: ' + data.location)
-          }
-        })
+          })
+        }
       } else {
         setExtractionStatus(data.message || 'No location found in the transcript.')
       }
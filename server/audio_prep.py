@@ -0,0 +1,320 @@
+import io
+import os
+import wave
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+# ——— CONFIG —————————————————————————————————————————————
+FRAME_MS = 30                                                   # VAD analysis frame
+MIN_SPEECH_DB = float(os.getenv("VAD_MIN_SPEECH_DB", "-50"))    # quieter frames are always silence (dBFS)
+NOISE_MARGIN_DB = float(os.getenv("VAD_NOISE_MARGIN_DB", "12")) # speech must exceed the noise floor by this much
+PAD_MS = int(os.getenv("VAD_PAD_MS", "150"))                    # audio kept around every voiced region
+MAX_PAUSE_MS = int(os.getenv("VAD_MAX_PAUSE_MS", "600"))        # longer internal silences are shortened to this
+BLOCK_FRAMES = 65536                                            # samples decoded/filtered per step
+# —————————————————————————————————————————————————————————
+
+
+@dataclass
+class PreparedAudio:
+    """Audio ready for upload, plus what preparation changed."""
+    wav_bytes: bytes
+    sample_rate: int
+    duration: float
+    original_duration: float
+    original_bytes: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.wav_bytes)
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "duration": round(self.duration, 3),
+            "original_duration": round(self.original_duration, 3),
+            "original_bytes": self.original_bytes,
+            "prepared_bytes": len(self.wav_bytes),
+            "bytes_saved": self.bytes_saved
+        }
+
+
+def _open_wav(source: Union[str, bytes]) -> wave.Wave_read:
+    return wave.open(source if isinstance(source, str) else io.BytesIO(source), "rb")
+
+
+def _decode_frames(frames: bytes, width: int, channels: int) -> np.ndarray:
+    """PCM frames to mono int16 samples."""
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.int32) - 128) << 8
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.int32)
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = ((raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)) << 8) >> 16
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.int64) >> 16
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+def iter_wav(source: Union[str, bytes], block_frames: int = BLOCK_FRAMES) -> Tuple[int, Iterator[np.ndarray]]:
+    """
+    Sample rate and mono int16 blocks of a PCM WAV file path or bytes, decoded
+    `block_frames` at a time so a long recording is never widened all at once.
+    """
+    with _open_wav(source) as wav:
+        rate = wav.getframerate()
+        if wav.getsampwidth() not in (1, 2, 3, 4):
+            raise ValueError(f"Unsupported WAV sample width: {wav.getsampwidth()}")
+
+    def blocks():
+        with _open_wav(source) as wav:
+            channels, width = wav.getnchannels(), wav.getsampwidth()
+            while True:
+                frames = wav.readframes(block_frames)
+                if not frames:
+                    break
+                yield _decode_frames(frames, width, channels)
+
+    return rate, blocks()
+
+
+def read_wav(source: Union[str, bytes]) -> Tuple[np.ndarray, int]:
+    """Decode a PCM WAV file path or bytes to mono int16 samples and their sample rate."""
+    rate, blocks = iter_wav(source)
+    blocks = list(blocks)
+    return (np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int16)), rate
+
+
+def write_wav(samples: Union[np.ndarray, Sequence[np.ndarray]], sample_rate: int) -> bytes:
+    """Encode mono int16 samples, or pieces of them written back to back, as WAV bytes."""
+    pieces = [samples] if isinstance(samples, np.ndarray) else samples
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        for piece in pieces:
+            wav.writeframes(np.ascontiguousarray(piece, dtype="<i2"))
+    return buffer.getvalue()
+
+
+def resample_blocks(blocks: Iterable[np.ndarray], source_rate: int, target_rate: int) -> np.ndarray:
+    """
+    Resample a stream of mono int16 blocks; downsampling is low-pass filtered first to avoid
+    aliasing. Only one block is held in floating point at a time, and the result is the
+    same as filtering and interpolating the whole recording at once.
+    """
+    if source_rate == target_rate:
+        blocks = list(blocks)
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int16)
+
+    kernel = None
+    if target_rate < source_rate:
+        # Windowed-sinc low-pass at the target Nyquist frequency
+        cutoff = 0.5 * target_rate / source_rate
+        taps = np.arange(-32, 33)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+        kernel /= kernel.sum()
+    half = 32 if kernel is not None else 0
+    step = source_rate / target_rate
+
+    outputs = []
+    total = 0
+    state = {"offset": 0, "last": None, "next": 0}
+
+    def emit(signal: np.ndarray):
+        # signal holds filtered samples offset..offset+len-1; interpolate every output position up to its end
+        offset, last = state["offset"], state["last"]
+        xp = np.arange(offset - (last is not None), offset + len(signal), dtype=np.float64)
+        fp = signal if last is None else np.concatenate(([last], signal))
+        end = offset + len(signal) - 1
+        positions = np.arange(state["next"], int(end / step) + 2) * step
+        positions = positions[positions <= end]
+        outputs.append(np.clip(np.round(np.interp(positions, xp, fp)), -32768, 32767).astype(np.int16))
+        state.update(offset=end + 1, last=signal[-1], next=state["next"] + len(positions))
+
+    pending = np.zeros(half)
+    for block in blocks:
+        total += len(block)
+        if kernel is None:
+            if len(block):
+                emit(block.astype(np.float64))
+            continue
+        pending = np.concatenate((pending, block.astype(np.float64)))
+        if len(pending) > 2 * half:
+            emit(np.convolve(pending, kernel, mode="valid"))
+            pending = pending[-2 * half:]
+    if total == 0:
+        return np.zeros(0, dtype=np.int16)
+    if kernel is not None:
+        emit(np.convolve(np.concatenate((pending, np.zeros(half))), kernel, mode="valid"))
+
+    target_length = int(round(total * target_rate / source_rate))
+    if state["next"] < target_length:
+        # Positions past the last sample hold its value
+        outputs.append(np.full(target_length - state["next"], np.clip(np.round(state["last"]), -32768, 32767),
+                               dtype=np.int16))
+    return np.concatenate(outputs)[:target_length]
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Resample mono int16 audio; downsampling is low-pass filtered first to avoid aliasing."""
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    return resample_blocks((samples[i:i + BLOCK_FRAMES] for i in range(0, len(samples), BLOCK_FRAMES)),
+                           source_rate, target_rate)
+
+
+def read_resampled(source: Union[str, bytes], target_rate: int) -> Tuple[np.ndarray, int]:
+    """Mono int16 samples of a WAV file path or bytes at `target_rate`, and the source rate."""
+    source_rate, blocks = iter_wav(source)
+    return resample_blocks(blocks, source_rate, target_rate), source_rate
+
+
+def frame_levels_db(samples: np.ndarray, sample_rate: int, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """RMS level of each analysis frame in dBFS."""
+    frame_length = max(1, sample_rate * frame_ms // 1000)
+    frame_count = int(np.ceil(len(samples) / frame_length))
+    rms = np.empty(frame_count)
+    # A block of frames at a time, so only one block is ever in floating point
+    frames_per_block = max(1, BLOCK_FRAMES // frame_length)
+    for first in range(0, frame_count, frames_per_block):
+        count = min(frames_per_block, frame_count - first)
+        padded = np.zeros(count * frame_length, dtype=np.float64)
+        block = samples[first * frame_length:(first + count) * frame_length]
+        padded[:len(block)] = block
+        rms[first:first + count] = np.sqrt(np.mean((padded.reshape(count, frame_length) / 32768.0) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_mask(levels_db: np.ndarray, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """
+    Energy-based VAD: a frame is speech if it is louder than an adaptive threshold
+    (noise floor + margin, capped below the loudest frame). Voiced frames are padded.
+    """
+    if len(levels_db) == 0:
+        return np.zeros(0, dtype=bool)
+
+    noise_floor = np.percentile(levels_db, 10)
+    threshold = max(MIN_SPEECH_DB, min(noise_floor + NOISE_MARGIN_DB, levels_db.max() - 25))
+    mask = levels_db >= threshold
+
+    pad_frames = PAD_MS // frame_ms
+    if pad_frames and mask.any():
+        mask = np.convolve(mask.astype(np.int32), np.ones(2 * pad_frames + 1, dtype=np.int32), mode="same") > 0
+    return mask
+
+
+def voiced_regions(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """[start, end) frame ranges where the mask is set."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def voiced_pieces(samples: np.ndarray, sample_rate: int, max_pause_ms: int = MAX_PAUSE_MS) -> List[np.ndarray]:
+    """
+    Views of `samples` that make up the audio without leading/trailing silence and with
+    internal pauses shortened to at most `max_pause_ms`.
+    """
+    frame_length = max(1, sample_rate * FRAME_MS // 1000)
+    regions = voiced_regions(speech_mask(frame_levels_db(samples, sample_rate)))
+    if not regions:
+        # Nothing detected as speech; leave the audio alone rather than upload nothing
+        return [samples]
+
+    max_pause = sample_rate * max_pause_ms // 1000
+    pieces = []
+    previous_end = None
+    for start_frame, end_frame in regions:
+        start, end = start_frame * frame_length, min(len(samples), end_frame * frame_length)
+        if previous_end is not None:
+            gap = start - previous_end
+            if gap > max_pause:
+                # Keep the edges of the pause so word boundaries still sound natural
+                pieces.append(samples[previous_end:previous_end + max_pause // 2])
+                pieces.append(samples[start - (max_pause - max_pause // 2):start])
+            else:
+                pieces.append(samples[previous_end:start])
+        pieces.append(samples[start:end])
+        previous_end = end
+    return pieces
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int, max_pause_ms: int = MAX_PAUSE_MS) -> np.ndarray:
+    """Drop leading/trailing silence and shorten internal pauses to at most `max_pause_ms`."""
+    pieces = voiced_pieces(samples, sample_rate, max_pause_ms)
+    return pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+
+
+def prepare_wav(source: Union[str, bytes], target_rate: int, trim: bool = True) -> PreparedAudio:
+    """
+    Resample a WAV file path or bytes to `target_rate` mono 16-bit and (optionally) cut
+    silence. The recording is decoded and resampled block by block and the kept pieces are
+    written straight into the output, so memory stays near the size of the prepared audio.
+    """
+    source_rate, blocks = iter_wav(source)
+    decoded = 0
+
+    def counted():
+        nonlocal decoded
+        for block in blocks:
+            decoded += len(block)
+            yield block
+
+    samples = resample_blocks(counted(), source_rate, target_rate)
+    original_duration = decoded / float(source_rate) if source_rate else 0.0
+    pieces = voiced_pieces(samples, target_rate) if trim else [samples]
+
+    return PreparedAudio(
+        wav_bytes=write_wav(pieces, target_rate),
+        sample_rate=target_rate,
+        duration=sum(len(piece) for piece in pieces) / float(target_rate),
+        original_duration=original_duration,
+        original_bytes=os.path.getsize(source) if isinstance(source, str) else len(source)
+    )
+
+
+def split_at_pauses(samples: np.ndarray, sample_rate: int, max_chunk_seconds: float) -> List[Tuple[int, int]]:
+    """
+    Split audio into [start, end) sample ranges no longer than `max_chunk_seconds`, cutting
+    in the middle of pauses between voiced regions. A single voiced stretch longer than the
+    limit is cut at its quietest frame inside the allowed window.
+    """
+    total = len(samples)
+    max_chunk = int(max_chunk_seconds * sample_rate)
+    if total <= max_chunk:
+        return [(0, total)]
+
+    frame_length = max(1, sample_rate * FRAME_MS // 1000)
+    levels = frame_levels_db(samples, sample_rate)
+    regions = voiced_regions(speech_mask(levels))
+
+    # Candidate cut points: the middle of every pause between voiced regions
+    pause_cuts = [((end + next_start) // 2) * frame_length
+                  for (_, end), (next_start, _) in zip(regions, regions[1:])]
+
+    chunks = []
+    start = 0
+    while total - start > max_chunk:
+        limit = start + max_chunk
+        # Latest pause that keeps this chunk within the limit (and makes progress)
+        cuts = [cut for cut in pause_cuts if start < cut <= limit]
+        if cuts:
+            cut = cuts[-1]
+        else:
+            # No pause available: cut at the quietest frame in the second half of the window
+            first = (start + max_chunk // 2) // frame_length
+            last = max(first + 1, limit // frame_length)
+            cut = (first + int(np.argmin(levels[first:last]))) * frame_length
+            cut = min(max(cut, start + frame_length), limit)
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, total))
+    return chunks
@@ -0,0 +1,62 @@
+"""
+Check keyword prompt narrowing against labelled transcripts before turning it on.
+
+    python benchmarks/bench_keyword_narrowing.py --examples labelled.jsonl
+    python benchmarks/bench_keyword_narrowing.py --examples labelled.jsonl --min-recall 0.98
+
+For every labelled example (the few-shot store format: transcript plus GroundTruthOutput
+fields, and the built-in few-shot examples) it reports how often the keyword classifier
+narrows the prompt, how often the labelled sub-type is still listed when it does, and the
+prompt tokens saved. Exits with status 1 when recall is below --min-recall, which is the
+same check TextProcessor runs before enabling KEYWORD_PROMPT_NARROWING.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+from few_shot import estimate_tokens, load_examples_jsonl
+from text_processor import (KEYWORD_CLASSIFIER, FEW_SHOT_EXAMPLES, EXTRACTION_RULES_PREFIX,
+                            _narrowed_extraction_rules)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--examples", help="labelled examples JSONL (few-shot store format)")
+    parser.add_argument("--min-recall", type=float, default=0.98, help="fail below this recall")
+    parser.add_argument("--show-misses", type=int, default=10, help="print up to this many misses")
+    args = parser.parse_args(argv)
+    logger.remove()
+
+    examples = list(FEW_SHOT_EXAMPLES)
+    if args.examples:
+        examples += load_examples_jsonl(args.examples)
+    report = KEYWORD_CLASSIFIER.narrowing_recall(examples)
+
+    full_tokens = estimate_tokens(EXTRACTION_RULES_PREFIX)
+    saved = 0
+    for prediction in KEYWORD_CLASSIFIER.classify_batch([e["event_info_text"] for e in examples]):
+        sub_types = KEYWORD_CLASSIFIER.candidate_sub_types(prediction)
+        if sub_types is not None:
+            saved += full_tokens - estimate_tokens(_narrowed_extraction_rules("full", tuple(sub_types)))
+
+    print(f"examples:          {report['examples']}")
+    print(f"narrowed:          {report['narrowed']} ({report['narrowed'] / max(1, report['examples']):.1%})")
+    print(f"recall:            {report['recall']:.1%} of narrowed examples kept their sub-type")
+    print(f"sub-types listed:  {report['sub_types_listed']:.1f} on average (of {len(KEYWORD_CLASSIFIER.sub_types)})")
+    print(f"prompt tokens:     {saved / max(1, report['examples']):.0f} saved per request on average "
+          f"(rules prefix ~{full_tokens})")
+    for miss in report["misses"][:args.show_misses]:
+        print("  miss:", json.dumps(miss, ensure_ascii=False))
+
+    if report["recall"] < args.min_recall:
+        print(f"FAIL: recall {report['recall']:.1%} is below {args.min_recall:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Golden-output check and microbenchmark for TextProcessor._parse_llm_field_value_output.
+
+    python benchmarks/bench_parser.py                  # verify against the golden corpus, then time it
+    python benchmarks/bench_parser.py --update-golden  # rebuild the corpus from the current parser
+
+The corpus is generated deterministically from the few-shot examples plus the kinds of
+noise the LLM actually produces (misspelled field names, odd casing, yes/no prose,
+"OTHERS: <label>" sub-types, chatter lines). Any parser change must keep it identical.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+from schema import ProcessedOutput, ALL_EVENT_SUB_TYPES
+from text_processor import TextProcessor, FEW_SHOT_EXAMPLES
+
+GOLDEN_PATH = Path(__file__).parent / "data" / "parser_golden.jsonl"
+
+FIELD_NAME_VARIANTS = {
+    "event_sub_type": ["event_sub_type", "Event Sub Type", "eventsubtype", "event_subtype", "event_sub_typ", "**event_sub_type**"],
+    "victim_gender": ["victim_gender", "Victim_Gender", "victim gender", "victim_gendr"],
+    "incident_location": ["incident_location", "incidentlocation", "Incident_Location", "incident_locaton"],
+    "need_ambulance": ["need_ambulance", "needambulance", "need_ambulanse"],
+    "generated_event_sub_type_detail": ["generated_event_sub_type_detail", "generated_event_subtype_detail"],
+}
+
+YES_NO_VALUES = ["yes", "no", "Yes, the caller asked", "no ambulance needed", "yes and no", "maybe", "N/A", "",
+                 "not applicable", "Not Specified", "null", "none", "unknown"]
+LITERAL_VALUES = {
+    "state_of_victim": ["Distressed", "distressed", "INJURED", "injurd", "Critcal", "calm", "not specified", "None"],
+    "victim_gender": ["male", "Female", "femal", "MALE", "unknown", "not specified", "n/a"],
+}
+SUB_TYPE_VALUES = ALL_EVENT_SUB_TYPES[::7] + [
+    "bike theft", "VEHICLE THEFTS", "OTHERS: VEHICLE FRAUD", "OTHERS: vehicle theft", "OTHERS:", "OTHERS",
+    "domestic  violence", "HEART ATTAK", "CHEMICAL SPILL", "not specified", "",
+]
+NOISE_LINES = ["Here is the extracted information:", "```", "```text", "Note: the caller was distressed.",
+               "unknown_field: something", "contact_number: 9876543210", "timestamp: not specified"]
+
+
+def example_output(example: dict) -> list:
+    """Render a few-shot example the way the LLM is asked to answer."""
+    lines = []
+    for k in ProcessedOutput.model_fields.keys():
+        v = example.get(k)
+        lines.append(f"{k}: {v if v is not None else 'not specified'}")
+    return lines
+
+
+def build_corpus(seed: int = 112) -> list:
+    rng = random.Random(seed)
+    outputs = ["\n".join(example_output(ex)) for ex in FEW_SHOT_EXAMPLES]
+    outputs.append("")
+    outputs.append("I could not understand the transcript.")
+
+    base_lines = [example_output(ex) for ex in FEW_SHOT_EXAMPLES]
+    for _ in range(150):
+        lines = list(rng.choice(base_lines))
+        if rng.random() < 0.2:
+            rng.shuffle(lines)
+        mutated = []
+        for line in lines:
+            field, value = line.split(": ", 1)
+            if field in FIELD_NAME_VARIANTS and rng.random() < 0.5:
+                field = rng.choice(FIELD_NAME_VARIANTS[field])
+            if field == "event_sub_type" and rng.random() < 0.6:
+                value = rng.choice(SUB_TYPE_VALUES)
+            elif field in ("need_ambulance", "children_involved", "repeat_incident") and rng.random() < 0.6:
+                value = rng.choice(YES_NO_VALUES)
+            elif field in LITERAL_VALUES and rng.random() < 0.6:
+                value = rng.choice(LITERAL_VALUES[field])
+            elif field == "generated_event_sub_type_detail" and rng.random() < 0.4:
+                value = rng.choice(["VEHICLE FRAUD", "vehicle theft", "CHEMICAL SPILL", "none", "murdr"])
+            if rng.random() < 0.05:
+                continue  # dropped line
+            mutated.append(f"{field}: {value}" if rng.random() > 0.05 else f"  {field} :{value}  ")
+        for _ in range(rng.randint(0, 2)):
+            mutated.insert(rng.randint(0, len(mutated)), rng.choice(NOISE_LINES))
+        outputs.append("\n".join(mutated))
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update-golden", action="store_true", help="rebuild the golden corpus from the current parser")
+    parser.add_argument("--iterations", type=int, default=5, help="passes over the corpus when timing")
+    args = parser.parse_args()
+
+    logger.remove()
+    processor = TextProcessor()
+
+    if args.update_golden:
+        GOLDEN_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            for llm_output in build_corpus():
+                expected = processor._parse_llm_field_value_output(llm_output)
+                f.write(json.dumps({"llm_output": llm_output, "expected": expected}, ensure_ascii=False) + "\n")
+        print(f"Wrote golden corpus to {GOLDEN_PATH}")
+        return
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    mismatches = 0
+    for i, case in enumerate(corpus):
+        actual = processor._parse_llm_field_value_output(case["llm_output"])
+        if actual != case["expected"]:
+            mismatches += 1
+            diff = {k: (case["expected"].get(k), actual.get(k)) for k in set(actual) | set(case["expected"])
+                    if case["expected"].get(k) != actual.get(k)}
+            print(f"case {i}: expected != actual: {diff}")
+    if mismatches:
+        print(f"FAILED: {mismatches}/{len(corpus)} golden cases differ")
+        sys.exit(1)
+    print(f"OK: {len(corpus)} golden cases match")
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for case in corpus:
+            processor._parse_llm_field_value_output(case["llm_output"])
+    elapsed = time.perf_counter() - start
+    calls = args.iterations * len(corpus)
+    print(f"{calls} parses in {elapsed:.3f}s: {elapsed / calls * 1e6:.1f} us/parse, {calls / elapsed:.0f} parses/sec")
+
+
+if __name__ == "__main__":
+    main()
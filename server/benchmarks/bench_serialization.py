@@ -0,0 +1,83 @@
+"""
+Benchmark the per-object ProcessedOutput path against the bulk validation/serialization path.
+
+    python benchmarks/bench_serialization.py [--records 5000]
+
+per-object : ProcessedOutput(**d) -> model_dump() -> json.dumps(default=str)   (llm_processor.py today)
+bulk       : validate_processed_outputs(records) -> dump_processed_outputs_json()
+trusted    : dump_trusted_records_json(records)   (already-normalized dicts, no models built)
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+from schema import (ProcessedOutput, derive_event_type, validate_processed_outputs,
+                    dump_processed_outputs_json, dump_trusted_records_json)
+from text_processor import TextProcessor
+
+GOLDEN_PATH = Path(__file__).parent / "data" / "parser_golden.jsonl"
+
+
+def build_records(count: int) -> list:
+    """Realistic extracted dicts: parsed golden-corpus outputs plus processing metadata."""
+    processor = TextProcessor()
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        outputs = [json.loads(line)["llm_output"] for line in f if line.strip()]
+
+    records = []
+    for i in range(count):
+        record = processor._parse_llm_field_value_output(outputs[i % len(outputs)])
+        record["event_type"] = derive_event_type(record["event_sub_type"])
+        record.update({
+            "file_name": f"call_{i}.txt",
+            "file_text": "transcript text " * 40,
+            "processing_time": 1.5,
+            "timestamp": datetime.datetime(2024, 3, 20, 10, 30)
+        })
+        records.append(record)
+    return records
+
+
+def timed(label: str, count: int, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<11} {elapsed * 1000:9.1f} ms  {count / elapsed:10.0f} records/sec  {len(result):>10} bytes")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=5000)
+    args = parser.parse_args()
+
+    logger.remove()
+    records = build_records(args.records)
+
+    def per_object():
+        return "\n".join(
+            json.dumps(ProcessedOutput(**record).model_dump(), default=str, ensure_ascii=False) for record in records
+        ).encode("utf-8")
+
+    def bulk():
+        return dump_processed_outputs_json(validate_processed_outputs(records))
+
+    def trusted():
+        return dump_trusted_records_json(records)
+
+    timed("per-object", args.records, per_object)
+    bulk_bytes = timed("bulk", args.records, bulk)
+    trusted_bytes = timed("trusted", args.records, trusted)
+
+    # Both fast paths must produce the same document
+    assert json.loads(bulk_bytes) == json.loads(trusted_bytes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compare the sparse output mode (only fields with real values) with the full-output prompt.
+
+    python benchmarks/bench_sparse_output.py                          # offline checks only
+    python benchmarks/bench_sparse_output.py --live                   # also run the configured LLM
+    python benchmarks/bench_sparse_output.py --live --examples labelled.jsonl
+
+Offline:
+  * decode tokens of the ideal answer for each labelled example, full vs sparse rendering
+  * parser equivalence: every golden-corpus output with its "not specified" lines removed
+    must parse to the same result, since sparse mode relies on the parser's back-filling
+Live (--live, uses LLM_PROVIDER and friends from the environment):
+  * provider-reported decode tokens and LLM time per mode
+  * per-field accuracy of each mode against the labels
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# Always measure real LLM calls, never cached extractions
+os.environ["EXTRACTION_CACHE"] = "false"
+
+from loguru import logger
+from few_shot import estimate_tokens, load_examples_jsonl
+from schema import ProcessedOutput
+from text_processor import (TextProcessor, FEW_SHOT_EXAMPLES, PROCESSING_METADATA_FIELDS,
+                            format_few_shot_example)
+
+GOLDEN_PATH = Path(__file__).parent / "data" / "parser_golden.jsonl"
+SCORED_FIELDS = [f for f in ProcessedOutput.model_fields if f not in PROCESSING_METADATA_FIELDS]
+
+
+def answer_part(rendered_example: str) -> str:
+    """The Output section of a rendered few-shot example, i.e. what the model would generate."""
+    return rendered_example.split("\nOutput:\n", 1)[1]
+
+
+def sparsify(llm_output: str) -> str:
+    """Drop the lines a sparse-mode answer would omit (event_sub_type is always kept)."""
+    kept = []
+    for line in llm_output.split("\n"):
+        field, _, value = line.partition(":")
+        if value.strip().lower() == "not specified" and field.strip().lower() != "event_sub_type":
+            continue
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def normalize_value(value) -> str:
+    value = "" if value is None else str(value).strip().lower()
+    return "not specified" if value in ("", "none", "null", "not_specified") else value
+
+
+def offline_report(examples, processor):
+    full_tokens = sum(estimate_tokens(answer_part(format_few_shot_example(ex))) for ex in examples)
+    sparse_tokens = sum(estimate_tokens(answer_part(format_few_shot_example(ex, sparse=True))) for ex in examples)
+    print(f"Ideal answers for {len(examples)} labelled examples (~4 chars/token):")
+    print(f"  full   {full_tokens / len(examples):8.1f} decode tokens/answer")
+    print(f"  sparse {sparse_tokens / len(examples):8.1f} decode tokens/answer "
+          f"({(1 - sparse_tokens / full_tokens) * 100:.1f}% fewer)")
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    differing = 0
+    for case in corpus:
+        if processor._parse_llm_field_value_output(sparsify(case["llm_output"])) != case["expected"]:
+            differing += 1
+    print(f"Parser back-fill: {len(corpus) - differing}/{len(corpus)} golden outputs parse identically "
+          f"with their 'not specified' lines removed")
+
+
+def live_report(examples):
+    modes = {}
+    for mode in ("full", "sparse"):
+        os.environ["EXTRACTION_OUTPUT_MODE"] = mode
+        modes[mode] = TextProcessor()
+
+    totals = {mode: {"eval_tokens": 0, "llm_seconds": 0.0, "calls": 0,
+                     "correct": {field: 0 for field in SCORED_FIELDS}} for mode in modes}
+    for ex in examples:
+        for mode, processor in modes.items():
+            output = processor.process_text(ex["event_info_text"], use_cache=False)
+            metrics = output.processing_metrics or {}
+            totals[mode]["eval_tokens"] += metrics.get("llm", {}).get("eval_tokens", 0)
+            totals[mode]["llm_seconds"] += metrics.get("stages", {}).get("llm", 0.0)
+            totals[mode]["calls"] += 1
+            for field in SCORED_FIELDS:
+                if normalize_value(getattr(output, field)) == normalize_value(ex.get(field)):
+                    totals[mode]["correct"][field] += 1
+
+    print(f"\nLive run over {len(examples)} examples with {modes['full'].llm_provider}/{modes['full'].model_name}:")
+    for mode, total in totals.items():
+        calls = max(1, total["calls"])
+        accuracy = sum(total["correct"].values()) / (calls * len(SCORED_FIELDS)) * 100
+        print(f"  {mode:<6} {total['eval_tokens'] / calls:8.1f} decode tokens  "
+              f"{total['llm_seconds'] / calls:7.2f} s LLM  {accuracy:5.1f}% fields correct")
+
+    print("\nPer-field accuracy (full / sparse):")
+    for field in SCORED_FIELDS:
+        full = totals["full"]["correct"][field] / max(1, totals["full"]["calls"]) * 100
+        sparse = totals["sparse"]["correct"][field] / max(1, totals["sparse"]["calls"]) * 100
+        print(f"  {field:<34} {full:5.1f}% / {sparse:5.1f}%{'   <-' if sparse < full else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--examples", help="labelled examples JSONL (transcript + GroundTruthOutput fields); "
+                                           "defaults to the built-in few-shot examples")
+    parser.add_argument("--live", action="store_true", help="call the configured LLM in both modes")
+    args = parser.parse_args()
+
+    logger.remove()
+    examples = load_examples_jsonl(args.examples) if args.examples else list(FEW_SHOT_EXAMPLES)
+    offline_report(examples, TextProcessor())
+    if args.live:
+        live_report(examples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Offline end-to-end benchmark suite: every service call goes to a local stand-in
+(benchmarks/stub_servers.py), so the numbers measure our own overhead on top of a
+fixed, configurable service time.
+
+    python benchmarks/bench_suite.py                    # run and compare with the saved baseline
+    python benchmarks/bench_suite.py --save-baseline    # run and overwrite the baseline
+    python benchmarks/bench_suite.py --only parse prompt --iterations 200
+
+Cases: prompt construction, _parse_llm_field_value_output, process_text (Ollama and
+Gemini stubs), process_batch, and transcribe_audio_file for a short and a chunked
+recording (Bhashini stub). Each reports p50/p95/p99 latency and ops/sec. The baseline
+lives in benchmarks/data/bench_baseline.json so regressions show up in diffs; compare
+runs made with the same latency settings on the same machine.
+
+The prepare_memory case checks that preparing a long recording for upload stays within
+--max-memory-ratio of its file size (peak traced allocations), and exits with status 1
+when it does not.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# Measure the uncached paths: must be set before the modules read their configuration
+os.environ["EXTRACTION_CACHE"] = "false"
+os.environ["TRANSCRIPT_CACHE"] = "false"
+
+from loguru import logger
+import bhashini_api
+from bench_parser import example_output
+from stub_servers import OllamaStub, GeminiStub, BhashiniStub
+from text_processor import TextProcessor, FEW_SHOT_EXAMPLES
+
+BASELINE_PATH = Path(__file__).parent / "data" / "bench_baseline.json"
+GOLDEN_PATH = Path(__file__).parent / "data" / "parser_golden.jsonl"
+
+CASES = ["prompt", "parse", "process_text_ollama", "process_text_gemini", "process_batch",
+         "transcribe_short", "transcribe_long", "prepare_memory"]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low, high = math.floor(rank), math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def measure(func, iterations: int, warmup: int = 3) -> dict:
+    """Time `iterations` calls of `func` after `warmup` untimed calls."""
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    total_start = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    total = time.perf_counter() - total_start
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "ops_per_sec": round(iterations / total, 1) if total else 0.0
+    }
+
+
+def synthetic_call_wav(seconds: float, rate: int = 16000, seed: int = 7) -> bytes:
+    """Speech-like test audio: noisy tone bursts of varying length separated by pauses."""
+    rng = random.Random(seed)
+    samples = []
+    while len(samples) < seconds * rate:
+        burst = int(rng.uniform(0.4, 2.5) * rate)
+        frequency = rng.uniform(120, 400)
+        samples.extend(int(9000 * math.sin(2 * math.pi * frequency * i / rate) + rng.gauss(0, 600))
+                       for i in range(burst))
+        samples.extend(int(rng.gauss(0, 60)) for _ in range(int(rng.uniform(0.2, 1.2) * rate)))
+    samples = samples[:int(seconds * rate)]
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(struct.pack(f"<{len(samples)}h", *(max(-32768, min(32767, s)) for s in samples)))
+    return buffer.getvalue()
+
+
+def prepare_memory(seconds: float, rate: int = 16000) -> dict:
+    """Peak allocations of bhashini_api.prepare_upload on a long recording file, relative to its size."""
+    with wave.open(io.BytesIO(synthetic_call_wav(12, rate)), "rb") as clip:
+        frames = clip.readframes(clip.getnframes())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "long_call.wav")
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            for _ in range(math.ceil(seconds / 12)):
+                wav.writeframes(frames)
+        size = os.path.getsize(path)
+
+        tracemalloc.start()
+        try:
+            bhashini_api.prepare_upload(path, prepare=True)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"file_mb": round(size / 2 ** 20, 1), "peak_mb": round(peak / 2 ** 20, 1), "peak_ratio": round(peak / size, 3)}
+
+
+def make_processor(provider: str, stub_url: str) -> TextProcessor:
+    os.environ["LLM_PROVIDER"] = provider
+    if provider == "gemini":
+        os.environ["GEMINI_API_KEY"] = "stub"
+        os.environ["GEMINI_API_BASE"] = stub_url
+        return TextProcessor()
+    return TextProcessor(ollama_base_url=stub_url)
+
+
+def run_suite(args) -> dict:
+    transcripts = [ex["event_info_text"] for ex in FEW_SHOT_EXAMPLES]
+    llm_response = "\n".join(example_output(FEW_SHOT_EXAMPLES[0]))
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        llm_outputs = [json.loads(line)["llm_output"] for line in f if line.strip()]
+
+    stub_options = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms}
+    selected = args.only or CASES
+    results = {}
+
+    def run(name, func, iterations):
+        if name in selected:
+            results[name] = measure(func, iterations)
+            print(format_row(name, results[name]), flush=True)
+
+    with OllamaStub(llm_response, **stub_options) as ollama, \
+         GeminiStub(llm_response, **stub_options) as gemini, \
+         BhashiniStub(transcripts[0], **stub_options) as bhashini, \
+         tempfile.TemporaryDirectory() as tmp:
+
+        processor = make_processor("ollama", ollama.url)
+        cycle = iter(range(10 ** 9))
+
+        run("prompt", lambda: processor._create_extraction_prompt(transcripts[next(cycle) % len(transcripts)]),
+            args.iterations * 20)
+        run("parse", lambda: processor._parse_llm_field_value_output(llm_outputs[next(cycle) % len(llm_outputs)]),
+            args.iterations * 20)
+        run("process_text_ollama", lambda: processor.process_text(transcripts[next(cycle) % len(transcripts)]),
+            args.iterations)
+
+        gemini_processor = make_processor("gemini", gemini.url)
+        run("process_text_gemini", lambda: gemini_processor.process_text(transcripts[next(cycle) % len(transcripts)]),
+            args.iterations)
+
+        batch = [transcripts[i % len(transcripts)] for i in range(args.batch_size)]
+        run("process_batch", lambda: processor.process_batch(batch), max(1, args.iterations // args.batch_size))
+
+        bhashini_api.API_URL = bhashini.url + "/services/inference/pipeline"
+        short_path = os.path.join(tmp, "short.wav")
+        long_path = os.path.join(tmp, "long.wav")
+        with open(short_path, "wb") as f:
+            f.write(synthetic_call_wav(12))
+        with open(long_path, "wb") as f:
+            f.write(synthetic_call_wav(bhashini_api.CHUNK_SECONDS * 2.5))
+
+        def transcribe(path):
+            result = bhashini_api.transcribe_audio_file(path, use_cache=False)
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+
+        run("transcribe_short", lambda: transcribe(short_path), args.iterations)
+        run("transcribe_long", lambda: transcribe(long_path), max(1, args.iterations // 4))
+
+    return results
+
+
+def format_row(name: str, stats: dict, baseline: dict = None) -> str:
+    row = (f"{name:<22} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+           f"p99 {stats['p99_ms']:9.3f} ms  {stats['ops_per_sec']:10.1f} ops/s")
+    if baseline:
+        change = (stats["p50_ms"] - baseline["p50_ms"]) / baseline["p50_ms"] * 100 if baseline["p50_ms"] else 0.0
+        row += f"  p50 {change:+6.1f}% vs baseline"
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated service time per request")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="uniform jitter added to the service time")
+    parser.add_argument("--iterations", type=int, default=40, help="timed calls per service-backed case")
+    parser.add_argument("--batch-size", type=int, default=8, help="texts per process_batch call")
+    parser.add_argument("--only", nargs="+", choices=CASES, help="run only these cases")
+    parser.add_argument("--memory-seconds", type=float, default=600.0, help="recording length for prepare_memory")
+    parser.add_argument("--max-memory-ratio", type=float, default=1.5,
+                        help="fail when preparing uploads peaks above this multiple of the file size")
+    parser.add_argument("--save-baseline", action="store_true", help=f"overwrite {BASELINE_PATH.name}")
+    args = parser.parse_args()
+
+    logger.remove()
+    results = run_suite(args)
+    report = {
+        "config": {
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "iterations": args.iterations,
+            "batch_size": args.batch_size,
+            "python": platform.python_version()
+        },
+        "results": results
+    }
+
+    memory_ok = True
+    if not args.only or "prepare_memory" in args.only:
+        report["memory"] = prepare_memory(args.memory_seconds)
+        memory_ok = report["memory"]["peak_ratio"] <= args.max_memory_ratio
+        print(f"{'prepare_memory':<22} {report['memory']['file_mb']:.1f} MB file, peak {report['memory']['peak_mb']:.1f} MB "
+              f"({report['memory']['peak_ratio']:.2f}x, limit {args.max_memory_ratio:.2f}x)"
+              + ("" if memory_ok else "  FAIL"), flush=True)
+
+    if args.save_baseline:
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {BASELINE_PATH}")
+        return 0 if memory_ok else 1
+
+    if BASELINE_PATH.exists():
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["config"] != report["config"]:
+            print(f"Note: baseline was recorded with {baseline['config']}")
+        print("\nCompared with baseline:")
+        for name, stats in results.items():
+            print(format_row(name, stats, baseline["results"].get(name)))
+    return 0 if memory_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
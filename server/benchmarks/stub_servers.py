@@ -0,0 +1,165 @@
+"""
+Local stand-ins for the services the server depends on, for offline benchmarks.
+
+    OllamaStub    POST /api/generate                      (plain and NDJSON streaming)
+    GeminiStub    POST /models/<m>:generateContent,
+                  POST /models/<m>:streamGenerateContent  (SSE), POST /cachedContents
+    BhashiniStub  POST <any path>                         (ASR pipeline, one output per audio input)
+
+Each stub runs a threaded HTTP/1.1 server on 127.0.0.1 and waits `latency_ms` (plus up to
+`jitter_ms` of uniform jitter) before answering, so client overhead can be measured against
+a known service time.
+
+    with OllamaStub(response_text, latency_ms=20) as ollama:
+        processor = TextProcessor(ollama_base_url=ollama.url)
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms per request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.server.stub.wait()
+        status, content_type, payload = self.server.stub.respond(self.path, body)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubServer:
+    """Base class: owns the HTTP server thread and the simulated service time."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def wait(self):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency_ms + self._rng.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def respond(self, path: str, body: dict):
+        """Return (status, content type, response bytes) for a request."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _json(data) -> tuple:
+        return 200, "application/json", json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _pieces(text: str, size: int = 16):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class OllamaStub(StubServer):
+    """Answers /api/generate with `response_text`, streamed as NDJSON when asked to."""
+
+    def __init__(self, response_text: str, **kwargs):
+        super().__init__(**kwargs)
+        self.response_text = response_text
+
+    def respond(self, path, body):
+        if path != "/api/generate":
+            return 404, "application/json", b'{"error": "not found"}'
+
+        # Ollama reports durations in nanoseconds; split the simulated service time between phases
+        service_ns = int(self.latency_ms * 1e6)
+        stats = {"prompt_eval_count": len(body.get("prompt", "")) // 4,
+                 "eval_count": len(self.response_text) // 4,
+                 "load_duration": 0,
+                 "prompt_eval_duration": service_ns // 4,
+                 "eval_duration": service_ns - service_ns // 4,
+                 "total_duration": service_ns}
+        if not body.get("stream", True):
+            return self._json({"model": body.get("model"), "response": self.response_text, "done": True, **stats})
+
+        lines = [json.dumps({"model": body.get("model"), "response": piece, "done": False})
+                 for piece in _pieces(self.response_text)]
+        lines.append(json.dumps({"model": body.get("model"), "response": "", "done": True, **stats}))
+        return 200, "application/x-ndjson", ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class GeminiStub(StubServer):
+    """Answers generateContent / streamGenerateContent with `response_text`; accepts cachedContents."""
+
+    def __init__(self, response_text: str, **kwargs):
+        super().__init__(**kwargs)
+        self.response_text = response_text
+
+    @staticmethod
+    def _candidate(text: str) -> dict:
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+    def respond(self, path, body):
+        route = path.split("?", 1)[0]
+        if route == "/cachedContents":
+            return self._json({"name": "cachedContents/stub", "model": body.get("model")})
+        if route.endswith(":generateContent"):
+            prompt = "".join(part.get("text", "") for content in body.get("contents", [])
+                             for part in content.get("parts", []))
+            return self._json({**self._candidate(self.response_text),
+                               "usageMetadata": {"promptTokenCount": len(prompt) // 4,
+                                                 "candidatesTokenCount": len(self.response_text) // 4}})
+        if route.endswith(":streamGenerateContent"):
+            events = "".join(f"data: {json.dumps(self._candidate(piece))}\r\n\r\n"
+                             for piece in _pieces(self.response_text))
+            return 200, "text/event-stream", events.encode("utf-8")
+        return 404, "application/json", b'{"error": "not found"}'
+
+
+class BhashiniStub(StubServer):
+    """Answers the ASR pipeline with `transcript` for every audio input in the request."""
+
+    def __init__(self, transcript: str, **kwargs):
+        super().__init__(**kwargs)
+        self.transcript = transcript
+
+    def respond(self, path, body):
+        audio = body.get("inputData", {}).get("audio", [])
+        return self._json({
+            "pipelineResponse": [
+                {"taskType": "asr", "output": [{"source": self.transcript} for _ in audio]}
+            ]
+        })
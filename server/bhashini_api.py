@@ -1,14 +1,57 @@
 import os
+import io
+import sys
 import base64
+import hashlib
 import json
-import requests
 import tempfile
+import wave
+import time
+import threading
+import mmap
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+import http_client
+from cache import LRUCache, SQLiteCache, TieredCache
+
+# Audio preparation (resampling + silence trimming) needs numpy
+try:
+    import audio_prep
+    AUDIO_PREP_AVAILABLE = True
+except ImportError:
+    AUDIO_PREP_AVAILABLE = False
 
 # ——— CONFIG —————————————————————————————————————————————
-API_URL = "https://dhruva-api.bhashini.gov.in/services/inference/pipeline"
-AUTH_TOKEN = "DQZg_RBieUwtS0S0etaqWQx3g7oYHGNj-3GFYmw1frvFgHG0BDuUjCVQeLuzHj1T"
+# BHASHINI_API_URL can point at a local stand-in for testing and benchmarks
+API_URL = os.getenv("BHASHINI_API_URL", "https://dhruva-api.bhashini.gov.in/services/inference/pipeline")
+AUTH_TOKEN = os.getenv("BHASHINI_AUTH_TOKEN", "DQZg_RBieUwtS0S0etaqWQx3g7oYHGNj-3GFYmw1frvFgHG0BDuUjCVQeLuzHj1T")
+SERVICE_ID = "ai4bharat/whisper-medium-en--gpu--t4"
+SOURCE_LANGUAGE = "en"
+# Uploads are resampled to this rate and it is what the payload declares
+SAMPLING_RATE = int(os.getenv("BHASHINI_SAMPLING_RATE", "8000"))
+# Resample to SAMPLING_RATE and trim silence before upload
+PREPARE_AUDIO = os.getenv("BHASHINI_PREPARE_AUDIO", "true").lower() in ["1", "true", "yes"]
+# Recordings longer than this are split at pauses and the chunks transcribed concurrently
+CHUNK_SECONDS = float(os.getenv("BHASHINI_CHUNK_SECONDS", "30"))
+MAX_CONCURRENCY = int(os.getenv("BHASHINI_MAX_CONCURRENCY", "4"))
+# Batch mode packs several short recordings into one pipeline request, within these budgets
+PACK_MAX_COUNT = int(os.getenv("BHASHINI_PACK_MAX_COUNT", "8"))
+PACK_MAX_BYTES = int(os.getenv("BHASHINI_PACK_MAX_BYTES", str(4 * 1024 * 1024)))
+# Stream the request body, base64-encoding audio while it is sent instead of building it in memory
+STREAM_UPLOADS = os.getenv("BHASHINI_STREAM_UPLOADS", "true").lower() in ["1", "true", "yes"]
+STREAM_CHUNK_BYTES = 3 * 64 * 1024   # raw audio per encoded block; a multiple of 3 so blocks need no padding
+
+# Transcript cache keyed by a digest of the decoded PCM, service, language and preparation settings
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE", "true").lower() in ["1", "true", "yes"]
+TRANSCRIPT_CACHE_PATH = os.getenv("TRANSCRIPT_CACHE_PATH", str(Path(__file__).parent / ".cache" / "transcript_cache.sqlite3"))
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "100000"))
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
 # —————————————————————————————————————————————————————————
 
+_transcript_cache = None
+_transcript_cache_lock = threading.Lock()
+
 def wav_to_base64(path):
     """Read a WAV file and return its Base64‑encoded string."""
     with open(path, "rb") as f:
@@ -18,37 +61,133 @@ def bytes_to_base64(audio_bytes):
     """Convert audio bytes to Base64 string."""
     return base64.b64encode(audio_bytes).decode("utf-8")
 
-def build_payload(b64_audio):
-    """Return the JSON body for one audio input."""
+def build_payload(b64_audio, sampling_rate=SAMPLING_RATE):
+    """Return the JSON body for one audio input, or for a list of inputs sharing one config."""
+    b64_audios = b64_audio if isinstance(b64_audio, list) else [b64_audio]
     return {
         "pipelineTasks": [
             {
                 "taskType": "asr",
                 "config": {
-                    "language": {"sourceLanguage": "en"},
-                    "serviceId": "ai4bharat/whisper-medium-en--gpu--t4",
+                    "language": {"sourceLanguage": SOURCE_LANGUAGE},
+                    "serviceId": SERVICE_ID,
                     "audioFormat": "wav",
-                    "samplingRate": 8000
+                    "samplingRate": sampling_rate
                 }
             }
         ],
         "inputData": {
             "audio": [
-                {"audioContent": b64_audio}
+                {"audioContent": b64} for b64 in b64_audios
             ]
         }
     }
 
+def base64_length(size):
+    """Length of the base64 encoding of `size` bytes."""
+    return 4 * ((size + 2) // 3)
+
+def iter_base64(source, chunk_size=STREAM_CHUNK_BYTES):
+    """
+    Yield the base64 encoding of a file path or bytes-like object in blocks. Files are
+    memory-mapped, so only one block of raw and encoded audio is held at a time.
+    """
+    if isinstance(source, str):
+        if os.path.getsize(source) == 0:
+            return
+        with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start in range(0, len(mapped), chunk_size):
+                yield base64.b64encode(mapped[start:start + chunk_size])
+        return
+
+    view = memoryview(source)
+    for start in range(0, len(view), chunk_size):
+        yield base64.b64encode(view[start:start + chunk_size])
+
+class StreamingPayloadBody:
+    """
+    File-like pipeline request body: the JSON around each audio input is rendered once and
+    the audio itself is base64-encoded block by block as the HTTP client reads the body.
+    The total length is known up front, so the request is sent with a Content-Length.
+    """
+
+    _AUDIO_FIELD = '"audioContent": ""'
+
+    def __init__(self, audio_sources, sampling_rate=SAMPLING_RATE, chunk_size=STREAM_CHUNK_BYTES):
+        pieces = json.dumps(build_payload([""] * len(audio_sources), sampling_rate)).split(self._AUDIO_FIELD)
+        # (is_audio, part) pairs: rendered JSON text, or an audio source still to be encoded
+        self._parts = []
+        for i, source in enumerate(audio_sources):
+            self._parts.append((False, (pieces[i] + '"audioContent": "').encode("utf-8")))
+            self._parts.append((True, source))
+            pieces[i + 1] = '"' + pieces[i + 1]
+        self._parts.append((False, pieces[-1].encode("utf-8")))
+
+        self.chunk_size = chunk_size
+        self.length = sum(
+            base64_length(self._source_size(part)) if is_audio else len(part)
+            for is_audio, part in self._parts
+        )
+        self._chunks = self._iter_chunks()
+        self._buffer, self._offset = b"", 0
+
+    @staticmethod
+    def _source_size(source):
+        return os.path.getsize(source) if isinstance(source, str) else memoryview(source).nbytes
+
+    def _iter_chunks(self):
+        for is_audio, part in self._parts:
+            if is_audio:
+                yield from iter_base64(part, self.chunk_size)
+            else:
+                yield part
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._buffer[self._offset:] + b"".join(self._chunks)
+            self._buffer, self._offset = b"", 0
+            return data
+
+        if self._offset >= len(self._buffer):
+            self._buffer, self._offset = next(self._chunks, b""), 0
+        data = self._buffer[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def __iter__(self):
+        if self._offset < len(self._buffer):
+            yield self._buffer[self._offset:]
+            self._buffer, self._offset = b"", 0
+        yield from self._chunks
+
+    def __len__(self):
+        return self.length
+
 def call_pipeline(payload):
     """POST to the API and return the parsed JSON."""
     headers = {
         "Content-Type": "application/json",
         "Authorization": AUTH_TOKEN
     }
-    resp = requests.post(API_URL, headers=headers, json=payload)
+    if isinstance(payload, StreamingPayloadBody):
+        resp = http_client.post("bhashini", API_URL, headers=headers, data=payload)
+    else:
+        resp = http_client.post("bhashini", API_URL, headers=headers, json=payload)
     resp.raise_for_status()
     return resp.json()
 
+def call_pipeline_audio(audio_sources, sampling_rate=SAMPLING_RATE):
+    """
+    Transcribe one or more audio inputs (file paths or WAV bytes) in a single request and
+    return the parsed JSON. The body is streamed unless BHASHINI_STREAM_UPLOADS is off.
+    """
+    if STREAM_UPLOADS:
+        return call_pipeline(StreamingPayloadBody(audio_sources, sampling_rate))
+
+    b64_audios = [wav_to_base64(source) if isinstance(source, str) else bytes_to_base64(source)
+                  for source in audio_sources]
+    return call_pipeline(build_payload(b64_audios, sampling_rate))
+
 def extract_transcription(result_json):
     """
     Given the API response as a dict, return the transcription text.
@@ -61,31 +200,219 @@ def extract_transcription(result_json):
                     return outputs[0]["source"]
         return ""
     except Exception as e:
-        print(f"Error extracting transcription: {e}")
+        print(f"Error extracting transcription: {e}", file=sys.stderr)
         return ""
 
-def transcribe_audio_file(file_path):
+def extract_transcriptions(result_json):
+    """
+    Given the API response for a packed request, return one transcription per input,
+    in input order.
+    """
+    for task in result_json.get("pipelineResponse", []):
+        if task.get("taskType") == "asr":
+            return [output.get("source", "") for output in task.get("output", [])]
+    return []
+
+def get_transcript_cache():
+    """Return the process-wide transcript cache, or None if disabled."""
+    global _transcript_cache
+    if _transcript_cache is None and TRANSCRIPT_CACHE_ENABLED:
+        # Batch transcription calls this from several threads; open the SQLite cache once
+        with _transcript_cache_lock:
+            if _transcript_cache is None:
+                _transcript_cache = TieredCache(
+                    LRUCache(max_entries=256),
+                    SQLiteCache(
+                        TRANSCRIPT_CACHE_PATH,
+                        table="transcripts",
+                        max_entries=TRANSCRIPT_CACHE_MAX_ENTRIES,
+                        max_bytes=TRANSCRIPT_CACHE_MAX_BYTES
+                    )
+                )
+    return _transcript_cache
+
+def pcm_digest(source):
+    """
+    SHA-256 of the decoded PCM frames plus their format, for a WAV file path or WAV bytes.
+    Header-only differences (metadata chunks, container layout) do not change the digest.
+    Non-PCM input falls back to hashing the raw bytes.
+    """
+    digest = hashlib.sha256()
+    try:
+        with wave.open(source if isinstance(source, str) else io.BytesIO(source), "rb") as wav:
+            digest.update(f"pcm:{wav.getnchannels()}:{wav.getsampwidth()}:{wav.getframerate()}:".encode("utf-8"))
+            while True:
+                frames = wav.readframes(65536)
+                if not frames:
+                    break
+                digest.update(frames)
+        return digest.hexdigest()
+    except (wave.Error, EOFError):
+        pass
+
+    digest = hashlib.sha256(b"raw:")
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    else:
+        digest.update(source)
+    return digest.hexdigest()
+
+def _prep_settings(prepare):
+    """The settings that shape what is uploaded: sample rate, chunking, silence trimming."""
+    if not (prepare and AUDIO_PREP_AVAILABLE):
+        return "prepare=off"
+    return (f"prepare=on rate={SAMPLING_RATE} chunk={CHUNK_SECONDS} frame={audio_prep.FRAME_MS} "
+            f"min_db={audio_prep.MIN_SPEECH_DB} margin_db={audio_prep.NOISE_MARGIN_DB} "
+            f"pad={audio_prep.PAD_MS} max_pause={audio_prep.MAX_PAUSE_MS}")
+
+def transcript_cache_key(audio_digest, prepare=PREPARE_AUDIO):
+    """
+    Cache key for a transcript: audio digest plus the ASR service, language and audio
+    preparation settings it came from, so changing any of them re-transcribes.
+    """
+    material = f"{SERVICE_ID}\n{SOURCE_LANGUAGE}\n{_prep_settings(prepare)}\n{audio_digest}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def _cached_result(source, use_cache, prepare=PREPARE_AUDIO):
+    """
+    Return (cache_key, cached result or None) for an audio source. A cache that cannot be
+    read (locked or corrupt SQLite, disk error) counts as a miss rather than a failure.
+    """
+    try:
+        cache = get_transcript_cache() if use_cache else None
+        if cache is None:
+            return None, None
+        key = transcript_cache_key(pcm_digest(source), prepare)
+        cached = cache.get(key)
+        transcript = json.loads(cached)["transcript"] if cached is not None else None
+    except Exception as e:
+        print(f"Transcript cache lookup failed, transcribing without it: {e}", file=sys.stderr)
+        return None, None
+    if transcript is None:
+        return key, None
+
+    return key, {
+        "success": True,
+        "transcript": transcript,
+        "raw_response": None,
+        "cached": True
+    }
+
+def _store_result(key, result):
+    """Cache a successful, non-empty transcription; a cache write failure never fails the transcription."""
+    if key is not None and result["success"] and result["transcript"]:
+        try:
+            get_transcript_cache().set(key, json.dumps({"transcript": result["transcript"]}, ensure_ascii=False))
+        except Exception as e:
+            print(f"Could not cache transcript: {e}", file=sys.stderr)
+
+def prepare_upload(source, prepare=True):
+    """
+    Return (audio to send, its sampling rate, preparation stats or None) for a file path
+    or WAV bytes. With preparation, WAV audio is resampled to SAMPLING_RATE and silence is
+    trimmed; otherwise the source is sent as-is (a path is streamed straight from disk)
+    and its real rate is declared.
+    """
+    if prepare and AUDIO_PREP_AVAILABLE:
+        try:
+            prepared = audio_prep.prepare_wav(source, SAMPLING_RATE)
+            return prepared.wav_bytes, prepared.sample_rate, prepared.stats()
+        except (wave.Error, EOFError, ValueError) as e:
+            print(f"Audio preparation skipped: {e}", file=sys.stderr)
+
+    try:
+        with wave.open(source if isinstance(source, str) else io.BytesIO(source), "rb") as wav:
+            return source, wav.getframerate(), None
+    except (wave.Error, EOFError):
+        return source, SAMPLING_RATE, None
+
+def _wav_duration(source):
+    """Duration in seconds from the WAV header of a path or bytes, or None if not WAV."""
+    try:
+        with wave.open(source if isinstance(source, str) else io.BytesIO(source), "rb") as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except (wave.Error, EOFError):
+        return None
+
+def transcribe_chunked(source, max_chunk_seconds=CHUNK_SECONDS, max_workers=MAX_CONCURRENCY):
+    """
+    Split a long WAV recording (file path or bytes) at pauses into chunks of at most
+    `max_chunk_seconds`, transcribe them concurrently and stitch the transcripts back
+    together in order. Each entry of "segments" carries its start/end time in the original
+    recording.
+    """
+    samples, _ = audio_prep.read_resampled(source, SAMPLING_RATE)
+    chunks = audio_prep.split_at_pauses(samples, SAMPLING_RATE, max_chunk_seconds)
+
+    def transcribe_chunk(bounds):
+        start, end = bounds
+        chunk = audio_prep.trim_silence(samples[start:end], SAMPLING_RATE)
+        response = call_pipeline_audio([audio_prep.write_wav(chunk, SAMPLING_RATE)], SAMPLING_RATE)
+        return extract_transcription(response)
+
+    segments = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        futures = [executor.submit(transcribe_chunk, bounds) for bounds in chunks]
+        for (start, end), future in zip(chunks, futures):
+            segment = {
+                "start": round(start / float(SAMPLING_RATE), 3),
+                "end": round(end / float(SAMPLING_RATE), 3),
+                "success": True,
+                "transcript": ""
+            }
+            try:
+                segment["transcript"] = future.result().strip()
+            except Exception as e:
+                segment.update({"success": False, "error": str(e)})
+            segments.append(segment)
+
+    failed = [segment for segment in segments if not segment["success"]]
+    result = {
+        "success": not failed,
+        "transcript": " ".join(segment["transcript"] for segment in segments if segment["transcript"]),
+        "segments": segments
+    }
+    if failed:
+        result["error"] = f"{len(failed)} of {len(segments)} segments failed: {failed[0]['error']}"
+    return result
+
+def _transcribe(source, cache_key, prepare):
+    """Prepare, upload and transcribe a file path or audio bytes; caches successful results under cache_key."""
+    if prepare and AUDIO_PREP_AVAILABLE and (_wav_duration(source) or 0) > CHUNK_SECONDS:
+        result = transcribe_chunked(source)
+        _store_result(cache_key, result)
+        return result
+
+    upload, sampling_rate, prep_stats = prepare_upload(source, prepare)
+
+    # Call API; the audio is base64-encoded into the request body as it is sent
+    response = call_pipeline_audio([upload], sampling_rate)
+    
+    # Extract transcription
+    transcription = extract_transcription(response)
+    
+    result = {
+        "success": True,
+        "transcript": transcription,
+        "raw_response": response
+    }
+    if prep_stats:
+        result["audio_prep"] = prep_stats
+    _store_result(cache_key, result)
+    return result
+
+def transcribe_audio_file(file_path, use_cache=True, prepare=PREPARE_AUDIO):
     """
     Transcribe audio from a file path.
     """
     try:
-        # Convert file to base64
-        b64_audio = wav_to_base64(file_path)
-        
-        # Build payload
-        payload = build_payload(b64_audio)
-        
-        # Call API
-        response = call_pipeline(payload)
-        
-        # Extract transcription
-        transcription = extract_transcription(response)
-        
-        return {
-            "success": True,
-            "transcript": transcription,
-            "raw_response": response
-        }
+        cache_key, cached = _cached_result(file_path, use_cache, prepare)
+        if cached is not None:
+            return cached
+
+        return _transcribe(file_path, cache_key, prepare)
     except Exception as e:
         return {
             "success": False,
@@ -93,28 +420,16 @@ def transcribe_audio_file(file_path):
             "transcript": ""
         }
 
-def transcribe_audio_bytes(audio_bytes):
+def transcribe_audio_bytes(audio_bytes, use_cache=True, prepare=PREPARE_AUDIO):
     """
     Transcribe audio from bytes (for web uploads).
     """
     try:
-        # Convert bytes to base64
-        b64_audio = bytes_to_base64(audio_bytes)
-        
-        # Build payload
-        payload = build_payload(b64_audio)
-        
-        # Call API
-        response = call_pipeline(payload)
-        
-        # Extract transcription
-        transcription = extract_transcription(response)
-        
-        return {
-            "success": True,
-            "transcript": transcription,
-            "raw_response": response
-        }
+        cache_key, cached = _cached_result(audio_bytes, use_cache, prepare)
+        if cached is not None:
+            return cached
+
+        return _transcribe(audio_bytes, cache_key, prepare)
     except Exception as e:
         return {
             "success": False,
@@ -122,31 +437,187 @@ def transcribe_audio_bytes(audio_bytes):
             "transcript": ""
         }
 
-def main():
-    """Original main function for batch processing."""
-    INPUT_DIR = "telephone_speech_uttarakhand\\filtered_calls"
-    OUTPUT_FILE = "results.txt"
-    
-    # Ensure output file is fresh
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as outf:
-        outf.write("")  
+def transcribe_files_packed(file_paths, use_cache=True, prepare=PREPARE_AUDIO):
+    """
+    Transcribe several short recordings with as few pipeline requests as possible: cached
+    files are answered locally, the rest are packed into one request per sampling rate and
+    the per-input outputs are mapped back to their files. Returns results in input order.
+    """
+    results = [None] * len(file_paths)
+    by_rate = {}
+    for i, path in enumerate(file_paths):
+        try:
+            cache_key, cached = _cached_result(path, use_cache, prepare)
+            if cached is not None:
+                results[i] = cached
+                continue
+            upload, sampling_rate, prep_stats = prepare_upload(path, prepare)
+            by_rate.setdefault(sampling_rate, []).append((i, cache_key, upload, prep_stats))
+        except Exception as e:
+            results[i] = {"success": False, "error": str(e), "transcript": ""}
 
-    for fname in os.listdir(INPUT_DIR):
-        if not fname.lower().endswith(".wav"):
+    for sampling_rate, group in by_rate.items():
+        try:
+            transcripts = extract_transcriptions(call_pipeline_audio([item[2] for item in group], sampling_rate))
+            if len(transcripts) != len(group):
+                raise ValueError(f"Pipeline returned {len(transcripts)} outputs for {len(group)} packed inputs")
+        except Exception as e:
+            for i, _, _, _ in group:
+                results[i] = {"success": False, "error": str(e), "transcript": ""}
             continue
 
-        wav_path = os.path.join(INPUT_DIR, fname)
-        print(f"Processing {fname}...")
+        for (i, cache_key, _, prep_stats), transcript in zip(group, transcripts):
+            result = {"success": True, "transcript": transcript, "packed": len(group)}
+            if prep_stats:
+                result["audio_prep"] = prep_stats
+            _store_result(cache_key, result)
+            results[i] = result
 
-        result = transcribe_audio_file(wav_path)
-        
-        if result["success"]:
-            text = result["transcript"].replace("\n", " ").strip()
-            # Append to output file
-            with open(OUTPUT_FILE, "a", encoding="utf-8") as outf:
-                outf.write(f"{fname} {text}\n")
+    return results
+
+def pack_files(pending, max_count=PACK_MAX_COUNT, max_bytes=PACK_MAX_BYTES):
+    """
+    Group (path, key) work items into packs within the count and on-disk byte budgets.
+    Recordings long enough to be chunked always travel alone.
+    """
+    pack, pack_bytes = [], 0
+    for item in pending:
+        path, key = item
+        if max_count <= 1 or (_wav_duration(path) or 0) > CHUNK_SECONDS:
+            yield [item]
+            continue
+        if pack and (len(pack) >= max_count or pack_bytes + key["size"] > max_bytes):
+            yield pack
+            pack, pack_bytes = [], 0
+        pack.append(item)
+        pack_bytes += key["size"]
+    if pack:
+        yield pack
+
+def _file_key(path, root):
+    """Identity of an input file for the checkpoint manifest: relative path, size and mtime."""
+    stat = os.stat(path)
+    return {"file": os.path.relpath(path, root), "size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+def load_manifest(manifest_path):
+    """Return the set of (file, size, mtime) already transcribed successfully."""
+    done = set()
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            done.add((entry["file"], entry["size"], entry["mtime"]))
+    return done
+
+def parse_batch_args(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-transcribe recordings with the Bhashini ASR pipeline.")
+    parser.add_argument("--input-dir", default=os.path.join("telephone_speech_uttarakhand", "filtered_calls"),
+                        help="directory containing the recordings")
+    parser.add_argument("--glob", default="*.wav", help="file pattern inside --input-dir, e.g. '**/*.wav'")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file receiving one result per file")
+    parser.add_argument("--manifest", default=None,
+                        help="checkpoint of completed files (default: <output>.manifest)")
+    parser.add_argument("--workers", type=int, default=MAX_CONCURRENCY, help="files transcribed concurrently")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the transcript cache")
+    parser.add_argument("--pack-count", type=int, default=PACK_MAX_COUNT,
+                        help="max recordings packed into one pipeline request (1 disables packing)")
+    parser.add_argument("--pack-bytes", type=int, default=PACK_MAX_BYTES,
+                        help="max total bytes of recordings packed into one pipeline request")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Batch transcription CLI: transcribes every file matching --glob under --input-dir with a
+    bounded worker pool, appends one JSON line per file to --output, and records successes
+    in a checkpoint manifest so a re-run skips files that are already done.
+    """
+    args = parse_batch_args(argv)
+    manifest_path = args.manifest or args.output + ".manifest"
+
+    files = sorted(str(p) for p in Path(args.input_dir).glob(args.glob) if p.is_file())
+    done = load_manifest(manifest_path)
+    pending = []
+    for path in files:
+        key = _file_key(path, args.input_dir)
+        if (key["file"], key["size"], key["mtime"]) not in done:
+            pending.append((path, key))
+
+    print(f"{len(files)} files matched, {len(files) - len(pending)} already done, {len(pending)} to transcribe")
+    # Each worker can fan out into MAX_CONCURRENCY chunk requests for a long recording
+    http_client.reserve_pool_size("bhashini", max(1, args.workers) * MAX_CONCURRENCY)
+
+    def transcribe(pack):
+        started = time.time()
+        if len(pack) == 1:
+            results = [transcribe_audio_file(pack[0][0], use_cache=not args.no_cache)]
         else:
-            print(f"  ERROR: {result['error']}")
+            results = transcribe_files_packed([path for path, _ in pack], use_cache=not args.no_cache)
+        return results, time.time() - started
+
+    succeeded = failed = 0
+    with open(args.output, "a", encoding="utf-8") as outf, \
+         open(manifest_path, "a", encoding="utf-8") as manifest, \
+         ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+
+        queue = pack_files(pending, args.pack_count, args.pack_bytes)
+        in_flight = {}
+
+        def submit_next():
+            pack = next(queue, None)
+            if pack is not None:
+                in_flight[executor.submit(transcribe, pack)] = pack
+
+        # Keep a bounded window of work queued so tens of thousands of files don't all sit in the executor
+        for _ in range(max(1, args.workers) * 2):
+            submit_next()
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pack = in_flight.pop(future)
+                try:
+                    results, elapsed = future.result()
+                except Exception as e:
+                    results = [{"success": False, "error": str(e), "transcript": ""}] * len(pack)
+                    elapsed = 0.0
+
+                done_keys = []
+                for (path, key), result in zip(pack, results):
+                    record = {
+                        "file": key["file"],
+                        "status": "ok" if result["success"] else "error",
+                        "transcript": result["transcript"].replace("\n", " ").strip(),
+                        "seconds": round(elapsed, 3)
+                    }
+                    if not result["success"]:
+                        record["error"] = result.get("error", "")
+                    outf.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+                    if result["success"]:
+                        succeeded += 1
+                        done_keys.append(key)
+                    else:
+                        failed += 1
+                        print(f"  ERROR {key['file']}: {record['error']}")
+
+                # Checkpoint only after the pack's result lines are on disk, so a crash can
+                # never leave a file marked done whose transcript was lost
+                outf.flush()
+                os.fsync(outf.fileno())
+                if done_keys:
+                    manifest.write("".join(json.dumps(key) + "\n" for key in done_keys))
+                    manifest.flush()
+                    os.fsync(manifest.fileno())
+
+                submit_next()
+
+            print(f"Progress: {succeeded + failed}/{len(pending)} ({failed} failed)")
+
+    print(f"Done: {succeeded} transcribed, {failed} failed. Results in {args.output}")
 
 if __name__ == "__main__":
     main()
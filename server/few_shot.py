@@ -0,0 +1,117 @@
+import hashlib
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from loguru import logger
+from schema import GroundTruthOutput
+
+# Keys a labelled-example JSONL line may use for its transcript
+TRANSCRIPT_KEYS = ("event_info_text", "transcript", "file_text", "text")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English/romanized Hindi)."""
+    return (len(text) + 3) // 4
+
+
+def char_ngrams(text: str, sizes: Tuple[int, ...] = (3, 4, 5)) -> Counter:
+    """Character n-gram counts of lower-cased, whitespace-collapsed text, padded at the edges."""
+    normalized = " " + _WHITESPACE_RE.sub(" ", text.lower()).strip() + " "
+    grams = Counter()
+    for size in sizes:
+        for i in range(len(normalized) - size + 1):
+            grams[normalized[i:i + size]] += 1
+    return grams
+
+
+def load_examples_jsonl(path: str) -> List[dict]:
+    """
+    Load labelled examples: one JSON object per line with the transcript under one of
+    TRANSCRIPT_KEYS and the GroundTruthOutput fields. Invalid lines are skipped with a warning.
+    """
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                transcript = next((record[key] for key in TRANSCRIPT_KEYS if record.get(key)), None)
+                if not transcript:
+                    raise ValueError("no transcript")
+                labels = GroundTruthOutput(**record).model_dump()
+            except Exception as e:
+                logger.warning(f"Skipping few-shot example on line {line_number} of {path}: {e}")
+                continue
+            examples.append({"event_info_text": transcript, **labels})
+    return examples
+
+
+class FewShotStore:
+    """
+    Labelled examples indexed by character n-gram TF-IDF vectors. `select` returns the
+    examples most similar to a transcript that fit a token budget once rendered.
+    """
+
+    def __init__(self, examples: Iterable[dict], render: Callable[[dict], str]):
+        self.examples = list(examples)
+        self._rendered = [render(example) for example in self.examples]
+        self._tokens = [estimate_tokens(rendered) for rendered in self._rendered]
+
+        grams_per_example = [char_ngrams(example["event_info_text"]) for example in self.examples]
+        document_frequency = Counter(gram for grams in grams_per_example for gram in grams)
+        count = len(self.examples)
+        self._idf = {gram: math.log((1 + count) / (1 + df)) + 1.0 for gram, df in document_frequency.items()}
+
+        # Inverted index of L2-normalized, sublinear-tf weights: gram -> [(example index, weight)]
+        self._postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for index, grams in enumerate(grams_per_example):
+            for gram, weight in self._weights(grams).items():
+                self._postings[gram].append((index, weight))
+
+    @classmethod
+    def from_jsonl(cls, path: str, render: Callable[[dict], str], extra_examples: Iterable[dict] = ()) -> "FewShotStore":
+        examples = list(extra_examples) + load_examples_jsonl(path)
+        logger.info(f"Loaded {len(examples)} few-shot examples from {path}.")
+        return cls(examples, render)
+
+    @property
+    def fingerprint(self) -> str:
+        """Changes whenever the stored examples change; part of the extraction cache key."""
+        digest = hashlib.sha256()
+        for rendered in self._rendered:
+            digest.update(rendered.encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def _weights(self, grams: Counter) -> Dict[str, float]:
+        weights = {gram: (1.0 + math.log(tf)) * self._idf[gram] for gram, tf in grams.items() if gram in self._idf}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {gram: w / norm for gram, w in weights.items()}
+
+    def rank(self, text: str) -> List[Tuple[int, float]]:
+        """(example index, cosine similarity) for every example sharing an n-gram with `text`, best first."""
+        scores = defaultdict(float)
+        for gram, weight in self._weights(char_ngrams(text)).items():
+            for index, example_weight in self._postings.get(gram, ()):
+                scores[index] += weight * example_weight
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def select(self, text: str, token_budget: int, max_examples: int = 3) -> List[str]:
+        """
+        Rendered examples most similar to `text`, best first, whose estimated total size
+        stays within `token_budget`. Examples that do not fit are skipped, not truncated.
+        """
+        selected, used = [], 0
+        for index, _ in self.rank(text):
+            if len(selected) >= max_examples:
+                break
+            if used + self._tokens[index] > token_budget:
+                continue
+            selected.append(self._rendered[index])
+            used += self._tokens[index]
+        return selected
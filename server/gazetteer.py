@@ -0,0 +1,323 @@
+import hashlib
+import json
+import re
+import unicodedata
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+DEFAULT_GAZETTEER_PATH = Path(__file__).parent / "data" / "uttarakhand_places.jsonl"
+
+# Place types from most to least specific
+PLACE_TYPES = ("landmark", "locality", "police_station", "town", "district", "state")
+SPECIFICITY = {place_type: len(PLACE_TYPES) - rank for rank, place_type in enumerate(PLACE_TYPES)}
+
+# Confidence of a lone mention of each type, raised by every mentioned ancestor. With the
+# default GAZETTEER_MIN_CONFIDENCE of 0.9, a locality or landmark named with its town and
+# district, or a town named with its district and state, is confident on its own.
+BASE_CONFIDENCE = {"landmark": 0.6, "locality": 0.6, "police_station": 0.55, "town": 0.6, "district": 0.35, "state": 0.1}
+ANCESTOR_BONUS = 0.15
+AMBIGUITY_PENALTY = 0.5
+CONFLICT_PENALTY = 0.6
+
+# Police stations are jurisdictions, not part of an address
+ADDRESS_TYPES = ("landmark", "locality", "town", "district", "state")
+AREA_TYPES = ("town", "district")
+
+# Bump when the scoring or reading rules change; part of the fingerprint
+MATCHER_VERSION = "2"
+
+_TOKEN_RE = re.compile(r"(?:[^\W_]|[ऀ-ॿ])+")
+_ASPIRATED_RE = re.compile(r"([kgcjtdpbs])h")
+_REPEAT_RE = re.compile(r"(.)\1+")
+_LONG_VOWELS = (("ee", "i"), ("oo", "u"), ("w", "v"))
+_NUKTA = "़"
+# Folded single-word names shorter than this collide with ordinary words ("IIT" -> "it")
+MIN_SINGLE_TOKEN_LENGTH = 3
+
+
+@lru_cache(maxsize=65536)
+def fold_token(token: str) -> str:
+    """
+    Spelling-insensitive form of one word, so transliteration variants meet:
+    Roorkee/Rurki -> "rurki", Kichha/Kiccha -> "kica", Thappad -> "tapad".
+    """
+    token = unicodedata.normalize("NFC", token.lower()).replace(_NUKTA, "")
+    if not token.isascii():
+        return token
+    token = _ASPIRATED_RE.sub(r"\1", token)
+    for long_form, short_form in _LONG_VOWELS:
+        token = token.replace(long_form, short_form)
+    return _REPEAT_RE.sub(r"\1", token)
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """(folded token, start, end) for every word of `text`, offsets into the original string."""
+    return [(fold_token(m.group()), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+
+
+@dataclass(frozen=True)
+class Place:
+    id: str
+    name: str
+    type: str
+    parent: Optional[str] = None
+    aliases: Tuple[str, ...] = ()
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class Mention:
+    """A span of the scanned text naming one place (or several equally named ones)."""
+    place_ids: Tuple[str, ...]
+    start: int
+    end: int
+    surface: str
+
+
+@dataclass
+class GazetteerMatch:
+    """Best location reading of a transcript: the most specific place and its hierarchy."""
+    place: Place
+    hierarchy: List[Place]           # place first, then parents up to the state
+    incident_location: str
+    area: str
+    confidence: float
+    mentions: List[Mention] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "incident_location": self.incident_location,
+            "area": self.area,
+            "confidence": round(self.confidence, 3),
+            "place_id": self.place.id,
+            "hierarchy": [{"id": p.id, "name": p.name, "type": p.type} for p in self.hierarchy],
+            "mentions": [m.surface for m in self.mentions]
+        }
+
+
+def load_places_jsonl(path) -> List[Place]:
+    """One place per line: {"id", "name", "type", "parent", "aliases", "lat", "lon"}."""
+    places = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if record["type"] not in SPECIFICITY:
+                    raise ValueError(f"unknown place type '{record['type']}'")
+                places.append(Place(
+                    id=record["id"],
+                    name=record["name"],
+                    type=record["type"],
+                    parent=record.get("parent"),
+                    aliases=tuple(record.get("aliases", ())),
+                    lat=record.get("lat"),
+                    lon=record.get("lon")
+                ))
+            except Exception as e:
+                logger.warning(f"Skipping gazetteer entry on line {line_number} of {path}: {e}")
+    return places
+
+
+class Gazetteer:
+    """
+    Place names and aliases compiled into a word-level Aho-Corasick automaton. `find`
+    scans a transcript once, in time linear in its length, and `locate` turns the
+    mentions into an incident_location / area reading with a confidence score.
+    """
+
+    def __init__(self, places: Iterable[Place]):
+        self.places: Dict[str, Place] = {place.id: place for place in places}
+        self._fingerprint: Optional[str] = None
+        for place in self.places.values():
+            if place.parent is not None and place.parent not in self.places:
+                logger.warning(f"Gazetteer place '{place.id}' has unknown parent '{place.parent}'.")
+
+        # Automaton: goto transitions per node, failure links, and (pattern length, place ids) outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Tuple[str, ...]]]] = [[]]
+
+        patterns: Dict[Tuple[str, ...], List[str]] = {}
+        for place in self.places.values():
+            for name in (place.name,) + place.aliases:
+                tokens = tuple(token for token, _, _ in tokenize(name))
+                if not tokens or (len(tokens) == 1 and len(tokens[0]) < MIN_SINGLE_TOKEN_LENGTH):
+                    continue
+                if place.id not in patterns.setdefault(tokens, []):
+                    patterns[tokens].append(place.id)
+        for tokens, place_ids in patterns.items():
+            self._add_pattern(tokens, tuple(place_ids))
+        self._build_failure_links()
+
+    @classmethod
+    def from_jsonl(cls, path=DEFAULT_GAZETTEER_PATH) -> "Gazetteer":
+        gazetteer = cls(load_places_jsonl(path))
+        gazetteer._fingerprint = hashlib.sha256(MATCHER_VERSION.encode("utf-8") + Path(path).read_bytes()).hexdigest()[:16]
+        logger.info(f"Loaded {len(gazetteer.places)} gazetteer places from {path}.")
+        return gazetteer
+
+    @property
+    def fingerprint(self) -> str:
+        """Changes whenever the place list or matcher changes; part of cache keys of outputs it touched."""
+        if self._fingerprint is None:
+            digest = hashlib.sha256(MATCHER_VERSION.encode("utf-8"))
+            for place in sorted(self.places.values(), key=lambda p: p.id):
+                digest.update(repr(place).encode("utf-8"))
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+    def _add_pattern(self, tokens: Tuple[str, ...], place_ids: Tuple[str, ...]):
+        node = 0
+        for token in tokens:
+            next_node = self._goto[node].get(token)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][token] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        self._out[node].append((len(tokens), place_ids))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(token, 0)
+                # Patterns ending at the failure target also end here
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def ancestors(self, place_id: str) -> List[Place]:
+        """Parents of a place, nearest first."""
+        chain, seen = [], {place_id}
+        parent = self.places[place_id].parent
+        while parent is not None and parent in self.places and parent not in seen:
+            seen.add(parent)
+            chain.append(self.places[parent])
+            parent = self.places[parent].parent
+        return chain
+
+    def find(self, text: str) -> List[Mention]:
+        """Non-overlapping place mentions in `text`, leftmost-longest, in text order."""
+        tokens = tokenize(text)
+        candidates = []
+        node = 0
+        for index, (token, _, _) in enumerate(tokens):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for length, place_ids in self._out[node]:
+                candidates.append((index - length + 1, index + 1, place_ids))
+
+        mentions, covered_until = [], 0
+        for start, end, place_ids in sorted(candidates, key=lambda c: (c[0], -c[1])):
+            if start < covered_until:
+                continue
+            char_start, char_end = tokens[start][1], tokens[end - 1][2]
+            mentions.append(Mention(place_ids, char_start, char_end, text[char_start:char_end]))
+            covered_until = end
+        return mentions
+
+    def _related(self, a: str, b: str) -> bool:
+        return a == b or self.places[b] in self.ancestors(a) or self.places[a] in self.ancestors(b)
+
+    def _resolve(self, mentions: List[Mention]) -> Tuple[Dict[str, int], set]:
+        """
+        Pick one place per mention, preferring the reading supported by the other mentions
+        (Ramnagar next to Roorkee is the Roorkee locality). Returns mention counts per place
+        and the places whose mentions stayed ambiguous.
+        """
+        all_ids = {place_id for mention in mentions for place_id in mention.place_ids}
+        counts, ambiguous = {}, set()
+        for mention in mentions:
+            if len(mention.place_ids) == 1:
+                chosen = mention.place_ids[0]
+            else:
+                support = {place_id: sum(1 for other in all_ids - set(mention.place_ids)
+                                         if self._related(place_id, other))
+                           for place_id in mention.place_ids}
+                best = max(support.values())
+                leaders = [place_id for place_id in mention.place_ids if support[place_id] == best]
+                chosen = leaders[0]
+                if len(leaders) > 1:
+                    ambiguous.add(chosen)
+            counts[chosen] = counts.get(chosen, 0) + 1
+        return counts, ambiguous
+
+    def locate(self, text: str) -> Optional[GazetteerMatch]:
+        """
+        The most specific place mentioned in `text`, with incident_location built from it and
+        its mentioned ancestors ("Devbhoomi Bandkhedi, Roorkee, Uttarakhand") and area from the
+        mentioned town/district. None when no place is mentioned.
+        """
+        mentions = self.find(text)
+        if not mentions:
+            return None
+        counts, ambiguous = self._resolve(mentions)
+
+        def rank(place_id: str):
+            place = self.places[place_id]
+            corroboration = sum(1 for ancestor in self.ancestors(place_id) if ancestor.id in counts)
+            return SPECIFICITY[place.type], corroboration, counts[place_id]
+
+        anchor_id = max(counts, key=rank)
+        anchor = self.places[anchor_id]
+        ancestors = self.ancestors(anchor_id)
+        mentioned_ancestors = [ancestor for ancestor in ancestors if ancestor.id in counts]
+        # Other specific places outside this hierarchy point at a different location
+        conflicts = sum(1 for place_id in counts
+                        if SPECIFICITY[self.places[place_id].type] >= SPECIFICITY["town"]
+                        and not self._related(anchor_id, place_id))
+
+        confidence = min(1.0, BASE_CONFIDENCE[anchor.type] + ANCESTOR_BONUS * len(mentioned_ancestors))
+        if anchor_id in ambiguous:
+            confidence *= AMBIGUITY_PENALTY
+        confidence *= CONFLICT_PENALTY ** conflicts
+        # 0.6 + 2 * 0.15 is 0.8999999999999999 in floating point; compare thresholds on a rounded value
+        confidence = round(confidence, 6)
+
+        location_parts = [anchor.name] + [p.name for p in mentioned_ancestors if p.type in ADDRESS_TYPES]
+        area_parts = [p.name for p in [anchor] + mentioned_ancestors if p.type in AREA_TYPES]
+        if not area_parts:
+            # Nothing broader was named; the area is the nearest town or district the place sits in
+            area_parts = [next((p.name for p in ancestors if p.type in AREA_TYPES), anchor.name)]
+
+        return GazetteerMatch(
+            place=anchor,
+            hierarchy=[anchor] + ancestors,
+            incident_location=", ".join(dict.fromkeys(location_parts)),
+            area=", ".join(dict.fromkeys(area_parts)),
+            confidence=confidence,
+            mentions=mentions
+        )
+
+    def canonicalize(self, value: str) -> str:
+        """Rewrite known place spellings in `value` to their canonical names ("Rurki" -> "Roorkee")."""
+        parts, position = [], 0
+        for mention in self.find(value):
+            names = {self.places[place_id].name for place_id in mention.place_ids}
+            if len(names) != 1:
+                continue
+            parts.append(value[position:mention.start])
+            parts.append(names.pop())
+            position = mention.end
+        parts.append(value[position:])
+        return "".join(parts)
+
+    def mentions_hierarchy(self, value: str, match: GazetteerMatch) -> bool:
+        """Whether `value` names at least one place of `match`'s hierarchy (a cross-check of LLM output)."""
+        hierarchy_ids = {place.id for place in match.hierarchy}
+        return any(hierarchy_ids.intersection(mention.place_ids) for mention in self.find(value))
@@ -0,0 +1,301 @@
+import hashlib
+import importlib
+import json
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from loguru import logger
+
+import http_client
+from cache import LRUCache, SQLiteCache, TieredCache
+from gazetteer import Gazetteer, DEFAULT_GAZETTEER_PATH, fold_token
+
+# ——— CONFIG —————————————————————————————————————————————
+GEOCODE_CACHE_ENABLED = os.getenv("GEOCODE_CACHE", "true").lower() in ["1", "true", "yes"]
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", str(Path(__file__).parent / ".cache" / "geocode_cache.sqlite3"))
+GEOCODE_CACHE_TTL_SECONDS = float(os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# "Nowhere" and approximate answers may improve as providers or places are added; keep them briefly
+GEOCODE_WEAK_ANSWER_TTL_SECONDS = float(os.getenv("GEOCODE_WEAK_ANSWER_TTL_SECONDS", "3600"))
+GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "200000"))
+# Comma-separated external geocoders consulted after the gazetteer: "google" or "package.module:factory"
+GEOCODE_PROVIDERS = os.getenv("GEOCODE_PROVIDERS", "")
+GEOCODE_MAX_CONCURRENCY = int(os.getenv("GEOCODE_MAX_CONCURRENCY", "4"))
+GOOGLE_GEOCODING_URL = os.getenv("GOOGLE_GEOCODING_URL", "https://maps.googleapis.com/maps/api/geocode/json")
+# —————————————————————————————————————————————————————————
+
+# Bump when canonicalization changes so old keys stop matching
+KEY_VERSION = "geo2"
+
+# Words that do not change which place a location string points at
+FILLER_WORDS = frozenset(fold_token(word) for word in (
+    "area", "near", "nearby", "opposite", "opp", "to", "the", "in", "at", "of", "and", "behind", "beside",
+    "ke", "ki", "ka", "paas", "pass", "district", "distt", "dist", "tehsil", "thana", "police", "station"
+))
+# Every location is in Uttarakhand, so naming the state (or country) does not narrow it down
+IMPLIED_PARTS = frozenset(fold_token(word) for word in ("uttarakhand", "india"))
+
+_PART_SPLIT_RE = re.compile(r"[,;|/\n]+|\s+-\s+")
+_WORD_RE = re.compile(r"(?:[^\W_]|[ऀ-ॿ])+")
+
+
+def canonicalize_location(location: str, gazetteer: Optional[Gazetteer] = None) -> str:
+    """
+    Stable form of a free-text location for cache keys: known place spellings canonicalized,
+    case, punctuation, filler words and transliteration variants folded away, the implied
+    state dropped, and the comma-separated parts de-duplicated and sorted, so
+    "Roorkee, Uttarakhand" and "uttarakhand,  RURKI." share one key.
+    """
+    if gazetteer is not None:
+        location = gazetteer.canonicalize(location)
+    location = unicodedata.normalize("NFKC", location).lower()
+
+    parts = set()
+    for part in _PART_SPLIT_RE.split(location):
+        words = [fold_token(word) for word in _WORD_RE.findall(part)]
+        words = [word for word in words if word not in FILLER_WORDS]
+        folded = " ".join(words)
+        if folded and folded not in IMPLIED_PARTS and folded != "not specified":
+            parts.add(folded)
+    return "|".join(sorted(parts))
+
+
+def _result(lat: float, lon: float, source: str, precision: str, formatted: Optional[str] = None) -> dict:
+    return {"lat": float(lat), "lon": float(lon), "source": source, "precision": precision, "formatted": formatted}
+
+
+class GazetteerGeocoder:
+    """
+    Offline geocoder over the gazetteer. Strict mode answers only when every part of the
+    query names a known place; otherwise the coordinates of the most specific mentioned
+    place (walking up the hierarchy to one with coordinates) are returned as approximate.
+    """
+
+    def __init__(self, gazetteer: Gazetteer, strict: bool = True):
+        self.gazetteer = gazetteer
+        self.strict = strict
+        self.name = "gazetteer" if strict else "gazetteer_approximate"
+
+    def _covered(self, query: str) -> bool:
+        """Whether each part of `query` consists only of place names and filler words."""
+        for part in _PART_SPLIT_RE.split(query):
+            words = [(m.start(), m.end()) for m in _WORD_RE.finditer(part)
+                     if fold_token(m.group()) not in FILLER_WORDS]
+            if not words:
+                continue
+            mentions = self.gazetteer.find(part)
+            if any(not any(m.start <= start and end <= m.end for m in mentions) for start, end in words):
+                return False
+        return True
+
+    def geocode_batch(self, queries: Sequence[str]) -> List[Optional[dict]]:
+        results = []
+        for query in queries:
+            match = self.gazetteer.locate(query)
+            if match is None or (self.strict and not self._covered(query)):
+                results.append(None)
+                continue
+            place = next((p for p in match.hierarchy if p.lat is not None), None)
+            if place is None:
+                results.append(None)
+                continue
+            precision = place.type if self.strict else f"approximate_{place.type}"
+            results.append(_result(place.lat, place.lon, self.name, precision, match.incident_location))
+        return results
+
+
+class GoogleGeocoder:
+    """Google Geocoding API, restricted to Uttarakhand; one request per query, run concurrently."""
+
+    name = "google"
+
+    def __init__(self, api_key: Optional[str] = None, max_concurrency: int = GEOCODE_MAX_CONCURRENCY):
+        self.api_key = api_key or os.getenv("GOOGLE_MAPS_API_KEY")
+        if not self.api_key:
+            raise ValueError("GOOGLE_MAPS_API_KEY is not set")
+        self.max_concurrency = max(1, max_concurrency)
+
+    def _geocode(self, query: str) -> Optional[dict]:
+        response = http_client.get("geocoding", GOOGLE_GEOCODING_URL, params={
+            "address": query,
+            "region": "in",
+            "components": "administrative_area:Uttarakhand|country:IN",
+            "key": self.api_key
+        })
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "ZERO_RESULTS":
+            return None
+        if data.get("status") != "OK":
+            raise RuntimeError(f"Google geocoding failed: {data.get('status')} {data.get('error_message', '')}".strip())
+        best = data["results"][0]
+        location = best["geometry"]["location"]
+        return _result(location["lat"], location["lng"], self.name,
+                       best["geometry"].get("location_type", "unknown").lower(), best.get("formatted_address"))
+
+    def geocode_batch(self, queries: Sequence[str]) -> List[Optional[dict]]:
+        if len(queries) == 1:
+            return [self._geocode(queries[0])]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(queries))) as executor:
+            return list(executor.map(self._geocode, queries))
+
+
+PROVIDERS = {"google": GoogleGeocoder}
+
+
+def load_provider(spec: str):
+    """A provider by registry name ("google") or as "package.module:factory" returning an object with geocode_batch."""
+    if spec in PROVIDERS:
+        return PROVIDERS[spec]()
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"Unknown geocode provider '{spec}'")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+class GeocodeService:
+    """
+    Forward geocoding behind a persistent cache keyed on canonicalized location strings, the
+    provider chain and the gazetteer fingerprint; "nowhere" and approximate answers expire
+    after GEOCODE_WEAK_ANSWER_TTL_SECONDS so new providers or places can improve them.
+    Misses go through the providers in order (strict gazetteer, configured external
+    geocoders, approximate gazetteer), each provider seeing only what the previous ones
+    could not answer, in one batch call.
+    """
+
+    def __init__(self, gazetteer: Optional[Gazetteer] = None, providers: Optional[list] = None,
+                 cache: Optional[TieredCache] = None):
+        self.gazetteer = gazetteer
+        if providers is None:
+            providers = [GazetteerGeocoder(gazetteer, strict=True)] if gazetteer is not None else []
+            providers += self._external_providers()
+            if gazetteer is not None:
+                providers.append(GazetteerGeocoder(gazetteer, strict=False))
+        self.providers = providers
+        self.cache = cache
+        self.provider_calls: Dict[str, int] = {getattr(p, "name", type(p).__name__): 0 for p in providers}
+        # Answers depend on the provider chain and the place list, so both are part of every key
+        chain = ",".join(getattr(p, "name", type(p).__name__) for p in providers)
+        self.chain_id = f"{chain}\n{gazetteer.fingerprint if gazetteer is not None else ''}"
+
+    @staticmethod
+    def _external_providers() -> list:
+        providers = []
+        for spec in filter(None, (s.strip() for s in GEOCODE_PROVIDERS.split(","))):
+            try:
+                providers.append(load_provider(spec))
+            except Exception as e:
+                logger.error(f"Could not load geocode provider '{spec}': {e}")
+        return providers
+
+    @classmethod
+    def from_env(cls) -> "GeocodeService":
+        gazetteer = None
+        gazetteer_path = os.getenv("GAZETTEER_PATH", str(DEFAULT_GAZETTEER_PATH))
+        if gazetteer_path:
+            try:
+                gazetteer = Gazetteer.from_jsonl(gazetteer_path)
+            except OSError as e:
+                logger.error(f"Could not load gazetteer '{gazetteer_path}' for geocoding: {e}")
+        cache = None
+        if GEOCODE_CACHE_ENABLED:
+            cache = TieredCache(
+                LRUCache(max_entries=4096),
+                SQLiteCache(
+                    GEOCODE_CACHE_PATH,
+                    table="geocodes",
+                    ttl_seconds=GEOCODE_CACHE_TTL_SECONDS,
+                    max_entries=GEOCODE_CACHE_MAX_ENTRIES
+                ) if GEOCODE_CACHE_PATH else None
+            )
+        return cls(gazetteer, cache=cache)
+
+    def cache_key(self, canonical: str) -> str:
+        return hashlib.sha256(f"{KEY_VERSION}\n{self.chain_id}\n{canonical}".encode("utf-8")).hexdigest()
+
+    def _cached_answer(self, key: str):
+        """(hit, answer) for a canonical key; short-lived entries past their expiry are misses."""
+        value = self.cache.get(self.cache_key(key)) if self.cache is not None else None
+        if value is None:
+            return False, None
+        entry = json.loads(value)
+        if entry.get("expires_at") is not None and entry["expires_at"] < time.time():
+            return False, None
+        return True, entry["answer"]
+
+    def _store_answer(self, key: str, answer: Optional[dict]):
+        entry = {"answer": answer, "expires_at": None}
+        if answer is None or str(answer.get("precision", "")).startswith("approximate"):
+            entry["expires_at"] = time.time() + GEOCODE_WEAK_ANSWER_TTL_SECONDS
+        self.cache.set(self.cache_key(key), json.dumps(entry))
+
+    def geocode_many(self, locations: Sequence[str]) -> List[dict]:
+        """
+        Coordinates for each location string, in input order:
+        {"query", "key", "lat", "lon", "source", "precision", "formatted", "cached"}; lat/lon
+        are None when nothing could place it. Each distinct key is resolved at most once.
+        """
+        canonical = [canonicalize_location(location or "", self.gazetteer) for location in locations]
+        resolved: Dict[str, Optional[dict]] = {}
+        cached_keys = set()
+
+        pending = []
+        for key in dict.fromkeys(canonical):
+            if not key:
+                resolved[key] = None
+                continue
+            hit, answer = self._cached_answer(key)
+            if hit:
+                resolved[key] = answer
+                cached_keys.add(key)
+            else:
+                pending.append(key)
+
+        # Providers get one original spelling per key; the canonical form is only for matching
+        query_for = {}
+        for location, key in zip(locations, canonical):
+            query_for.setdefault(key, location)
+
+        failed = set()
+        for provider in self.providers:
+            if not pending:
+                break
+            name = getattr(provider, "name", type(provider).__name__)
+            self.provider_calls[name] = self.provider_calls.get(name, 0) + len(pending)
+            try:
+                answers = provider.geocode_batch([query_for[key] for key in pending])
+            except Exception as e:
+                logger.warning(f"Geocode provider '{name}' failed for {len(pending)} locations: {e}")
+                failed.update(pending)
+                continue
+            still_pending = []
+            for key, answer in zip(pending, answers):
+                if answer is not None:
+                    resolved[key] = answer
+                else:
+                    still_pending.append(key)
+            pending = still_pending
+
+        for key in list(resolved) + pending:
+            if key in cached_keys or not key:
+                continue
+            answer = resolved.get(key)
+            # "Nowhere" is only remembered when no provider failed on it; failures are retried next time
+            if self.cache is not None and (answer is not None or key not in failed):
+                self._store_answer(key, answer)
+
+        results = []
+        for location, key in zip(locations, canonical):
+            answer = resolved.get(key) or {"lat": None, "lon": None, "source": None, "precision": None, "formatted": None}
+            results.append({"query": location, "key": key, **answer, "cached": key in cached_keys})
+        return results
+
+    def geocode(self, location: str) -> dict:
+        return self.geocode_many([location])[0]
+
+    def stats(self) -> dict:
+        return {"cache": self.cache.stats() if self.cache is not None else None, "provider_calls": dict(self.provider_calls)}
@@ -0,0 +1,125 @@
+import os
+import threading
+from typing import Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ——— CONFIG —————————————————————————————————————————————
+# Per-backend defaults; each value can be overridden with <BACKEND>_<SETTING>
+# environment variables, e.g. OLLAMA_POOL_SIZE=8 or BHASHINI_READ_TIMEOUT=300.
+BACKEND_DEFAULTS = {
+    "ollama":   {"pool_size": 4, "connect_timeout": 5.0,  "read_timeout": 300.0},
+    "gemini":   {"pool_size": 4, "connect_timeout": 10.0, "read_timeout": 120.0},
+    "bhashini": {"pool_size": 4, "connect_timeout": 10.0, "read_timeout": 180.0},
+    "geocoding": {"pool_size": 4, "connect_timeout": 5.0, "read_timeout": 15.0},
+}
+# Concurrency settings the pools must cover, so concurrent callers never overflow the pool
+# and discard keep-alive connections: (environment variable, its default in the caller)
+POOL_CONCURRENCY_SETTINGS = {
+    "ollama": ("OLLAMA_NUM_PARALLEL", 4),
+    "gemini": ("GEMINI_MAX_CONCURRENCY", 8),
+    "bhashini": ("BHASHINI_MAX_CONCURRENCY", 4),
+    "geocoding": ("GEOCODE_MAX_CONCURRENCY", 4),
+}
+# —————————————————————————————————————————————————————————
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+# Pool sizes callers asked for at run time (see reserve_pool_size)
+_reserved_pool_sizes: Dict[str, int] = {}
+
+
+def _setting(backend: str, name: str):
+    """Read a backend setting from the environment, falling back to BACKEND_DEFAULTS."""
+    default = BACKEND_DEFAULTS[backend][name]
+    value = os.getenv(f"{backend.upper()}_{name.upper()}")
+    if value is None:
+        return default
+    return type(default)(value)
+
+
+def get_pool_size(backend: str) -> int:
+    """
+    Connection pool size: <BACKEND>_POOL_SIZE if set, else large enough for the backend's
+    configured concurrency; never below a size reserved with reserve_pool_size.
+    """
+    if os.getenv(f"{backend.upper()}_POOL_SIZE") is not None:
+        pool_size = _setting(backend, "pool_size")
+    else:
+        pool_size = BACKEND_DEFAULTS[backend]["pool_size"]
+        if backend in POOL_CONCURRENCY_SETTINGS:
+            name, default = POOL_CONCURRENCY_SETTINGS[backend]
+            pool_size = max(pool_size, int(os.getenv(name, str(default))))
+    return max(pool_size, _reserved_pool_sizes.get(backend, 0))
+
+
+def _mount(session: requests.Session, pool_size: int):
+    # Retries are handled by the callers, which know what is safe to repeat
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def reserve_pool_size(backend: str, pool_size: int):
+    """
+    Make a backend's pool hold at least `pool_size` connections, for callers whose
+    concurrency goes beyond the configured setting (e.g. batch workers that each fan out
+    into chunk threads). A session that already exists gets a larger pool.
+    """
+    if backend not in BACKEND_DEFAULTS:
+        raise ValueError(f"Unknown HTTP backend: {backend}")
+    with _sessions_lock:
+        if pool_size <= _reserved_pool_sizes.get(backend, 0):
+            return
+        _reserved_pool_sizes[backend] = pool_size
+        session = _sessions.get(backend)
+        if session is not None and get_pool_size(backend) == pool_size:
+            old_adapter = session.get_adapter("https://")
+            _mount(session, pool_size)
+            old_adapter.close()
+
+
+def get_timeout(backend: str) -> Tuple[float, float]:
+    """Return the (connect, read) timeout tuple for a backend."""
+    return (_setting(backend, "connect_timeout"), _setting(backend, "read_timeout"))
+
+
+def get_session(backend: str) -> requests.Session:
+    """
+    Return the process-wide keep-alive session for a backend, creating it on first use.
+    Settings are read lazily so values loaded by dotenv after import still apply.
+    """
+    session = _sessions.get(backend)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        if backend not in _sessions:
+            if backend not in BACKEND_DEFAULTS:
+                raise ValueError(f"Unknown HTTP backend: {backend}")
+
+            session = requests.Session()
+            _mount(session, get_pool_size(backend))
+            _sessions[backend] = session
+        return _sessions[backend]
+
+
+def post(backend: str, url: str, **kwargs) -> requests.Response:
+    """POST through the backend's pooled session, applying its default timeouts."""
+    kwargs.setdefault("timeout", get_timeout(backend))
+    return get_session(backend).post(url, **kwargs)
+
+
+def get(backend: str, url: str, **kwargs) -> requests.Response:
+    """GET through the backend's pooled session, applying its default timeouts."""
+    kwargs.setdefault("timeout", get_timeout(backend))
+    return get_session(backend).get(url, **kwargs)
+
+
+def close_all():
+    """Close every pooled session (e.g. before a worker exits)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,229 @@
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from schema import FIELD_VALUE_SCHEMA, ALL_EVENT_SUB_TYPES, derive_event_type
+
+# Scheduling weight of each event type: calls about people in danger go first
+EVENT_TYPE_PRIORITY = {
+    'VIOLENT CRIME': 5, 'MEDICAL EMERGENCIES': 5, 'FIRE & HAZARDS': 5, 'RESCUE OPERATIONS': 5,
+    'MISSING PERSONS': 4, 'NATURAL INCIDENTS': 4, 'TRAFFIC INCIDENTS': 3,
+    'THEFT & BURGLARY': 2, 'PUBLIC DISTURBANCE': 2,
+    'SOCIAL ISSUES': 1, 'PUBLIC NUISANCE': 1, 'OTHERS': 0,
+}
+
+# Sub-type used for a keyword fallback when the transcript names the event type but no sub-type
+GENERIC_SUB_TYPES = {
+    'VIOLENT CRIME': 'ASSAULT', 'THEFT & BURGLARY': 'THEFT', 'PUBLIC DISTURBANCE': 'GENERAL NUISANCE',
+    'FIRE & HAZARDS': 'FIRE', 'RESCUE OPERATIONS': 'SEARCH AND RESCUE', 'MEDICAL EMERGENCIES': 'AMBULANCE SERVICE',
+    'TRAFFIC INCIDENTS': 'ACCIDENT', 'SOCIAL ISSUES': 'FAMILY ISSUES', 'MISSING PERSONS': 'MISSING',
+    'NATURAL INCIDENTS': 'DISASTER',
+}
+
+# Event types scoring at least this share of the best one stay in a narrowed prompt
+CANDIDATE_RELATIVE_SCORE = 0.2
+# A prediction needs this much keyword weight, this share of the total, and this many times the
+# runner-up's weight to be confident. Keyword recall is low ("beat" does not match "beaten"),
+# so only confident predictions narrow the prompt.
+MIN_CONFIDENT_SCORE = 3.0
+MIN_CONFIDENT_SHARE = 0.5
+MIN_RUNNER_UP_RATIO = 2.0
+
+
+@dataclass
+class KeywordPrediction:
+    """Keyword evidence for one transcript."""
+    scores: Dict[str, float]                 # event type -> weight of matched phrases, only non-zero
+    event_type: Optional[str]                # best-scoring type, None without any match
+    sub_type: Optional[str]                  # best sub-type of that type (named or generic)
+    confidence: float                        # share of the total weight held by event_type
+    confident: bool
+    priority: float                          # expected EVENT_TYPE_PRIORITY under the score distribution
+    candidates: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "event_type": self.event_type,
+            "sub_type": self.sub_type,
+            "confidence": round(self.confidence, 3),
+            "confident": self.confident,
+            "priority": round(self.priority, 3),
+            "candidates": self.candidates,
+            "scores": {k: round(v, 3) for k, v in self.scores.items()}
+        }
+
+
+def _normalize_phrase(phrase: str) -> str:
+    return " ".join(phrase.lower().split())
+
+
+class KeywordClassifier:
+    """
+    Event-type keywords and sub-type names compiled into one regex alternation. A batch of
+    transcripts is scanned in a single pass and scored with two matrix products:
+    (transcripts x phrases) hit counts times (phrases x event types) weights, and times
+    (phrases x sub-types) indicators. Multi-word phrases weigh one per word.
+    """
+
+    def __init__(self, keyword_map: Mapping[str, Sequence[str]]):
+        self.event_types: List[str] = list(FIELD_VALUE_SCHEMA["event_type"])
+        self.sub_types: List[str] = list(ALL_EVENT_SUB_TYPES)
+        type_index = {t: i for i, t in enumerate(self.event_types)}
+        sub_type_index = {s: i for i, s in enumerate(self.sub_types)}
+
+        weights: Dict[str, Dict[int, float]] = {}
+        sub_type_of: Dict[str, int] = {}
+        for event_type, phrases in keyword_map.items():
+            for phrase in phrases:
+                phrase = _normalize_phrase(phrase)
+                weights.setdefault(phrase, {})[type_index[event_type]] = float(len(phrase.split()))
+        for sub_type in self.sub_types:
+            if sub_type == "OTHERS":
+                continue
+            phrase = _normalize_phrase(sub_type)
+            event_type = derive_event_type(sub_type)
+            entry = weights.setdefault(phrase, {})
+            entry[type_index[event_type]] = max(entry.get(type_index[event_type], 0.0), float(len(phrase.split())))
+            sub_type_of[phrase] = sub_type_index[sub_type]
+
+        self.phrases: List[str] = sorted(weights, key=lambda p: (-len(p), p))
+        self._phrase_index = {phrase: i for i, phrase in enumerate(self.phrases)}
+        self.type_weights = np.zeros((len(self.phrases), len(self.event_types)))
+        self.sub_type_hits = np.zeros((len(self.phrases), len(self.sub_types)))
+        for phrase, entry in weights.items():
+            for t, weight in entry.items():
+                self.type_weights[self._phrase_index[phrase], t] = weight
+            if phrase in sub_type_of:
+                self.sub_type_hits[self._phrase_index[phrase], sub_type_of[phrase]] = 1.0
+
+        # Longest phrases first so "vehicle theft" wins over "vehicle"; simple plural/verb endings allowed
+        alternation = "|".join(re.escape(p).replace(r"\ ", r"\s+") for p in self.phrases)
+        self._pattern = re.compile(rf"\b({alternation})(?:s|es|ed|ing)?\b", re.IGNORECASE)
+
+        self._priorities = np.array([EVENT_TYPE_PRIORITY.get(t, 0) for t in self.event_types], dtype=np.float64)
+        self._generic_sub_types = {
+            event_type: sub_type for event_type, sub_type in GENERIC_SUB_TYPES.items()
+            if derive_event_type(sub_type) == event_type
+        }
+        # Sub-types whose event type (as derived) is t, for picking the best sub-type of a type
+        self._sub_type_mask = np.array([[derive_event_type(s) == t for s in self.sub_types] for t in self.event_types])
+
+    @property
+    def fingerprint(self) -> str:
+        """Changes with the phrases, weights or thresholds; part of the prompt version when narrowing."""
+        digest = hashlib.sha256(repr((self.phrases, self.type_weights.tolist(), CANDIDATE_RELATIVE_SCORE,
+                                      MIN_CONFIDENT_SCORE, MIN_CONFIDENT_SHARE, MIN_RUNNER_UP_RATIO)).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def hit_counts(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts) x phrases) match counts from one regex pass over the joined batch."""
+        counts = np.zeros((len(texts), len(self.phrases)))
+        if not texts:
+            return counts
+        # NUL never occurs in transcripts and no phrase spans it
+        joined = "\x00".join(texts)
+        starts = np.cumsum([0] + [len(t) + 1 for t in texts[:-1]])
+
+        positions, phrase_ids = [], []
+        for match in self._pattern.finditer(joined):
+            positions.append(match.start())
+            phrase_ids.append(self._phrase_index[_normalize_phrase(match.group(1))])
+        if positions:
+            rows = np.searchsorted(starts, positions, side="right") - 1
+            np.add.at(counts, (rows, np.asarray(phrase_ids)), 1.0)
+        return counts
+
+    def score_batch(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(event type scores, sub-type scores) for every transcript, as (n x types) and (n x sub-types)."""
+        counts = self.hit_counts(texts)
+        return counts @ self.type_weights, counts @ self.sub_type_hits
+
+    def classify_batch(self, texts: Sequence[str]) -> List[KeywordPrediction]:
+        type_scores, sub_type_scores = self.score_batch(texts)
+        totals = type_scores.sum(axis=1)
+        best = type_scores.argmax(axis=1)
+        runner_up = np.sort(type_scores, axis=1)[:, -2] if type_scores.shape[1] > 1 else np.zeros(len(texts))
+        safe_totals = np.where(totals > 0, totals, 1.0)
+        shares = type_scores / safe_totals[:, None]
+        priorities = shares @ self._priorities
+
+        predictions = []
+        for row in range(len(texts)):
+            if totals[row] <= 0:
+                predictions.append(KeywordPrediction({}, None, None, 0.0, False, 0.0, []))
+                continue
+            top = int(best[row])
+            top_score = type_scores[row, top]
+            event_type = self.event_types[top]
+
+            sub_scores = np.where(self._sub_type_mask[top], sub_type_scores[row], 0.0)
+            if sub_scores.max() > 0:
+                sub_type = self.sub_types[int(sub_scores.argmax())]
+            else:
+                sub_type = self._generic_sub_types.get(event_type)
+
+            confidence = float(shares[row, top])
+            predictions.append(KeywordPrediction(
+                scores={self.event_types[t]: float(s) for t, s in enumerate(type_scores[row]) if s > 0},
+                event_type=event_type,
+                sub_type=sub_type,
+                confidence=confidence,
+                confident=bool(top_score >= MIN_CONFIDENT_SCORE and confidence >= MIN_CONFIDENT_SHARE
+                               and top_score >= MIN_RUNNER_UP_RATIO * runner_up[row]),
+                priority=float(priorities[row]),
+                candidates=[self.event_types[t] for t in np.argsort(-type_scores[row], kind="stable")
+                            if type_scores[row, t] > 0 and type_scores[row, t] >= CANDIDATE_RELATIVE_SCORE * top_score]
+            ))
+        return predictions
+
+    def classify(self, text: str) -> KeywordPrediction:
+        return self.classify_batch([text])[0]
+
+    def priorities(self, texts: Sequence[str]) -> np.ndarray:
+        """Scheduling priority per transcript (higher first); 0 when no keyword matched."""
+        type_scores, _ = self.score_batch(texts)
+        totals = type_scores.sum(axis=1, keepdims=True)
+        return (type_scores / np.where(totals > 0, totals, 1.0)) @ self._priorities
+
+    def candidate_sub_types(self, prediction: KeywordPrediction) -> Optional[List[str]]:
+        """
+        Sub-types of the candidate event types, plus OTHERS, in schema order; None (keep the full
+        list) unless the prediction is confident.
+        """
+        if not prediction.confident or not prediction.candidates:
+            return None
+        allowed = {s for t in prediction.candidates for s in FIELD_VALUE_SCHEMA["event_sub_type"][t]}
+        return [s for s in self.sub_types if s in allowed or s == "OTHERS"]
+
+    def narrowing_recall(self, examples: Sequence[dict]) -> dict:
+        """
+        How often prompt narrowing keeps the labelled answer, over examples with the transcript
+        under "event_info_text" and the label under "event_sub_type":
+          examples  number scored
+          narrowed  how many got a narrowed sub-type list
+          recall    share of narrowed examples whose label is still listed (1.0 if none narrowed)
+          sub_types_listed  mean length of the listed sub-types over all examples
+          misses    [{"text", "label", "candidates"}] for narrowed examples that lost their label
+        """
+        examples = [e for e in examples if e.get("event_info_text") and e.get("event_sub_type")]
+        predictions = self.classify_batch([e["event_info_text"] for e in examples])
+        narrowed, listed, misses = 0, 0, []
+        for example, prediction in zip(examples, predictions):
+            sub_types = self.candidate_sub_types(prediction)
+            listed += len(sub_types) if sub_types is not None else len(self.sub_types)
+            if sub_types is None:
+                continue
+            narrowed += 1
+            if example["event_sub_type"].upper() not in sub_types:
+                misses.append({"text": example["event_info_text"][:120], "label": example["event_sub_type"],
+                               "candidates": prediction.candidates})
+        return {
+            "examples": len(examples),
+            "narrowed": narrowed,
+            "recall": 1.0 - len(misses) / narrowed if narrowed else 1.0,
+            "sub_types_listed": listed / len(examples) if examples else float(len(self.sub_types)),
+            "misses": misses
+        }
@@ -1,6 +1,9 @@
 import sys
 import json
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add the current directory to Python path to import your modules
@@ -9,39 +12,200 @@ sys.path.append(str(current_dir))
 
 try:
     from text_processor import TextProcessor
+    from metrics import render_prometheus, PROMETHEUS_CONTENT_TYPE
+    from geocode_service import GeocodeService
+    import http_client
 except ImportError as e:
     print(f"Error importing TextProcessor: {e}", file=sys.stderr)
     sys.exit(1)
 
+def process_request(processor, input_data, on_field=None):
+    """
+    Run one extraction request and return the JSON-serializable result dict.
+    With "mode": "location" only incident_location and area are extracted, with a short
+    prompt (streaming requests then get both fields once the answer is in).
+    With "stream": true, `on_field(field, value)` is called as fields are generated and
+    generation stops once every field listed in "fields" has been seen. With
+    "include_metrics": true the result carries "processing_metrics" (per-stage timings
+    and provider-reported token stats).
+    """
+    text = input_data.get('text', '')
+
+    if not text:
+        raise ValueError("No text provided")
+
+    file_name = input_data.get('file_name', "web_input.txt")
+    use_cache = not input_data.get('no_cache', False)
+
+    # Process the text
+    if input_data.get('mode') == 'location':
+        result = processor.process_location(text, file_name=file_name, use_cache=use_cache)
+        if input_data.get('stream') and on_field is not None:
+            for field in ('incident_location', 'area'):
+                on_field(field, getattr(result, field))
+    elif input_data.get('stream'):
+        result = processor.process_text_stream(
+            text,
+            file_name=file_name,
+            fields=input_data.get('fields'),
+            on_field=on_field,
+            use_cache=use_cache
+        )
+    else:
+        result = processor.process_text(text, file_name=file_name, use_cache=use_cache)
+
+    # Convert to dictionary for JSON serialization
+    result_dict = result.model_dump()
+    if input_data.get('include_metrics'):
+        result_dict['processing_metrics'] = result.processing_metrics
+    return result_dict
+
+def process_geocode(service, input_data):
+    """Geocode {"locations": [...]} (or a single "location") through the cached geocode service."""
+    locations = input_data.get('locations')
+    if locations is None:
+        locations = [input_data.get('location', '')]
+    if not isinstance(locations, list) or not all(isinstance(l, str) for l in locations):
+        raise ValueError("locations must be a list of strings")
+    return {"results": service.geocode_many(locations)}
+
+# Worker threads share stdout; each message must go out as one whole line
+_write_lock = threading.Lock()
+
+def error_to_dict(e):
+    """Shape an exception the way the Node bridge expects it."""
+    return {
+        "error": str(e),
+        "type": type(e).__name__
+    }
+
+def write_message(message):
+    """Write one JSON-lines message to stdout and flush it immediately (safe from any thread)."""
+    line = json.dumps(message, default=str, ensure_ascii=False) + "\n"
+    with _write_lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+def run_worker():
+    """
+    Long-lived worker mode: one warm TextProcessor serves newline-delimited JSON
+    requests from stdin until stdin is closed.
+
+    Request:  {"id": "<request id>", "text": "...", "mode": "full" | "location", "stream": false, "fields": [...]}
+    Response: {"id": "<request id>", "ok": true, "result": {...}}
+              {"id": "<request id>", "ok": false, "error": "...", "type": "..."}
+    Streaming requests also get {"id": "<request id>", "event": "field", "field": "...", "value": "..."}
+    messages before the final response.
+
+    {"id": "<request id>", "op": "metrics"} returns this worker's histograms as
+    {"content_type": "...", "text": "<Prometheus text format>"} in "result".
+    {"id": "<request id>", "op": "geocode", "locations": [...]} returns
+    {"results": [{"query", "lat", "lon", "source", ...}, ...]} in "result".
+    """
+    processor = TextProcessor()
+    processor.warm_up()
+    geocoder = GeocodeService.from_env()
+
+    # Tell the parent process we are ready to accept requests
+    write_message({"event": "ready", "pid": os.getpid()})
+
+    try:
+        serve_requests(processor, geocoder)
+    finally:
+        http_client.close_all()
+
+
+def serve_requests(processor: TextProcessor, geocoder: GeocodeService):
+    """
+    Answer worker requests from stdin until it is closed. Metrics are answered on the reader
+    thread as soon as they arrive and geocoding runs on its own thread; LLM requests run in
+    order on a separate thread, so neither a scrape nor a cache lookup queues behind an LLM call.
+    """
+    requests_queue = queue.Queue()
+    runner = threading.Thread(target=run_requests, args=(processor, requests_queue),
+                              name="llm-requests", daemon=True)
+    runner.start()
+    geocode_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geocode")
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            input_data = json.loads(line)
+            request_id = input_data.get('id')
+
+            if input_data.get('op') == 'metrics':
+                metrics_text = render_prometheus({"worker": str(os.getpid())})
+                write_message({"id": request_id, "ok": True,
+                               "result": {"content_type": PROMETHEUS_CONTENT_TYPE, "text": metrics_text}})
+                continue
+        except Exception as e:
+            write_message({"id": request_id, "ok": False, **error_to_dict(e)})
+            continue
+
+        if input_data.get('op') == 'geocode':
+            geocode_executor.submit(run_geocode, geocoder, input_data)
+        else:
+            requests_queue.put(input_data)
+
+    # Finish what was already queued before exiting
+    requests_queue.put(None)
+    runner.join()
+    geocode_executor.shutdown(wait=True)
+
+
+def run_geocode(geocoder: GeocodeService, input_data):
+    request_id = input_data.get('id')
+    try:
+        write_message({"id": request_id, "ok": True, "result": process_geocode(geocoder, input_data)})
+    except Exception as e:
+        write_message({"id": request_id, "ok": False, **error_to_dict(e)})
+
+
+def run_requests(processor: TextProcessor, requests_queue: queue.Queue):
+    """Run queued LLM requests one at a time until the None sentinel."""
+    while True:
+        input_data = requests_queue.get()
+        if input_data is None:
+            return
+
+        request_id = input_data.get('id')
+        try:
+            def on_field(field, value, request_id=request_id):
+                write_message({"id": request_id, "event": "field", "field": field, "value": value})
+
+            result_dict = process_request(processor, input_data, on_field=on_field)
+            write_message({"id": request_id, "ok": True, "result": result_dict})
+        except Exception as e:
+            # A bad request must never take down the warm worker
+            write_message({"id": request_id, "ok": False, **error_to_dict(e)})
+
 def main():
+    if "--worker" in sys.argv[1:]:
+        run_worker()
+        return
+
     try:
         # Read input from stdin
         input_data = json.loads(sys.stdin.read())
-        text = input_data.get('text', '')
-        
-        if not text:
-            raise ValueError("No text provided")
-        
-        # Initialize the text processor
-        processor = TextProcessor()
-        
-        # Process the text
-        result = processor.process_text(text, file_name="web_input.txt")
-        
-        # Convert to dictionary for JSON serialization
-        result_dict = result.model_dump()
-        
+
+        if input_data.get('op') == 'geocode':
+            result_dict = process_geocode(GeocodeService.from_env(), input_data)
+        else:
+            # Initialize the text processor
+            processor = TextProcessor()
+            result_dict = process_request(processor, input_data)
+
         # Output the result as JSON
         print(json.dumps(result_dict, default=str, ensure_ascii=False))
-        
+
     except Exception as e:
         # Output error as JSON to stderr
-        error_data = {
-            "error": str(e),
-            "type": type(e).__name__
-        }
-        print(json.dumps(error_data), file=sys.stderr)
+        print(json.dumps(error_to_dict(e)), file=sys.stderr)
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,149 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+# Bucket upper bounds (the +Inf bucket is implicit)
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160, 320)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Thread-safe cumulative histogram with a fixed label set, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = SECONDS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self, const_labels: Tuple[Tuple[str, str], ...] = ()) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+
+        for key in sorted(snapshot):
+            counts, total, count = snapshot[key]
+            labels = tuple(const_labels) + tuple(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """A named collection of histograms rendered together as one Prometheus exposition."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = SECONDS_BUCKETS) -> Histogram:
+        """Return the histogram registered under `name`, creating it on first use."""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help_text, label_names, buckets)
+            return self._metrics[name]
+
+    def render(self, const_labels: Optional[Dict[str, str]] = None) -> str:
+        """Prometheus text exposition (format 0.0.4) of every registered metric."""
+        const = tuple(sorted((const_labels or {}).items()))
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render(const) for metric in metrics) + "\n"
+
+
+class StageTimer:
+    """Accumulates wall-clock seconds per named stage of one request."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.started_at = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def rounded(self, digits: int = 6) -> Dict[str, float]:
+        return {name: round(seconds, digits) for name, seconds in self.stages.items()}
+
+
+REGISTRY = MetricsRegistry()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+EXTRACTION_STAGE_SECONDS = REGISTRY.histogram(
+    "extraction_stage_seconds", "Time spent in each stage of an extraction request.", ("provider", "task", "stage"))
+EXTRACTION_SECONDS = REGISTRY.histogram(
+    "extraction_request_seconds", "End-to-end extraction request time.", ("provider", "task", "outcome"))
+LLM_TOKENS = REGISTRY.histogram(
+    "llm_tokens", "Tokens per LLM call as reported by the provider.", ("provider", "task", "kind"), TOKEN_BUCKETS)
+LLM_PHASE_SECONDS = REGISTRY.histogram(
+    "llm_phase_seconds", "Provider-reported LLM time per phase (load, prompt_eval, eval).", ("provider", "phase"))
+LLM_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "llm_generation_tokens_per_second", "Generation speed reported by the provider.", ("provider",), RATE_BUCKETS)
+
+
+def record_extraction(provider: str, outcome: str, timer: StageTimer, llm_stats: Optional[Dict[str, float]] = None,
+                      task: str = "extraction"):
+    """Feed one finished request (`task` "extraction" or "location") into the module-level histograms."""
+    for stage, seconds in timer.stages.items():
+        EXTRACTION_STAGE_SECONDS.observe(seconds, provider=provider, task=task, stage=stage)
+    EXTRACTION_SECONDS.observe(timer.total(), provider=provider, task=task, outcome=outcome)
+
+    if not llm_stats:
+        return
+    for kind in ("prompt", "eval", "cached"):
+        if f"{kind}_tokens" in llm_stats:
+            LLM_TOKENS.observe(llm_stats[f"{kind}_tokens"], provider=provider, task=task, kind=kind)
+    for phase in ("load", "prompt_eval", "eval"):
+        if f"{phase}_seconds" in llm_stats:
+            LLM_PHASE_SECONDS.observe(llm_stats[f"{phase}_seconds"], provider=provider, phase=phase)
+    if llm_stats.get("eval_seconds") and "eval_tokens" in llm_stats:
+        LLM_TOKENS_PER_SECOND.observe(llm_stats["eval_tokens"] / llm_stats["eval_seconds"], provider=provider)
+
+
+def render_prometheus(const_labels: Optional[Dict[str, str]] = None) -> str:
+    return REGISTRY.render(const_labels)
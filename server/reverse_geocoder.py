@@ -0,0 +1,536 @@
+"""
+Offline reverse geocoding: latitude/longitude to the nearest named place, police station
+jurisdiction and district, without a network hop.
+
+    python reverse_geocoder.py build [--polygons jurisdictions.geojson]
+    python reverse_geocoder.py lookup 29.871 77.901 30.128 78.160
+
+Nearest-place lookups use a uniform grid whose cells list every point that can be the
+nearest one for some location inside the cell, so a bulk query is a table lookup plus one
+vectorized distance comparison. Jurisdictions come from polygon layers (GeoJSON features
+with a "layer" property of "police_station" or "district") indexed by STR-packed bounding
+boxes. Without a polygon layer the police station is the nearest station point and the
+district is taken from the nearest place's gazetteer hierarchy.
+
+The index is a directory of .npy arrays plus meta.json, loaded with mmap. Each save writes
+a fresh versioned subdirectory and then atomically repoints the CURRENT file at it, so a
+reader never pairs old metadata with new arrays and mapped files are never rewritten.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from gazetteer import Gazetteer, DEFAULT_GAZETTEER_PATH
+
+# ——— CONFIG —————————————————————————————————————————————
+INDEX_DIR = os.getenv("REVERSE_GEOCODER_INDEX", str(Path(__file__).parent / ".cache" / "reverse_geocoder"))
+INDEX_FORMAT_VERSION = 1
+# Names the versioned subdirectory holding the live index
+CURRENT_FILE = "CURRENT"
+GRID_MARGIN_DEG = 0.5          # grid extends this far beyond the outermost points
+MAX_GRID_CELLS = 1_000_000
+STR_NODE_CAPACITY = 16         # polygons per STR leaf
+QUERY_CHUNK = 65536            # queries processed per vectorized step
+EARTH_RADIUS_KM = 6371.0088
+# —————————————————————————————————————————————————————————
+
+NEAREST_PLACE_TYPES = ("landmark", "locality", "town")
+JURISDICTION_LAYERS = ("police_station", "district")
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class PointGrid:
+    """
+    Exact nearest-point search in a locally flat projection (x = lon * cos(lat0), y = lat).
+    Row c of `table` holds, padded with -1, every point whose distance to cell c is no more
+    than the smallest worst-case distance of any point to that cell.
+    """
+
+    def __init__(self, xy: np.ndarray, origin: Tuple[float, float], cell_size: float,
+                 shape: Tuple[int, int], table: np.ndarray):
+        self.xy = xy
+        self.origin = origin
+        self.cell_size = cell_size
+        self.shape = shape          # (columns, rows)
+        self.table = table
+
+    @classmethod
+    def build(cls, xy: np.ndarray, cell_size: Optional[float] = None, margin: float = GRID_MARGIN_DEG) -> "PointGrid":
+        xy = np.ascontiguousarray(xy, dtype=np.float64)
+        if len(xy) == 0:
+            raise ValueError("PointGrid needs at least one point")
+        low, high = xy.min(axis=0) - margin, xy.max(axis=0) + margin
+        extent = high - low
+        if cell_size is None:
+            # About sixteen cells per point keeps the candidate lists short
+            cell_size = max(math.sqrt(extent[0] * extent[1] / (16 * len(xy))), 1e-4)
+        cell_size = max(cell_size, math.sqrt(extent[0] * extent[1] / MAX_GRID_CELLS))
+        columns, rows = (int(v) for v in np.ceil(extent / cell_size))
+        cell_count = columns * rows
+
+        # Candidate lists are refined down a quadtree whose level-l cells are 2**l grid cells
+        # wide. A cell's candidates are a subset of its parent's: no point is nearer to it and
+        # its smallest worst-case distance is no larger. (cell, point) pairs stay grouped by
+        # the cell's Z-order code, so the children of a group of pairs are found together.
+        levels = math.ceil(math.log2(max(columns, rows, 1)))
+        pairs = _refine_candidates(xy, low, cell_size * 2 ** levels, np.zeros((3, len(xy)), dtype=np.int64),
+                                   np.arange(len(xy)), slack=levels > 0)
+        for level in range(levels - 1, -1, -1):
+            level_cols, level_rows = -(-columns // 2 ** level), -(-rows // 2 ** level)
+            cells, points = pairs
+            group_starts = np.flatnonzero(np.r_[True, cells[0, 1:] != cells[0, :-1]])
+            chunk_starts = np.unique(group_starts[np.searchsorted(group_starts, np.arange(0, len(points), 250_000),
+                                                                  side="right") - 1])
+            refined = []
+            for start, end in zip(chunk_starts, np.r_[chunk_starts[1:], len(points)]):
+                quadrant = np.tile(np.arange(4), end - start)
+                children = np.repeat(cells[:, start:end], 4, axis=1) * np.array([[4], [2], [2]])
+                children += np.stack([quadrant, quadrant // 2, quadrant % 2])
+                valid = (children[1] < level_rows) & (children[2] < level_cols)
+                order = np.argsort(children[0, valid], kind="stable")
+                refined.append(_refine_candidates(xy, low, cell_size * 2 ** level, children[:, valid][:, order],
+                                                  np.repeat(points[start:end], 4)[valid][order], slack=level > 0))
+            pairs = (np.concatenate([c for c, _ in refined], axis=1), np.concatenate([p for _, p in refined]))
+
+        (_, cell_row, cell_col), members = pairs
+        owners = cell_row * columns + cell_col
+        by_cell = np.lexsort((members, owners))
+        owners, members = owners[by_cell], members[by_cell]
+        per_cell = np.bincount(owners, minlength=cell_count)
+        width = int(per_cell.max())
+        table = np.full((cell_count, width), -1, dtype=np.int32)
+        table[owners, np.arange(len(owners)) - np.repeat(np.cumsum(per_cell) - per_cell, per_cell)] = members
+        logger.info(f"Built {columns}x{rows} nearest-point grid over {len(xy)} points, {width} candidates per cell.")
+        return cls(xy, (float(low[0]), float(low[1])), float(cell_size), (columns, rows), table)
+
+    def nearest(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Index of the nearest point for each query; -1 for queries outside the grid."""
+        result = np.full(len(x), -1, dtype=np.int32)
+        columns, rows = self.shape
+        for start in range(0, len(x), QUERY_CHUNK):
+            qx, qy = x[start:start + QUERY_CHUNK], y[start:start + QUERY_CHUNK]
+            col = np.floor((qx - self.origin[0]) / self.cell_size).astype(np.int64)
+            row = np.floor((qy - self.origin[1]) / self.cell_size).astype(np.int64)
+            inside = (col >= 0) & (col < columns) & (row >= 0) & (row < rows)
+            if not inside.any():
+                continue
+            cells = (row * columns + col)[inside]
+            candidates = np.asarray(self.table[cells])
+            valid = candidates >= 0
+            points = self.xy[np.where(valid, candidates, 0)]
+            d2 = (points[..., 0] - qx[inside][:, None]) ** 2 + (points[..., 1] - qy[inside][:, None]) ** 2
+            d2[~valid] = np.inf
+            best = candidates[np.arange(len(cells)), d2.argmin(axis=1)]
+            chunk_result = result[start:start + QUERY_CHUNK]
+            chunk_result[inside] = best
+        return result
+
+    def arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {f"{prefix}_xy": self.xy, f"{prefix}_table": self.table}
+
+    def meta(self) -> dict:
+        return {"origin": list(self.origin), "cell_size": self.cell_size, "shape": list(self.shape)}
+
+    @classmethod
+    def from_arrays(cls, prefix: str, arrays: Dict[str, np.ndarray], meta: dict) -> "PointGrid":
+        return cls(arrays[f"{prefix}_xy"], tuple(meta["origin"]), meta["cell_size"],
+                   tuple(meta["shape"]), arrays[f"{prefix}_table"])
+
+
+def _refine_candidates(xy: np.ndarray, low: np.ndarray, size: float, cells: np.ndarray, points: np.ndarray,
+                       slack: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Keep the (cell, point) pairs whose point is no farther from the cell than the smallest
+    worst-case distance of any point paired with that cell. `cells` holds (code, row, col)
+    rows for cells `size` wide, with pairs grouped by code. `slack` keeps borderline pairs
+    at coarse levels, where cell edges can round differently from their children's.
+    """
+    cx0 = low[0] + cells[2] * size
+    cy0 = low[1] + cells[1] * size
+    cx1, cy1 = cx0 + size, cy0 + size
+    px, py = xy[points, 0], xy[points, 1]
+    near = np.maximum(np.maximum(cx0 - px, px - cx1), 0) ** 2 + np.maximum(np.maximum(cy0 - py, py - cy1), 0) ** 2
+    far = np.maximum(np.abs(px - cx0), np.abs(px - cx1)) ** 2 + np.maximum(np.abs(py - cy0), np.abs(py - cy1)) ** 2
+    group_starts = np.flatnonzero(np.r_[True, cells[0, 1:] != cells[0, :-1]])
+    bound = np.repeat(np.minimum.reduceat(far, group_starts), np.diff(np.r_[group_starts, len(points)]))
+    keep = near <= (bound * (1 + 1e-9) + 1e-18 if slack else bound)
+    return cells[:, keep], points[keep]
+
+
+class PolygonIndex:
+    """
+    Point-in-polygon over one layer of (multi)polygons. Rings are stored back to back in
+    `coords` (lon, lat); bounding boxes are grouped into STR-packed leaves so a query only
+    ray-casts against polygons whose leaf and own box contain the point.
+    """
+
+    def __init__(self, coords, ring_offsets, polygon_rings, bbox, area, leaf_bbox, leaf_offsets, leaf_members):
+        self.coords = coords
+        self.ring_offsets = ring_offsets      # ring r is coords[ring_offsets[r]:ring_offsets[r + 1]]
+        self.polygon_rings = polygon_rings    # polygon p owns rings polygon_rings[p]:polygon_rings[p + 1]
+        self.bbox = bbox                      # (min lon, min lat, max lon, max lat) per polygon
+        self.area = area                      # bounding-box area; overlapping polygons resolve to the smaller
+        self.leaf_bbox = leaf_bbox
+        self.leaf_offsets = leaf_offsets
+        self.leaf_members = leaf_members
+
+    @classmethod
+    def build(cls, polygons: Sequence[List[np.ndarray]]) -> "PolygonIndex":
+        """`polygons[p]` is the list of rings (outer boundaries and holes) of feature p."""
+        coords, ring_offsets, polygon_rings, bbox = [], [0], [0], []
+        for rings in polygons:
+            rings = [np.asarray(ring, dtype=np.float64) for ring in rings]
+            for ring in rings:
+                if not np.array_equal(ring[0], ring[-1]):
+                    ring = np.vstack([ring, ring[:1]])
+                coords.append(ring)
+                ring_offsets.append(ring_offsets[-1] + len(ring))
+            polygon_rings.append(len(ring_offsets) - 1)
+            stacked = np.vstack(rings)
+            bbox.append([*stacked.min(axis=0), *stacked.max(axis=0)])
+        bbox = np.asarray(bbox, dtype=np.float64).reshape(-1, 4)
+
+        # Sort-Tile-Recursive packing: vertical slices by box centre x, then runs by centre y
+        count = len(bbox)
+        leaves = max(1, math.ceil(count / STR_NODE_CAPACITY))
+        slices = max(1, math.ceil(math.sqrt(leaves)))
+        order = np.argsort((bbox[:, 0] + bbox[:, 2]) / 2, kind="stable")
+        per_slice = slices * STR_NODE_CAPACITY
+        members, leaf_offsets, leaf_bbox = [], [0], []
+        for start in range(0, count, per_slice):
+            in_slice = order[start:start + per_slice]
+            in_slice = in_slice[np.argsort((bbox[in_slice, 1] + bbox[in_slice, 3]) / 2, kind="stable")]
+            for leaf_start in range(0, len(in_slice), STR_NODE_CAPACITY):
+                leaf = in_slice[leaf_start:leaf_start + STR_NODE_CAPACITY]
+                members.extend(leaf)
+                leaf_offsets.append(len(members))
+                leaf_bbox.append([*bbox[leaf, :2].min(axis=0), *bbox[leaf, 2:].max(axis=0)])
+
+        return cls(
+            np.vstack(coords) if coords else np.zeros((0, 2)),
+            np.asarray(ring_offsets, dtype=np.int64),
+            np.asarray(polygon_rings, dtype=np.int64),
+            bbox,
+            (bbox[:, 2] - bbox[:, 0]) * (bbox[:, 3] - bbox[:, 1]),
+            np.asarray(leaf_bbox, dtype=np.float64).reshape(-1, 4),
+            np.asarray(leaf_offsets, dtype=np.int64),
+            np.asarray(members, dtype=np.int32)
+        )
+
+    def _contains(self, polygon: int, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        """Even-odd ray casting over all rings (holes flip the result back), in blocks of edges and points."""
+        crossings = np.zeros(len(lon), dtype=np.int64)
+        for ring in range(self.polygon_rings[polygon], self.polygon_rings[polygon + 1]):
+            ring_coords = np.asarray(self.coords[self.ring_offsets[ring]:self.ring_offsets[ring + 1]])
+            edges = len(ring_coords) - 1
+            # At most QUERY_CHUNK (point, edge) pairs per step
+            edge_block = max(1, min(edges, QUERY_CHUNK))
+            point_block = max(1, QUERY_CHUNK // edge_block)
+            for e in range(0, edges, edge_block):
+                xi, yi = ring_coords[e:e + edge_block, 0], ring_coords[e:e + edge_block, 1]
+                xj, yj = ring_coords[e + 1:e + edge_block + 1, 0], ring_coords[e + 1:e + edge_block + 1, 1]
+                for p in range(0, len(lon), point_block):
+                    qlon, qlat = lon[p:p + point_block, None], lat[p:p + point_block, None]
+                    straddles = (yi > qlat) != (yj > qlat)
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        crossing_x = xi + (qlat - yi) * (xj - xi) / (yj - yi)
+                    crossings[p:p + point_block] += np.count_nonzero(straddles & (qlon < crossing_x), axis=1)
+        return crossings % 2 == 1
+
+    def locate(self, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        """Index of the polygon containing each point (the smaller one where they overlap); -1 where none does."""
+        result = np.full(len(lon), -1, dtype=np.int32)
+        best_area = np.full(len(lon), np.inf)
+        for leaf in range(len(self.leaf_bbox)):
+            minx, miny, maxx, maxy = self.leaf_bbox[leaf]
+            in_leaf = np.nonzero((lon >= minx) & (lon <= maxx) & (lat >= miny) & (lat <= maxy))[0]
+            if not len(in_leaf):
+                continue
+            for polygon in self.leaf_members[self.leaf_offsets[leaf]:self.leaf_offsets[leaf + 1]]:
+                pminx, pminy, pmaxx, pmaxy = self.bbox[polygon]
+                qlon, qlat = lon[in_leaf], lat[in_leaf]
+                hits = in_leaf[(qlon >= pminx) & (qlon <= pmaxx) & (qlat >= pminy) & (qlat <= pmaxy)]
+                if not len(hits):
+                    continue
+                hits = hits[self._contains(polygon, lon[hits], lat[hits])]
+                smaller = hits[self.area[polygon] < best_area[hits]]
+                result[smaller] = polygon
+                best_area[smaller] = self.area[polygon]
+        return result
+
+    def arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {f"{prefix}_{name}": getattr(self, name) for name in
+                ("coords", "ring_offsets", "polygon_rings", "bbox", "area", "leaf_bbox", "leaf_offsets", "leaf_members")}
+
+    @classmethod
+    def from_arrays(cls, prefix: str, arrays: Dict[str, np.ndarray]) -> "PolygonIndex":
+        return cls(*(arrays[f"{prefix}_{name}"] for name in
+                     ("coords", "ring_offsets", "polygon_rings", "bbox", "area", "leaf_bbox", "leaf_offsets", "leaf_members")))
+
+
+def load_polygon_layers(path) -> Dict[str, Tuple[List[str], List[List[np.ndarray]]]]:
+    """
+    Read jurisdiction polygons from a GeoJSON FeatureCollection. Each feature needs
+    properties "layer" ("police_station" or "district") and "name"; geometry is a Polygon
+    or MultiPolygon. Returns {layer: (names, rings per feature)}.
+    """
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+    layers: Dict[str, Tuple[List[str], List[List[np.ndarray]]]] = {}
+    for number, feature in enumerate(collection.get("features", [])):
+        properties = feature.get("properties") or {}
+        geometry = feature.get("geometry") or {}
+        layer = properties.get("layer")
+        if layer not in JURISDICTION_LAYERS or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+            logger.warning(f"Skipping feature {number} of {path}: needs a known 'layer' and a (Multi)Polygon geometry")
+            continue
+        polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+        names, rings = layers.setdefault(layer, ([], []))
+        names.append(properties.get("name") or f"{layer} {number}")
+        rings.append([np.asarray(ring, dtype=np.float64)[:, :2] for polygon in polygons for ring in polygon])
+    return layers
+
+
+class ReverseGeocoder:
+    """Bulk and single-point reverse geocoding over a saved or freshly built index."""
+
+    def __init__(self, meta: dict, arrays: Dict[str, np.ndarray]):
+        self.meta = meta
+        self.arrays = arrays
+        self.cos_lat0 = math.cos(math.radians(meta["lat0"]))
+        self.place_names: List[str] = meta["places"]["names"]
+        self.place_ids: List[str] = meta["places"]["ids"]
+        self.place_lat = arrays["place_lat"]
+        self.place_lon = arrays["place_lon"]
+        self.place_grid = PointGrid.from_arrays("place", arrays, meta["place_grid"])
+
+        self.labels: Dict[str, List[str]] = {}
+        self.polygons: Dict[str, PolygonIndex] = {}
+        for layer in JURISDICTION_LAYERS:
+            source = meta["jurisdictions"][layer]
+            self.labels[layer] = source["names"]
+            if source["kind"] == "polygon":
+                self.polygons[layer] = PolygonIndex.from_arrays(layer, arrays)
+        self.station_grid = (PointGrid.from_arrays("station", arrays, meta["station_grid"])
+                             if "station_grid" in meta else None)
+        self.place_district = arrays["place_district"]
+
+    @classmethod
+    def build(cls, gazetteer: Gazetteer, polygons_path: Optional[str] = None) -> "ReverseGeocoder":
+        places = [p for p in gazetteer.places.values() if p.type in NEAREST_PLACE_TYPES and p.lat is not None]
+        if not places:
+            raise ValueError("The gazetteer has no places with coordinates")
+        lat0 = float(np.mean([p.lat for p in places]))
+        cos_lat0 = math.cos(math.radians(lat0))
+
+        def project(points) -> np.ndarray:
+            return np.array([[p.lon * cos_lat0, p.lat] for p in points], dtype=np.float64)
+
+        districts = sorted({p.name for p in gazetteer.places.values() if p.type == "district"})
+        district_of = []
+        for place in places:
+            district = next((a.name for a in gazetteer.ancestors(place.id) if a.type == "district"), None)
+            district_of.append(districts.index(district) if district in districts else -1)
+
+        place_grid = PointGrid.build(project(places))
+        arrays = {
+            "place_lat": np.array([p.lat for p in places], dtype=np.float64),
+            "place_lon": np.array([p.lon for p in places], dtype=np.float64),
+            "place_district": np.array(district_of, dtype=np.int32),
+            **place_grid.arrays("place")
+        }
+        meta = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "gazetteer_fingerprint": gazetteer.fingerprint,
+            "lat0": lat0,
+            "places": {"ids": [p.id for p in places], "names": [p.name for p in places]},
+            "place_grid": place_grid.meta(),
+            "jurisdictions": {}
+        }
+
+        layers = load_polygon_layers(polygons_path) if polygons_path else {}
+        meta["polygons_fingerprint"] = _file_fingerprint(polygons_path) if polygons_path else None
+        # Kept so a rebuild after a gazetteer change uses the same polygon layers
+        meta["polygons_path"] = str(Path(polygons_path).resolve()) if polygons_path else None
+        for layer in JURISDICTION_LAYERS:
+            if layer in layers:
+                names, rings = layers[layer]
+                arrays.update(PolygonIndex.build(rings).arrays(layer))
+                meta["jurisdictions"][layer] = {"kind": "polygon", "names": names}
+            elif layer == "police_station":
+                stations = [p for p in gazetteer.places.values() if p.type == "police_station" and p.lat is not None]
+                if stations:
+                    station_grid = PointGrid.build(project(stations))
+                    arrays.update(station_grid.arrays("station"))
+                    meta["station_grid"] = station_grid.meta()
+                meta["jurisdictions"][layer] = {"kind": "nearest_point", "names": [p.name for p in stations]}
+            else:
+                meta["jurisdictions"][layer] = {"kind": "hierarchy", "names": districts}
+        return cls(meta, arrays)
+
+    def save(self, index_dir: str = INDEX_DIR):
+        """
+        Write the index into a new subdirectory, then atomically point CURRENT at it. Earlier
+        versions are removed afterwards; processes that still have them mapped keep working,
+        since unlinked files stay readable until unmapped.
+        """
+        index_path = Path(index_dir)
+        index_path.mkdir(parents=True, exist_ok=True)
+        version_path = Path(tempfile.mkdtemp(prefix="index-", dir=index_path))
+        for name, array in self.arrays.items():
+            np.save(version_path / f"{name}.npy", np.ascontiguousarray(array))
+        with open(version_path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+
+        pointer = index_path / f"{CURRENT_FILE}.{os.getpid()}.tmp"
+        pointer.write_text(version_path.name, encoding="utf-8")
+        os.replace(pointer, index_path / CURRENT_FILE)
+
+        for old in index_path.glob("index-*"):
+            if old != version_path:
+                shutil.rmtree(old, ignore_errors=True)
+        # Files of the flat layout written by earlier versions
+        for stale in [*index_path.glob("*.npy"), index_path / "meta.json"]:
+            if stale.exists():
+                stale.unlink()
+
+    @classmethod
+    def load(cls, index_dir: str = INDEX_DIR, mmap: bool = True) -> "ReverseGeocoder":
+        index_path = Path(index_dir)
+        index_path = index_path / (index_path / CURRENT_FILE).read_text(encoding="utf-8").strip()
+        with open(index_path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported reverse geocoder index format {meta.get('format_version')}")
+        arrays = {path.stem: np.load(path, mmap_mode="r" if mmap else None)
+                  for path in index_path.glob("*.npy")}
+        return cls(meta, arrays)
+
+    @classmethod
+    def load_or_build(cls, index_dir: str = INDEX_DIR, gazetteer_path=DEFAULT_GAZETTEER_PATH,
+                      polygons_path: Optional[str] = None) -> "ReverseGeocoder":
+        """
+        Load the saved index, rebuilding it when missing or built from another gazetteer or
+        polygon file. A rebuild uses `polygons_path`, else the polygon file the saved index
+        was built with.
+        """
+        gazetteer = Gazetteer.from_jsonl(gazetteer_path)
+        try:
+            geocoder = cls.load(index_dir)
+            polygons_path = polygons_path or geocoder.meta.get("polygons_path")
+            polygons_fingerprint = _file_fingerprint(polygons_path) if polygons_path else None
+            if (geocoder.meta.get("gazetteer_fingerprint") == gazetteer.fingerprint
+                    and geocoder.meta.get("polygons_fingerprint") == polygons_fingerprint):
+                return geocoder
+            logger.info("Gazetteer or polygons changed since the reverse geocoder index was built, rebuilding.")
+        except (OSError, ValueError, KeyError) as e:
+            logger.info(f"No usable reverse geocoder index at {index_dir} ({e}), building one.")
+        if polygons_path and not Path(polygons_path).exists():
+            logger.warning(f"Polygon file {polygons_path} is missing; rebuilding the reverse geocoder without it.")
+            polygons_path = None
+        geocoder = cls.build(gazetteer, polygons_path)
+        try:
+            geocoder.save(index_dir)
+        except OSError as e:
+            logger.warning(f"Could not save the reverse geocoder index to {index_dir}: {e}")
+        return geocoder
+
+    def lookup(self, lats, lons) -> Dict[str, np.ndarray]:
+        """
+        Bulk reverse geocoding. Returns arrays aligned with the input:
+          place           index into place_names of the nearest named place (-1 outside coverage)
+          distance_km     great-circle distance to that place
+          police_station  index into labels["police_station"] (-1 if unknown)
+          district        index into labels["district"] (-1 if unknown)
+        """
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        lons = np.asarray(lons, dtype=np.float64).ravel()
+        if lats.shape != lons.shape:
+            raise ValueError("lats and lons must have the same length")
+        x, y = lons * self.cos_lat0, lats
+
+        place = self.place_grid.nearest(x, y)
+        found = place >= 0
+        distance = np.full(len(lats), np.nan)
+        distance[found] = haversine_km(lats[found], lons[found], self.place_lat[place[found]], self.place_lon[place[found]])
+
+        if "police_station" in self.polygons:
+            station = self.polygons["police_station"].locate(lons, lats)
+        elif self.station_grid is not None:
+            station = self.station_grid.nearest(x, y)
+        else:
+            station = np.full(len(lats), -1, dtype=np.int32)
+
+        if "district" in self.polygons:
+            district = self.polygons["district"].locate(lons, lats)
+        else:
+            district = np.where(found, np.asarray(self.place_district)[np.maximum(place, 0)], -1).astype(np.int32)
+
+        return {"place": place, "distance_km": distance, "police_station": station, "district": district}
+
+    def reverse(self, lat: float, lon: float) -> dict:
+        """Names for a single coordinate pair; None for anything outside coverage."""
+        result = self.lookup([lat], [lon])
+        place = int(result["place"][0])
+
+        def label(layer: str) -> Optional[str]:
+            index = int(result[layer][0])
+            return self.labels[layer][index] if index >= 0 else None
+
+        return {
+            "place": self.place_names[place] if place >= 0 else None,
+            "place_id": self.place_ids[place] if place >= 0 else None,
+            "distance_km": None if place < 0 else round(float(result["distance_km"][0]), 3),
+            "police_station": label("police_station"),
+            "district": label("district")
+        }
+
+
+def _file_fingerprint(path) -> Optional[str]:
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()[:16]
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline reverse geocoding over the local gazetteer.")
+    parser.add_argument("--index", default=INDEX_DIR, help="index directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build and save the index")
+    build.add_argument("--gazetteer", default=str(DEFAULT_GAZETTEER_PATH), help="gazetteer JSONL")
+    build.add_argument("--polygons", default=None, help="GeoJSON of police_station / district polygons")
+    lookup = commands.add_parser("lookup", help="reverse geocode LAT LON pairs")
+    lookup.add_argument("coords", nargs="+", type=float, help="LAT LON [LAT LON ...]")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        geocoder = ReverseGeocoder.build(Gazetteer.from_jsonl(args.gazetteer), args.polygons)
+        geocoder.save(args.index)
+        print(f"Saved reverse geocoder index ({len(geocoder.place_names)} places) to {args.index}")
+        return
+
+    if len(args.coords) % 2:
+        parser.error("lookup needs LAT LON pairs")
+    geocoder = ReverseGeocoder.load_or_build(args.index)
+    for lat, lon in zip(args.coords[::2], args.coords[1::2]):
+        print(json.dumps({"lat": lat, "lon": lon, **geocoder.reverse(lat, lon)}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,6 +1,12 @@
-from typing import Dict, List, Optional, Union, Literal
-from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple, Union, Literal
+import pydantic_core
+from pydantic import BaseModel, Field, PrivateAttr, TypeAdapter, field_validator
 from datetime import datetime
+from collections import Counter
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from functools import lru_cache
+from types import MappingProxyType
 
 FIELD_VALUE_SCHEMA = {
     "event_type": [
@@ -88,21 +94,106 @@ ALL_CLASSIFICATION_FIELDS = [
     "children_involved"
 ]
 
+class FuzzyIndex:
+    """
+    Immutable index over a fixed list of strings for closest-match lookups.
+
+    `closest(word, cutoff)` returns exactly what `difflib.get_close_matches(word, values, n=1,
+    cutoff=cutoff)` would, but candidates are bucketed by length: only buckets whose length
+    can reach `cutoff` against the word are visited at all. Within them, precomputed character
+    counts reject most candidates by the character-overlap upper bound before any
+    SequenceMatcher work. Results are memoized per (word, cutoff).
+    """
+
+    def __init__(self, values):
+        self.values = tuple(values)
+        buckets: Dict[int, List[Tuple[str, Counter]]] = {}
+        for value in self.values:
+            buckets.setdefault(len(value), []).append((value, Counter(value)))
+        self._buckets = {length: tuple(entries) for length, entries in buckets.items()}
+        self._bucket_lengths = tuple(sorted(self._buckets))
+        self.closest = lru_cache(maxsize=8192)(self._closest)
+
+    def _length_range(self, word_length: int, cutoff: float) -> Tuple[float, float]:
+        """
+        Candidate lengths L with 2 * min(L, n) / (L + n) >= cutoff (SequenceMatcher.real_quick_ratio)
+        lie in [n * c / (2 - c), n * (2 - c) / c]; widened by one so float rounding never drops
+        a bucket, the exact bound is still checked per bucket.
+        """
+        if cutoff <= 0:
+            return 0, float("inf")
+        return word_length * cutoff / (2 - cutoff) - 1, word_length * (2 - cutoff) / cutoff + 1
+
+    def _closest(self, word: str, cutoff: float = 0.6) -> Optional[str]:
+        word_length = len(word)
+        word_counts = Counter(word)
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+
+        best = None
+        low, high = self._length_range(word_length, cutoff)
+        for length in self._bucket_lengths:
+            if length < low:
+                continue
+            if length > high:
+                break
+            total = length + word_length
+            # Same bounds, in the same order, as SequenceMatcher.real_quick_ratio / quick_ratio
+            if _ratio(min(length, word_length), total) < cutoff:
+                continue
+            for value, counts in self._buckets[length]:
+                overlap = sum(min(n, word_counts[ch]) for ch, n in counts.items() if ch in word_counts)
+                if _ratio(overlap, total) < cutoff:
+                    continue
+                matcher.set_seq1(value)
+                score = matcher.ratio()
+                # get_close_matches keeps the largest (score, value) pair
+                if score >= cutoff and (best is None or (score, value) > best):
+                    best = (score, value)
+
+        return best[1] if best else None
+
+
+def _ratio(matches: int, length: int) -> float:
+    return 2.0 * matches / length if length else 1.0
+
+
+@dataclass(frozen=True)
+class SchemaIndex:
+    """Precomputed, read-only lookups over FIELD_VALUE_SCHEMA for validation and correction."""
+    event_types: FrozenSet[str]          # upper-cased
+    event_sub_types: FrozenSet[str]      # upper-cased
+    states_of_victim: FrozenSet[str]     # upper-cased
+    victim_genders: FrozenSet[str]       # lower-cased
+    sub_type_to_event_type: Mapping[str, str]
+    sub_type_matcher: FuzzyIndex
+
+
+def _build_schema_index() -> SchemaIndex:
+    sub_type_to_event_type = {}
+    for event_type_key, sub_types_list in FIELD_VALUE_SCHEMA['event_sub_type'].items():
+        for st in sub_types_list:
+            # A sub-type listed under several event types belongs to the first one
+            sub_type_to_event_type.setdefault(st.upper(), event_type_key)
+
+    return SchemaIndex(
+        event_types=frozenset(et.upper() for et in FIELD_VALUE_SCHEMA["event_type"]),
+        event_sub_types=frozenset(st.upper() for st in ALL_EVENT_SUB_TYPES),
+        states_of_victim=frozenset(sv.upper() for sv in FIELD_VALUE_SCHEMA["state_of_victim"]),
+        victim_genders=frozenset(vg.lower() for vg in FIELD_VALUE_SCHEMA["victim_gender"]),
+        sub_type_to_event_type=MappingProxyType(sub_type_to_event_type),
+        sub_type_matcher=FuzzyIndex(ALL_EVENT_SUB_TYPES)
+    )
+
+
+SCHEMA_INDEX = _build_schema_index()
+
+
 def derive_event_type(sub_type: str) -> str:
     """Derive event_type from event_sub_type, handling 'OTHERS' specially."""
-    sub_type_upper = sub_type.upper()
-    
-    # If the sub_type is "OTHERS" (meaning it was originally "OTHERS: <label>" or just "OTHERS"),
-    # then its event_type is always "OTHERS".
-    if sub_type_upper == 'OTHERS':
-        return 'OTHERS'
-        
-    for event_type_key, sub_types_list in FIELD_VALUE_SCHEMA['event_sub_type'].items():
-        if sub_type_upper in [st.upper() for st in sub_types_list]:
-            return event_type_key
-    
-    # Fallback for any sub_type not found (should ideally not happen with good LLM output)
-    return 'OTHERS'
+    # "OTHERS" (originally "OTHERS: <label>" or just "OTHERS") maps to "OTHERS" through the index too;
+    # any sub_type not found also falls back to "OTHERS" (should ideally not happen with good LLM output)
+    return SCHEMA_INDEX.sub_type_to_event_type.get(sub_type.upper(), 'OTHERS')
 
 
 class ProcessedOutput(BaseModel):
@@ -137,6 +228,15 @@ class ProcessedOutput(BaseModel):
     # NEW FIELD: This will store the specific detail when event_sub_type is "OTHERS"
     generated_event_sub_type_detail: Optional[str] = None
 
+    # Per-stage timings and provider-reported LLM stats; not a schema field, so it never
+    # reaches the prompt, the parser or model_dump() unless a caller asks for it
+    _processing_metrics: Optional[Dict[str, Dict[str, float]]] = PrivateAttr(default=None)
+
+    @property
+    def processing_metrics(self) -> Optional[Dict[str, Dict[str, float]]]:
+        """{"stages": {stage: seconds}, "llm": {...}} for the request that produced this output."""
+        return self._processing_metrics
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -162,7 +262,7 @@ class ProcessedOutput(BaseModel):
     def validate_event_type(cls, v: str) -> str:
         """Validate event_type"""
         # Ensure 'OTHERS' is also covered by upper casing for validation consistency
-        if v.upper() not in [et.upper() for et in FIELD_VALUE_SCHEMA["event_type"]]:
+        if v.upper() not in SCHEMA_INDEX.event_types:
             raise ValueError(f"Invalid event_type: {v}")
         return v # Return original casing, or v.upper() if your system strictly uses upper
 
@@ -171,7 +271,7 @@ class ProcessedOutput(BaseModel):
     def validate_event_sub_type(cls, v: str) -> str:
         """Validate event_sub_type"""
         # This validator will only see 'OTHERS' or a valid ALL_EVENT_SUB_TYPES value
-        if v.upper() not in [st.upper() for st in ALL_EVENT_SUB_TYPES]:
+        if v.upper() not in SCHEMA_INDEX.event_sub_types:
             raise ValueError(f"Invalid event_sub_type: {v}")
         return v # Return original casing, or v.upper()
 
@@ -179,7 +279,7 @@ class ProcessedOutput(BaseModel):
     @classmethod
     def validate_state_of_victim(cls, v: str) -> str:
         """Validate state_of_victim"""
-        if v.upper() not in [sv.upper() for sv in FIELD_VALUE_SCHEMA["state_of_victim"]]:
+        if v.upper() not in SCHEMA_INDEX.states_of_victim:
             raise ValueError(f"Invalid state_of_victim: {v}")
         return v # Return original casing, or v.upper()
 
@@ -187,10 +287,27 @@ class ProcessedOutput(BaseModel):
     @classmethod
     def validate_victim_gender(cls, v: str) -> str:
         """Validate victim_gender"""
-        if v.lower() not in [vg.lower() for vg in FIELD_VALUE_SCHEMA["victim_gender"]]:
+        if v.lower() not in SCHEMA_INDEX.victim_genders:
             raise ValueError(f"Invalid victim_gender: {v}")
         return v # Return original casing, or v.lower()
 
+class LocationOutput(BaseModel):
+    """Result of the location-only extraction mode: just what is needed to place the map pin."""
+    timestamp: datetime = Field(default_factory=datetime.now)
+    processing_time: float
+    file_name: str
+    file_text: str
+    incident_location: Optional[str] = "not specified"
+    area: Optional[str] = "not specified"
+    location_source: str = "llm"  # "llm", or "gazetteer" when the offline place matcher answered
+
+    _processing_metrics: Optional[Dict[str, Dict[str, Any]]] = PrivateAttr(default=None)
+
+    @property
+    def processing_metrics(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """{"stages": {...}, "llm": {...}, "gazetteer": {...}} for the request that produced this output."""
+        return self._processing_metrics
+
 # --- GroundTruthOutput Schema (No changes needed, but included for completeness) ---
 class GroundTruthOutput(BaseModel):
     """
@@ -222,4 +339,42 @@ class GroundTruthOutput(BaseModel):
     mode_of_threat: Optional[str] = None
     need_ambulance: Optional[str] = None
     children_involved: Optional[str] = None
-    generated_event_sub_type_detail: Optional[str] = None 
\ No newline at end of file
+    generated_event_sub_type_detail: Optional[str] = None 
+
+
+class BatchItemError(BaseModel):
+    """A per-item failure reported by batch processing in place of a ProcessedOutput."""
+    index: int
+    file_name: str
+    error: str
+    error_type: str
+
+
+# --- Bulk validation / serialization for batch exports ---
+# Adapters are built once; building one compiles a validator and serializer
+PROCESSED_OUTPUT_ADAPTER = TypeAdapter(ProcessedOutput)
+PROCESSED_OUTPUT_LIST_ADAPTER = TypeAdapter(List[ProcessedOutput])
+
+
+def validate_processed_outputs(records: List[dict]) -> List[ProcessedOutput]:
+    """Validate a list of extracted dicts into ProcessedOutput objects in a single pass."""
+    return PROCESSED_OUTPUT_LIST_ADAPTER.validate_python(records)
+
+
+def dump_trusted_records_json(records: List[dict]) -> bytes:
+    """
+    Trusted mode: serialize already-validated, normalized ProcessedOutput dicts (e.g. from
+    model_dump() or a re-loaded export) straight to a JSON array without building models.
+    Nothing is checked, so only use it for data that has been through validation before.
+    """
+    return pydantic_core.to_json(records)
+
+
+def dump_processed_outputs_json(outputs: List[ProcessedOutput]) -> bytes:
+    """Serialize a list of ProcessedOutput objects straight to a JSON array (UTF-8 bytes)."""
+    return PROCESSED_OUTPUT_LIST_ADAPTER.dump_json(outputs)
+
+
+def dump_processed_outputs_jsonl(outputs: List[ProcessedOutput]) -> bytes:
+    """Serialize ProcessedOutput objects to JSON lines (UTF-8 bytes, one object per line)."""
+    return b"".join(PROCESSED_OUTPUT_ADAPTER.dump_json(output) + b"\n" for output in outputs)
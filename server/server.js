@@ -3,7 +3,6 @@ const cors = require('cors');
 const { spawn } = require('child_process');
 const path = require('path');
 const multer = require('multer');
-const fs = require('fs');
 
 const app = express();
 const PORT = 5002;
@@ -11,8 +10,9 @@ const PORT = 5002;
 const STATE = "Uttarakhand"
 
 
+// Keep uploads in memory; they are piped straight to the transcription script
 const upload = multer({
-  dest: 'uploads/',
+  storage: multer.memoryStorage(),
   limits: {
     fileSize: 10 * 1024 * 1024
   },
@@ -30,69 +30,283 @@ const upload = multer({
 app.use(cors());
 app.use(express.json());
 
-// Ensure uploads directory exists
-if (!fs.existsSync('uploads')) {
-  fs.mkdirSync('uploads');
-}
+// Number of warm llm_processor.py workers kept alive for /extract-location
+const LLM_WORKER_COUNT = parseInt(process.env.LLM_WORKERS || '2', 10);
+const LLM_REQUEST_TIMEOUT_MS = parseInt(process.env.LLM_REQUEST_TIMEOUT_MS || '180000', 10);
+// Metrics are answered outside the workers' LLM queue, so a scrape only waits this long
+const METRICS_TIMEOUT_MS = parseInt(process.env.METRICS_TIMEOUT_MS || '5000', 10);
+// Geocoding also runs outside the LLM queue (cache lookups, gazetteer, external geocoders)
+const GEOCODE_TIMEOUT_MS = parseInt(process.env.GEOCODE_TIMEOUT_MS || '30000', 10);
+// A worker that dies before becoming ready is restarted with exponential backoff, and its
+// slot is given up after LLM_WORKER_MAX_RESTARTS consecutive failures (e.g. an import error)
+const LLM_WORKER_RESTART_DELAY_MS = parseInt(process.env.LLM_WORKER_RESTART_DELAY_MS || '500', 10);
+const LLM_WORKER_MAX_RESTART_DELAY_MS = parseInt(process.env.LLM_WORKER_MAX_RESTART_DELAY_MS || '30000', 10);
+const LLM_WORKER_MAX_RESTARTS = parseInt(process.env.LLM_WORKER_MAX_RESTARTS || '8', 10);
 
-// Function to call Python LLM processor
-function callPythonProcessor(text) {
-  return new Promise((resolve, reject) => {
-    const pythonScriptPath = path.join(__dirname, 'llm_processor.py');
-    
-    // Spawn Python process
-    const pythonProcess = spawn('python', [pythonScriptPath], {
+// One long-lived `python llm_processor.py --worker` process speaking JSON lines
+class PythonWorker {
+  constructor(scriptPath, onExit) {
+    this.pending = new Map();
+    this.buffer = '';
+    this.errorOutput = '';
+    this.exited = false;
+    this.ready = false;
+
+    this.process = spawn('python', [scriptPath, '--worker'], {
       stdio: ['pipe', 'pipe', 'pipe']
     });
 
-    let output = '';
-    let errorOutput = '';
+    this.process.stdout.on('data', (data) => {
+      this.buffer += data.toString();
+      let newlineIndex;
+      while ((newlineIndex = this.buffer.indexOf('\n')) >= 0) {
+        const line = this.buffer.slice(0, newlineIndex).trim();
+        this.buffer = this.buffer.slice(newlineIndex + 1);
+        if (line) {
+          this.handleLine(line);
+        }
+      }
+    });
 
-    // Send input text to Python script
-    pythonProcess.stdin.write(JSON.stringify({ text: text }));
-    pythonProcess.stdin.end();
+    this.process.stderr.on('data', (data) => {
+      // Keep only the tail of stderr for error reporting
+      this.errorOutput = (this.errorOutput + data.toString()).slice(-4000);
+    });
 
-    // Collect output
-    pythonProcess.stdout.on('data', (data) => {
-      output += data.toString();
+    this.process.on('close', (code) => this.finish(code, onExit));
+
+    // Spawn failures (e.g. no python binary) may not be followed by 'close'
+    this.process.on('error', (error) => {
+      console.error('Python worker process error:', error.message);
+      this.errorOutput += error.message;
+      this.finish(null, onExit);
     });
+  }
 
-    pythonProcess.stderr.on('data', (data) => {
-      errorOutput += data.toString();
+  finish(code, onExit) {
+    if (this.exited) {
+      return;
+    }
+    this.exited = true;
+    for (const { reject, timer } of this.pending.values()) {
+      clearTimeout(timer);
+      reject(new Error(`Python worker exited with code ${code}: ${this.errorOutput}`));
+    }
+    this.pending.clear();
+    onExit(this, code);
+  }
+
+  handleLine(line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (parseError) {
+      console.error('Failed to parse Python worker output:', line);
+      return;
+    }
+
+    if (message.event === 'ready') {
+      this.ready = true;
+      console.log(`LLM worker ${message.pid} ready`);
+      return;
+    }
+
+    const entry = this.pending.get(message.id);
+    if (!entry) {
+      return;
+    }
+
+    // Intermediate streaming event; the final response follows later
+    if (message.event) {
+      if (entry.onEvent) {
+        entry.onEvent(message);
+      }
+      return;
+    }
+    this.pending.delete(message.id);
+    clearTimeout(entry.timer);
+
+    if (message.ok) {
+      entry.resolve(message.result);
+    } else {
+      entry.reject(new Error(`${message.type}: ${message.error}`));
+    }
+  }
+
+  // Requests on the worker's LLM queue kill it on timeout; `{ timeoutMs, queued: false }` is for
+  // ops answered outside that queue (metrics, geocode), whose timeout says nothing about a stuck LLM call
+  send(id, payload, onEvent, { timeoutMs = LLM_REQUEST_TIMEOUT_MS, queued = true } = {}) {
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Python worker timed out after ${timeoutMs}ms`));
+        if (queued) {
+          // The worker is still busy with the request; replace it rather than queue more work behind it
+          console.error(`LLM worker ${this.process.pid} timed out on request ${id}, killing it`);
+          this.process.kill('SIGKILL');
+        }
+      }, timeoutMs);
+
+      this.pending.set(id, { resolve, reject, timer, onEvent });
+      this.process.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
     });
+  }
+}
 
-    pythonProcess.on('close', (code) => {
-      if (code !== 0) {
-        console.error('Python script error:', errorOutput);
-        reject(new Error(`Python script exited with code ${code}: ${errorOutput}`));
+// Small pool of warm workers; requests go to the least busy one
+class PythonWorkerPool {
+  constructor(scriptPath, size) {
+    this.scriptPath = scriptPath;
+    this.size = Math.max(1, size);
+    this.workers = [];
+    this.failures = [];
+    this.nextId = 0;
+
+    for (let i = 0; i < this.size; i++) {
+      this.failures.push(0);
+      this.workers.push(this.spawnWorker());
+    }
+  }
+
+  spawnWorker() {
+    return new PythonWorker(this.scriptPath, (worker, code) => {
+      const index = this.workers.indexOf(worker);
+      if (index < 0) {
         return;
       }
-
-      try {
-        const result = JSON.parse(output.trim());
-        resolve(result);
-      } catch (parseError) {
-        console.error('Failed to parse Python output:', output);
-        reject(new Error('Failed to parse Python script output'));
+      // Only deaths before 'ready' count towards the backoff; a worker that served requests starts over
+      this.failures[index] = worker.ready ? 0 : this.failures[index] + 1;
+      if (this.failures[index] > LLM_WORKER_MAX_RESTARTS) {
+        console.error(`LLM worker exited with code ${code} ${this.failures[index]} times in a row without starting, giving up on it`);
+        return;
       }
+      const delay = this.failures[index] === 0
+        ? 0
+        : Math.min(LLM_WORKER_RESTART_DELAY_MS * 2 ** (this.failures[index] - 1), LLM_WORKER_MAX_RESTART_DELAY_MS);
+      console.error(`LLM worker exited with code ${code}, restarting in ${delay}ms`);
+      setTimeout(() => {
+        if (this.workers[index] === worker) {
+          this.workers[index] = this.spawnWorker();
+        }
+      }, delay);
     });
+  }
 
-    pythonProcess.on('error', (error) => {
-      reject(new Error(`Failed to start Python script: ${error.message}`));
-    });
-  });
+  request(payload, onEvent, options) {
+    const worker = this.workers
+      .filter((w) => !w.exited)
+      .reduce((best, w) => (!best || w.pending.size < best.pending.size ? w : best), null);
+
+    if (!worker) {
+      return Promise.reject(new Error('No Python worker available'));
+    }
+
+    const id = String(++this.nextId);
+    return worker.send(id, payload, onEvent, options);
+  }
+
+  // Send the same out-of-queue request to every live worker (e.g. to collect per-process metrics);
+  // resolves with the answers that arrived, and only fails if no worker answered
+  async broadcast(payload, timeoutMs) {
+    const workers = this.workers.filter((w) => !w.exited);
+    const settled = await Promise.allSettled(
+      workers.map((w) => w.send(String(++this.nextId), payload, null, { timeoutMs, queued: false }))
+    );
+    const answers = settled.filter((s) => s.status === 'fulfilled').map((s) => s.value);
+    if (!answers.length) {
+      const failure = settled.find((s) => s.status === 'rejected');
+      throw failure ? failure.reason : new Error('No Python worker available');
+    }
+    return answers;
+  }
+}
+
+// Merge Prometheus expositions from several workers: every sample carries a worker label,
+// but each metric family's HELP/TYPE lines must appear once with all its samples together
+function mergePrometheusText(texts) {
+  const families = new Map();
+  for (const text of texts) {
+    let current = null;
+    for (const line of text.split('\n')) {
+      if (!line) {
+        continue;
+      }
+      if (line.startsWith('# ')) {
+        const [, kind, name] = line.split(' ');
+        if (!families.has(name)) {
+          families.set(name, { help: null, type: null, samples: [] });
+        }
+        current = families.get(name);
+        if (kind === 'HELP' && !current.help) {
+          current.help = line;
+        } else if (kind === 'TYPE' && !current.type) {
+          current.type = line;
+        }
+      } else if (current) {
+        current.samples.push(line);
+      }
+    }
+  }
+
+  const lines = [];
+  for (const family of families.values()) {
+    lines.push(...[family.help, family.type].filter(Boolean), ...family.samples);
+  }
+  return lines.join('\n') + '\n';
+}
+
+const llmWorkerPool = new PythonWorkerPool(path.join(__dirname, 'llm_processor.py'), LLM_WORKER_COUNT);
+
+// Function to call Python LLM processor
+function callPythonProcessor(text) {
+  return llmWorkerPool.request({ text: text });
+}
+
+// Location-only extraction: short prompt and small output budget, just incident_location and area
+function callPythonLocationProcessor(text, onField) {
+  return llmWorkerPool.request(
+    { text: text, mode: 'location', stream: true },
+    (message) => {
+      if (message.event === 'field' && onField) {
+        onField(message.field, message.value);
+      }
+    }
+  );
+}
+
+// Coordinates for location strings from the cached server-side geocode service
+async function geocodeLocations(locations) {
+  const result = await llmWorkerPool.request(
+    { op: 'geocode', locations: locations },
+    null,
+    { timeoutMs: GEOCODE_TIMEOUT_MS, queued: false }
+  );
+  return result.results;
 }
 
 // Function to call Bhashini API for transcription
-function callBhashiniTranscription(audioFilePath) {
+function callBhashiniTranscription(audioBuffer, originalName) {
   return new Promise((resolve, reject) => {
     const pythonScriptPath = path.join(__dirname, 'transcribe_audio.py');
-    
+    const args = [pythonScriptPath, '-'];
+
+    // Pass the container format as a hint for decoding from stdin
+    const extension = path.extname(originalName || '').replace('.', '').toLowerCase();
+    if (extension) {
+      args.push('--format', extension);
+    }
+
     // Spawn Python process
-    const pythonProcess = spawn('python', [pythonScriptPath, audioFilePath], {
+    const pythonProcess = spawn('python', args, {
       stdio: ['pipe', 'pipe', 'pipe']
     });
 
+    // Send the audio bytes over stdin
+    pythonProcess.stdin.on('error', (error) => {
+      console.error('Error writing audio to transcription script:', error.message);
+    });
+    pythonProcess.stdin.end(audioBuffer);
+
     let output = '';
     let errorOutput = '';
 
@@ -189,7 +403,9 @@ app.post('/extract-location', async (req, res) => {
     console.log('Processing text with LLM...');
     
     // Call Python LLM processor
-    const processedData = await callPythonProcessor(text);
+    const processedData = await callPythonLocationProcessor(text, (field, value) => {
+      console.log(`Received ${field}:`, value);
+    });
     
     console.log('LLM processing complete:', processedData);
     
@@ -197,10 +413,24 @@ app.post('/extract-location', async (req, res) => {
     const locationString = formatLocationString(processedData);
     
     console.log('Formatted location:', locationString);
+
+    // A geocoding failure must not fail the extraction; the browser can still geocode the string
+    let coordinates = null;
+    try {
+      const [geocoded] = await geocodeLocations([locationString]);
+      // An approximate answer (e.g. the centroid of the town the address is in) would be a worse
+      // pin than the browser geocoder can place, so only exact answers are passed on
+      if (geocoded && geocoded.lat !== null && !String(geocoded.precision).startsWith('approximate')) {
+        coordinates = { lat: geocoded.lat, lng: geocoded.lon, source: geocoded.source, precision: geocoded.precision };
+      }
+    } catch (error) {
+      console.error('Error geocoding location:', error.message);
+    }
     
     // Send response
     res.json({ 
       location: locationString,
+      coordinates: coordinates,
       success: true,
       rawData: processedData, // Include raw processed data for debugging
       extractedFields: {
@@ -219,6 +449,29 @@ app.post('/extract-location', async (req, res) => {
   }
 });
 
+// Batch forward geocoding: { locations: ["Roorkee, Uttarakhand", ...] }
+app.post('/geocode', async (req, res) => {
+  try {
+    const { locations } = req.body;
+
+    if (!Array.isArray(locations) || locations.some(location => typeof location !== 'string')) {
+      return res.status(400).json({
+        error: 'Invalid request. locations must be an array of strings.'
+      });
+    }
+
+    const results = await geocodeLocations(locations);
+    res.json({ success: true, results: results });
+  } catch (error) {
+    console.error('Error geocoding locations:', error);
+    res.status(500).json({
+      error: 'Internal server error',
+      message: error.message || 'Failed to geocode the locations.',
+      success: false
+    });
+  }
+});
+
 // New route for audio transcription
 app.post('/transcribe-audio', upload.single('audio'), async (req, res) => {
   try {
@@ -232,12 +485,7 @@ app.post('/transcribe-audio', upload.single('audio'), async (req, res) => {
     console.log('Received audio file:', req.file.originalname, 'Size:', req.file.size);
     
     // Call Bhashini API for transcription
-    const transcriptionResult = await callBhashiniTranscription(req.file.path);
-    
-    // Clean up uploaded file
-    fs.unlink(req.file.path, (err) => {
-      if (err) console.error('Error deleting uploaded file:', err);
-    });
+    const transcriptionResult = await callBhashiniTranscription(req.file.buffer, req.file.originalname);
     
     if (transcriptionResult.success) {
       res.json({
@@ -256,13 +504,6 @@ app.post('/transcribe-audio', upload.single('audio'), async (req, res) => {
   } catch (error) {
     console.error('Error transcribing audio:', error);
     
-    // Clean up uploaded file in case of error
-    if (req.file) {
-      fs.unlink(req.file.path, (err) => {
-        if (err) console.error('Error deleting uploaded file:', err);
-      });
-    }
-    
     res.status(500).json({
       success: false,
       error: error.message || 'Failed to transcribe audio'
@@ -280,6 +521,17 @@ app.get('/health', (req, res) => {
   });
 });
 
+// Prometheus metrics: per-stage extraction timings and LLM token stats from every worker
+app.get('/metrics', async (req, res) => {
+  try {
+    const results = await llmWorkerPool.broadcast({ op: 'metrics' }, METRICS_TIMEOUT_MS);
+    res.set('Content-Type', 'text/plain; version=0.0.4; charset=utf-8');
+    res.send(mergePrometheusText(results.map((result) => result.text)));
+  } catch (error) {
+    res.status(500).send(`# metrics unavailable: ${error.message}\n`);
+  }
+});
+
 // Test endpoint to verify Python integration
 app.post('/test-llm', async (req, res) => {
   try {
@@ -305,4 +557,5 @@ app.listen(PORT, () => {
   console.log(`Health check: http://localhost:${PORT}/health`);
   console.log(`Test LLM: http://localhost:${PORT}/test-llm`);
   console.log(`Audio transcription: http://localhost:${PORT}/transcribe-audio`);
+  console.log(`Metrics: http://localhost:${PORT}/metrics`);
 });
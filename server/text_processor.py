@@ -1,17 +1,29 @@
 import json
 import time
-from typing import Dict, Any, Optional, List
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterator, Optional, List, Tuple, Union
 import requests
 from loguru import logger
-from schema import ProcessedOutput, FIELD_VALUE_SCHEMA, ALL_EVENT_SUB_TYPES, derive_event_type
+import http_client
+from schema import ProcessedOutput, LocationOutput, BatchItemError, FIELD_VALUE_SCHEMA, ALL_EVENT_SUB_TYPES, SCHEMA_INDEX, FuzzyIndex, derive_event_type
 import datetime
-from difflib import get_close_matches
 import re
 import os
+import hashlib
+import threading
+from functools import lru_cache
+from pathlib import Path
+from cache import LRUCache, SQLiteCache, TieredCache
+from metrics import StageTimer, record_extraction
+from few_shot import FewShotStore, load_examples_jsonl
+from gazetteer import Gazetteer, DEFAULT_GAZETTEER_PATH
+from keyword_classifier import KeywordClassifier
 from dotenv import load_dotenv
 load_dotenv()
 
-# Keyword mapping for post-processing recovery (kept for context, not directly used in the fix)
+# Keywords per event type for the pre-classifier (KEYWORD_CLASSIFIER): prompt narrowing,
+# fallback classification when the LLM fails, and batch scheduling priority
 KEYWORD_EVENT_MAP = {
     'VIOLENT CRIME': ['assault', 'attack', 'beaten', 'violence', 'threat', 'robbery', 'murder', 'kidnapping', 'abuse', 'suicide'],
     'THEFT & BURGLARY': ['theft', 'stolen', 'burglary', 'snatching', 'rob', 'break-in', 'vehicle theft'],
@@ -26,6 +38,9 @@ KEYWORD_EVENT_MAP = {
     'MEDICAL EMERGENCIES': ['ambulance', 'heart attack', 'bleeding', 'collapsed', 'breathing', 'fire injury'],
 }
 
+# Compiled once: a single regex alternation over the keywords and sub-type names
+KEYWORD_CLASSIFIER = KeywordClassifier(KEYWORD_EVENT_MAP)
+
 # Few-shot examples for the prompt
 
 FEW_SHOT_EXAMPLES = [
@@ -112,29 +127,293 @@ FEW_SHOT_EXAMPLES = [
 def normalize_text(text: str) -> str:
     return ' '.join(text.lower().strip().split())
 
-def get_few_shot_examples_str():
+# Fields of ProcessedOutput that describe a particular call rather than the extraction itself
+PROCESSING_METADATA_FIELDS = {"timestamp", "processing_time", "file_name", "file_text"}
+
+# Never shown in sparse-mode examples: call metadata, plus event_type which the model must not generate
+SPARSE_OMITTED_FIELDS = PROCESSING_METADATA_FIELDS | {"event_type"}
+
+def format_few_shot_example(ex: dict, sparse: bool = False) -> str:
+    """
+    Render one labelled example as an Input Transcript / Output block of the prompt.
+    With `sparse`, the Output lists only the fields that have a real value.
+    """
     lines = []
-    for ex in FEW_SHOT_EXAMPLES:
-        lines.append('---')
-        lines.append('Input Transcript:')
-        lines.append(f'"""{ex["event_info_text"]}"""')
-        lines.append('Output:')
-        # Iterate over ProcessedOutput's fields to ensure order and completeness
-        for k in ProcessedOutput.model_fields.keys():
-            v = ex.get(k)
-            # Ensure 'None' maps to "not specified" for LLM output, as per schema's default expectations
-            if v is None or (isinstance(v, str) and v.lower() in ["null", "none"]):
-                # Apply specific casing for "not specified" based on field
-                if k == 'state_of_victim':
-                    lines.append(f"{k}: not specified")
-                elif k in ['victim_gender', 'repeat_incident', 'need_ambulance', 'children_involved', 'generated_event_sub_type_detail', 'area', 'date_of_birth', 'contact_number']: # Added date_of_birth, contact_number for explicit handling
-                    lines.append(f"{k}: not specified")
-                else:
-                    lines.append(f"{k}: not specified") # Default for other fields
+    lines.append('---')
+    lines.append('Input Transcript:')
+    lines.append(f'"""{ex["event_info_text"]}"""')
+    lines.append('Output:')
+    # Iterate over ProcessedOutput's fields to ensure order and completeness
+    for k in ProcessedOutput.model_fields.keys():
+        v = ex.get(k)
+        if sparse and (k in SPARSE_OMITTED_FIELDS or v is None
+                       or (isinstance(v, str) and v.lower() in ["null", "none", "not specified"])):
+            continue
+        # Ensure 'None' maps to "not specified" for LLM output, as per schema's default expectations
+        if v is None or (isinstance(v, str) and v.lower() in ["null", "none"]):
+            # Apply specific casing for "not specified" based on field
+            if k == 'state_of_victim':
+                lines.append(f"{k}: not specified")
+            elif k in ['victim_gender', 'repeat_incident', 'need_ambulance', 'children_involved', 'generated_event_sub_type_detail', 'area', 'date_of_birth', 'contact_number']: # Added date_of_birth, contact_number for explicit handling
+                lines.append(f"{k}: not specified")
             else:
-                lines.append(f"{k}: {v}")
+                lines.append(f"{k}: not specified") # Default for other fields
+        else:
+            lines.append(f"{k}: {v}")
     return '\n'.join(lines)
 
+def get_few_shot_examples_str(sparse: bool = False):
+    return '\n'.join(format_few_shot_example(ex, sparse) for ex in FEW_SHOT_EXAMPLES)
+
+
+# Output-length rule of the prompt for each output mode. In sparse mode the model skips
+# "not specified" fields and _parse_llm_field_value_output back-fills them, saving decode tokens.
+OUTPUT_MODE_RULES = {
+    "full": "- One field per line, in the order given in the schema.",
+    "sparse": (
+        "- One field per line, in the order given in the schema, ONLY for fields that have a real value in the transcript.\n"
+        "- Always include `event_sub_type`. Omit every other field whose value would be \"not specified\" "
+        "(this replaces the \"not specified\" instructions above); omitted fields are filled in automatically."
+    ),
+}
+
+def _build_extraction_rules(output_mode: str = "full", sub_types: Optional[Tuple[str, ...]] = None) -> str:
+    """
+    Build the system role, rules and schema: the part of the prompt before the few-shot examples.
+    `sub_types` narrows the predefined sub-type list (default: all of them).
+    """
+    return f"""
+SYSTEM ROLE:
+You are an AI system assisting the Emergency Response Support System (ERSS) project, analyzing 112 emergency call transcripts. Your task is to classify and extract accurate structured metadata from unstructured call conversations between the caller and the emergency call taker.
+
+GENERAL OBJECTIVE:
+Your primary focus is to determine the correct `event_sub_type` from the transcript. Then, ensure all other fields are filled strictly based on what is explicitly mentioned.
+
+YOUR RULES (Follow These STRICTLY):
+
+1.  **PRIORITY FIELD: event_sub_type (CRITICAL)**
+    * **MUST** choose EXACTLY ONE sub-type from the predefined list provided below.
+    * **NEVER** generate a sub-type that is not in the list.
+    * **ONLY** if the incident is genuinely and uniquely unclassifiable into ANY existing specific category (even loosely), then set `event_sub_type` to `OTHERS`. This should be a rare exception.
+    * If you set `event_sub_type` to `OTHERS`, then you **MUST** provide a brief, specific, and descriptive label (1-3 words, e.g., "VEHICLE SNATCHING", "CHEMICAL SPILL") for this new type in the `generated_event_sub_type_detail` field.
+    * If you successfully match an existing `event_sub_type`, then `generated_event_sub_type_detail` **MUST** be "not specified".
+    * Be flexible with phrasing: "bike stolen" should map to "VEHICLE THEFT"; "fire in house" to "BUILDING FIRE". Consider synonyms and related concepts.
+
+2.  **event_type:**
+    * Do NOT generate this field.
+    * It will be inferred automatically by the system based on the `event_sub_type` you provide.
+
+3.  **Categorical Fields** (like `state_of_victim`, `victim_gender`, `need_ambulance`, `repeat_incident`, `children_involved`):
+    * Only select from the **exact** allowed options.
+    * If unknown or not mentioned, set as "not specified".
+    * Be strict about casing: "not specified" for `state_of_victim`, "not specified" for `victim_gender`, `repeat_incident`, `need_ambulance`, `children_involved`, and `generated_event_sub_type_detail`.
+
+4.  **Text/Freeform Fields** (like `incident_location`, `specified_matter`, `suspect_description`, `area`, `contact_number`):
+    * If clearly present, extract the most accurate and specific text **as stated in the transcript**.
+    * If unclear or absent, write "not specified".
+
+5.  **Field-by-field logic:**
+    * `specified_matter`: Write a detailed 1–2 line summary of the incident in natural language from the transcript.
+    * `incident_location`, `area`: Extract location details if mentioned. `area` should be a broader geographical region.
+    * `contact_number`: Extract if a phone number is provided.
+    * `injury_type`, `used_weapons`, `offender_relation`, etc. — extract only if clearly mentioned.
+    * DO NOT hallucinate or assume facts not stated by the caller.
+
+FORMAT STRICTNESS:
+- OUTPUT MUST follow this format exactly: `field_name: value`
+{OUTPUT_MODE_RULES[output_mode]}
+- Do NOT include any introductory or concluding remarks, explanations, or markdown fences (like ```json). Just the field: value pairs.
+
+---
+
+SCHEMA DEFINITIONS:
+
+event_sub_type: One from the following predefined list (Choose one of these, or 'OTHERS' only if absolutely necessary):
+{', '.join(sub_types or ALL_EVENT_SUB_TYPES)}
+
+event_type: Automatically derived internally based on event_sub_type (DO NOT GENERATE)
+
+state_of_victim: One of {FIELD_VALUE_SCHEMA['state_of_victim']}
+
+victim_gender: One of {FIELD_VALUE_SCHEMA['victim_gender']}
+
+generated_event_sub_type_detail: (Optional) A specific label for 'OTHERS' event_sub_type (e.g., VEHICLE SNATCHING, CHEMICAL SPILL). Set to "not specified" if event_sub_type is NOT 'OTHERS'.
+
+(Other fields and options remain as described in the schema. Use "not specified" when not clear.)
+
+---
+
+FEW-SHOT EXAMPLES:
+"""
+
+
+# Closes the few-shot section and opens the transcript
+FEW_SHOT_SECTION_END = """
+
+---
+
+INPUT TRANSCRIPT (verbatim):
+"""
+
+def _build_extraction_prompt_prefix(output_mode: str = "full") -> str:
+    """Build the static part of the extraction prompt (everything before the transcript)."""
+    return (_build_extraction_rules(output_mode) + get_few_shot_examples_str(output_mode == "sparse")
+            + FEW_SHOT_SECTION_END)
+
+
+# The system prompt, schema and few-shot examples never change between calls, so build
+# them once. Keeping this prefix byte-identical lets Ollama reuse its KV cache and lets
+# Gemini serve it from cached content. With a dynamic few-shot store (FEW_SHOT_STORE_PATH)
+# the examples vary per request and only EXTRACTION_RULES_PREFIX is shared.
+EXTRACTION_RULES_PREFIX = _build_extraction_rules()
+EXTRACTION_PROMPT_PREFIX = _build_extraction_prompt_prefix()
+
+# Part of every extraction cache key, so editing the prompt invalidates cached results
+PROMPT_VERSION = hashlib.sha256(EXTRACTION_PROMPT_PREFIX.encode("utf-8")).hexdigest()[:16]
+
+# Prefixes and versions per output mode (EXTRACTION_OUTPUT_MODE); "full" is the default above
+EXTRACTION_RULES_PREFIXES = {mode: _build_extraction_rules(mode) for mode in OUTPUT_MODE_RULES}
+EXTRACTION_PROMPT_PREFIXES = {mode: _build_extraction_prompt_prefix(mode) for mode in OUTPUT_MODE_RULES}
+PROMPT_VERSIONS = {mode: hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+                   for mode, prefix in EXTRACTION_PROMPT_PREFIXES.items()}
+
+
+@lru_cache(maxsize=256)
+def _narrowed_extraction_rules(output_mode: str, sub_types: Tuple[str, ...]) -> str:
+    """Rules prefix listing only `sub_types`; few distinct candidate sets occur, so they are cached."""
+    return _build_extraction_rules(output_mode, sub_types)
+
+# --- Location-only mode (/extract-location): a short prompt asking for just the map-pin fields ---
+LOCATION_FIELDS = ("incident_location", "area")
+
+LOCATION_PROMPT_PREFIX = """
+SYSTEM ROLE:
+You are an AI system assisting the Emergency Response Support System (ERSS) project. From a 112 emergency call transcript, extract ONLY where the incident happened so that a dispatcher can place it on the map.
+
+RULES:
+- incident_location: the most specific location of the incident as stated in the transcript (house, landmark, street, colony, village, police station area, town, district), most specific part first.
+- area: the broader geographical region (town, city or district) the incident location lies in.
+- Use the caller's own words. DO NOT add places that were not mentioned. If a field is not mentioned, write "not specified".
+
+FORMAT STRICTNESS:
+- Output exactly these two lines and nothing else:
+incident_location: <value>
+area: <value>
+
+EXAMPLE:
+Input Transcript:
+\"\"\"... where are you calling from, Roorkee Madam, Uttarakhand, where in Roorkee, Devbhoomi Bandkhedi, yes, Devbhoomi Bandkhedi, which police station would be there, I am telling you, it is Ganganehar ...\"\"\"
+Output:
+incident_location: Devbhoomi Bandkhedi, Roorkee, Uttarakhand
+area: Roorkee
+
+---
+
+INPUT TRANSCRIPT (verbatim):
+"""
+
+LOCATION_PROMPT_VERSION = "location-" + hashlib.sha256(LOCATION_PROMPT_PREFIX.encode("utf-8")).hexdigest()[:16]
+
+# --- Precompiled tables for parsing the LLM's field: value output (built once at import) ---
+MODEL_FIELD_NAMES = tuple(ProcessedOutput.model_fields.keys())
+
+# Schema field names keyed by their normalized form (lower case, underscores removed)
+FIELD_ALIASES = {f.lower().replace('_', ''): f for f in MODEL_FIELD_NAMES}
+_FIELD_NAME_INDEX = FuzzyIndex(FIELD_ALIASES.keys())
+
+DEFAULT_NOT_SPECIFIED_MAPPING = {
+    "state_of_victim": "not specified",
+    "victim_gender": "not specified",
+    "repeat_incident": "not specified",
+    "need_ambulance": "not specified",
+    "children_involved": "not specified",
+    "generated_event_sub_type_detail": "not specified", # Default for new field
+    "area": "not specified", # Default for area
+    "date_of_birth": "not specified",
+    "contact_number": "not specified"
+}
+
+# Correct casing for literal fields, keyed by the lower-cased value
+LITERAL_FIELD_CORRECTIONS = {
+    "state_of_victim": {val.lower(): val for val in FIELD_VALUE_SCHEMA["state_of_victim"]},
+    "victim_gender": {val.lower(): val for val in FIELD_VALUE_SCHEMA["victim_gender"]},
+    "repeat_incident": {v.lower(): v for v in ["yes", "no", "not specified", "not applicable"]},
+    "need_ambulance": {v.lower(): v for v in ["yes", "no", "not specified", "not applicable"]},
+    "children_involved": {v.lower(): v for v in ["yes", "no", "not specified", "not applicable"]},
+}
+_LITERAL_INDEXES = {field: FuzzyIndex(values.keys()) for field, values in LITERAL_FIELD_CORRECTIONS.items()}
+
+YES_NO_FIELDS = frozenset(["need_ambulance", "children_involved", "repeat_incident"])
+NULL_LIKE_VALUES = frozenset(["null", "none", "", "not_defined", "n/a"])
+
+_YES_RE = re.compile(r'\byes\b')
+_NO_RE = re.compile(r'\bno\b')
+_OTHERS_DETAIL_RE = re.compile(r"OTHERS:\s*(.+)")
+
+
+@lru_cache(maxsize=4096)
+def resolve_field_name(llm_field_name: str) -> Tuple[Optional[str], bool]:
+    """
+    Memoized mapping of an LLM-returned field name to a schema field name.
+    Returns (field name or None, whether it needed fuzzy matching).
+    """
+    llm_field_name_lower = llm_field_name.lower().replace('_', '')
+
+    # Try direct match after normalization
+    if llm_field_name_lower in FIELD_ALIASES:
+        return FIELD_ALIASES[llm_field_name_lower], False
+
+    # Lower the cutoff if you want more aggressive matching, but be careful with false positives
+    match = _FIELD_NAME_INDEX.closest(llm_field_name_lower, 0.75)
+    if match:
+        return FIELD_ALIASES[match], True
+    return None, False
+
+
+def _llm_stats(response: Dict[str, Any], wall_seconds: Optional[float] = None) -> Dict[str, float]:
+    """
+    Token counts and durations reported by the provider, in seconds: Ollama's final
+    response fields (nanosecond durations) or Gemini's usageMetadata. `wall_seconds` is
+    the client-side time of the call; with Ollama's total_duration it gives the overhead
+    spent outside the model (network, queueing, HTTP).
+    """
+    stats = {}
+    if "eval_count" in response or "prompt_eval_count" in response:
+        for source, target in (("prompt_eval_count", "prompt_tokens"), ("eval_count", "eval_tokens")):
+            if source in response:
+                stats[target] = response[source]
+        for source, target in (("load_duration", "load_seconds"), ("prompt_eval_duration", "prompt_eval_seconds"),
+                               ("eval_duration", "eval_seconds"), ("total_duration", "total_seconds")):
+            if source in response:
+                stats[target] = round(response[source] / 1e9, 6)
+        if wall_seconds is not None and "total_seconds" in stats:
+            stats["overhead_seconds"] = round(max(0.0, wall_seconds - stats["total_seconds"]), 6)
+
+    usage = response.get("usage") or response.get("usageMetadata")
+    if usage:
+        for source, target in (("promptTokenCount", "prompt_tokens"), ("candidatesTokenCount", "eval_tokens"),
+                               ("cachedContentTokenCount", "cached_tokens")):
+            if source in usage:
+                stats[target] = usage[source]
+    return stats
+
+
+def _gemini_cache_rejected(response: requests.Response, cache_name: str) -> bool:
+    """Whether an error response is about the referenced cached content rather than the request itself."""
+    if response.status_code in (403, 404):
+        return True
+    if response.status_code == 400:
+        body = response.text or ""
+        return cache_name in body or "cachedContent" in body or "cached content" in body.lower()
+    return False
+
+
+@lru_cache(maxsize=4096)
+def _closest_literal(field: str, value_lower: str) -> Optional[str]:
+    """Memoized closest allowed value (in its correct casing) for a literal field."""
+    match = _LITERAL_INDEXES[field].closest(value_lower, 0.8)
+    return LITERAL_FIELD_CORRECTIONS[field][match] if match else None
+
 
 class TextProcessor:
     def __init__(self, ollama_base_url: str = "http://localhost:11434"):
@@ -149,6 +428,8 @@ class TextProcessor:
         if self.llm_provider == "gemini":
             self.model_name = "gemini-2.0-flash" 
             self.api_key = os.getenv("GEMINI_API_KEY")
+            # Overridable so benchmarks can point at a local stand-in
+            self.gemini_api_base = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
             if not self.api_key:
                 logger.warning(
                     "LLM_PROVIDER is set to 'gemini', but GEMINI_API_KEY is not found in environment variables. "
@@ -157,25 +438,287 @@ class TextProcessor:
         else: # Default to Ollama if LLM_PROVIDER is not 'gemini' or not set
             self.model_name = "llama3.1:8b" 
             self.api_key = None 
-    
+
+        # --- Prompt prefix reuse ---
+        # Ollama: keep the model (and its KV cache for the shared prompt prefix) resident between calls
+        self.ollama_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        # Gemini: the static prompt prefix is uploaded once as cached content and referenced by name
+        self.gemini_cache_enabled = os.getenv("GEMINI_PROMPT_CACHE", "true").lower() in ["1", "true", "yes"]
+        self.gemini_cache_ttl_seconds = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600"))
+        self._gemini_cache_name = None
+        self._gemini_cache_prefix = None
+        self._gemini_cache_expires_at = 0.0
+        # After a transient failure to create the cache, wait this long (doubling, up to the TTL) before retrying
+        self._gemini_cache_retry_delay = 30.0
+        self._gemini_cache_retry_at = 0.0
+        self._gemini_cache_lock = threading.Lock()
+
+        # --- Concurrent batch processing ---
+        # Match Ollama's parallel request slots (OLLAMA_NUM_PARALLEL on the server); Gemini is bounded by quota
+        if self.llm_provider == "gemini":
+            self.batch_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+        else:
+            self.batch_concurrency = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+
+        # --- Extraction result cache (memory LRU in front of SQLite) ---
+        self.cache = None
+        if os.getenv("EXTRACTION_CACHE", "true").lower() in ["1", "true", "yes"]:
+            disk_path = os.getenv("EXTRACTION_CACHE_PATH", str(Path(__file__).parent / ".cache" / "extraction_cache.sqlite3"))
+            self.cache = TieredCache(
+                LRUCache(max_entries=int(os.getenv("EXTRACTION_CACHE_MEMORY_ENTRIES", "1024"))),
+                SQLiteCache(
+                    disk_path,
+                    table="extractions",
+                    ttl_seconds=float(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+                    max_entries=int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "50000"))
+                ) if disk_path else None
+            )
+
+        # --- Few-shot examples ---
+        # By default every prompt carries the built-in examples in its static prefix. With
+        # FEW_SHOT_STORE_PATH (JSONL of transcripts + GroundTruthOutput labels) each prompt
+        # instead gets the stored examples most similar to its transcript, within
+        # FEW_SHOT_TOKEN_BUDGET, placed after the shared rules prefix.
+        self.few_shot_store = None
+        self.few_shot_token_budget = int(os.getenv("FEW_SHOT_TOKEN_BUDGET", "1500"))
+        self.few_shot_max_examples = int(os.getenv("FEW_SHOT_MAX_EXAMPLES", "3"))
+        # --- Output mode ---
+        # "full" asks for every field; "sparse" only for fields with a real value (fewer decode tokens)
+        self.output_mode = os.getenv("EXTRACTION_OUTPUT_MODE", "full").lower()
+        if self.output_mode not in OUTPUT_MODE_RULES:
+            logger.warning(f"Unknown EXTRACTION_OUTPUT_MODE '{self.output_mode}', using 'full'.")
+            self.output_mode = "full"
+
+        self.prompt_prefix = EXTRACTION_PROMPT_PREFIXES[self.output_mode]
+        self.prompt_version = PROMPT_VERSIONS[self.output_mode]
+        few_shot_path = os.getenv("FEW_SHOT_STORE_PATH")
+        if few_shot_path:
+            try:
+                sparse = self.output_mode == "sparse"
+                self.few_shot_store = FewShotStore.from_jsonl(
+                    few_shot_path, lambda ex: format_few_shot_example(ex, sparse), extra_examples=FEW_SHOT_EXAMPLES
+                )
+                self.prompt_prefix = EXTRACTION_RULES_PREFIXES[self.output_mode]
+                # Selection settings and store contents change the prompts, so they are part of the cache key
+                self.prompt_version = hashlib.sha256(
+                    f"{PROMPT_VERSIONS[self.output_mode]}\n{self.few_shot_store.fingerprint}\n"
+                    f"{self.few_shot_token_budget}\n{self.few_shot_max_examples}".encode("utf-8")
+                ).hexdigest()[:16]
+            except OSError as e:
+                logger.error(f"Could not load few-shot store '{few_shot_path}', using the built-in examples: {e}")
+
+        # Output budget of the location-only mode: two short lines
+        self.location_max_tokens = int(os.getenv("LOCATION_MAX_TOKENS", "96"))
+        self.location_prompt_version = LOCATION_PROMPT_VERSION
+
+        # --- Gazetteer pre-pass (offline Uttarakhand place matcher) ---
+        # A reading at or above GAZETTEER_MIN_CONFIDENCE answers location-only requests without
+        # the LLM. The LLM's incident_location / area is always cross-checked against it; with
+        # GAZETTEER_NORMALIZE place spellings are canonicalized and missing values filled in.
+        self.gazetteer = None
+        self.gazetteer_min_confidence = float(os.getenv("GAZETTEER_MIN_CONFIDENCE", "0.9"))
+        self.gazetteer_normalize = os.getenv("GAZETTEER_NORMALIZE", "false").lower() in ["1", "true", "yes"]
+        gazetteer_path = os.getenv("GAZETTEER_PATH", str(DEFAULT_GAZETTEER_PATH))
+        if gazetteer_path:
+            try:
+                self.gazetteer = Gazetteer.from_jsonl(gazetteer_path)
+                if self.gazetteer_normalize:
+                    # Normalized outputs depend on the place list and threshold
+                    suffix = f"\n{self.gazetteer.fingerprint}\n{self.gazetteer_min_confidence}"
+                    self.prompt_version = hashlib.sha256(
+                        (self.prompt_version + suffix).encode("utf-8")).hexdigest()[:16]
+                    self.location_prompt_version = "location-" + hashlib.sha256(
+                        (LOCATION_PROMPT_VERSION + suffix).encode("utf-8")).hexdigest()[:16]
+            except OSError as e:
+                logger.error(f"Could not load gazetteer '{gazetteer_path}', location pre-pass disabled: {e}")
+
+        # --- Keyword pre-classifier (KEYWORD_CLASSIFIER) ---
+        # KEYWORD_PROMPT_NARROWING lists only the sub-types of the event types the transcript's
+        # keywords confidently point at (plus OTHERS): fewer prompt tokens, but the prompt prefix
+        # then varies per transcript, so Ollama KV reuse and Gemini cached content no longer apply.
+        # It is only switched on after the labelled examples (KEYWORD_NARROWING_EVAL_PATH, else
+        # FEW_SHOT_STORE_PATH) show the correct sub-type survives narrowing often enough.
+        # KEYWORD_FALLBACK answers with the keyword classification (uncached) when the LLM call
+        # fails or times out instead of raising. KEYWORD_PRIORITY_SCHEDULING starts the most
+        # urgent-looking transcripts of a batch first; results stay in input order.
+        self.keyword_classifier = KEYWORD_CLASSIFIER
+        self.keyword_narrowing = os.getenv("KEYWORD_PROMPT_NARROWING", "false").lower() in ["1", "true", "yes"]
+        self.keyword_fallback = os.getenv("KEYWORD_FALLBACK", "false").lower() in ["1", "true", "yes"]
+        self.keyword_priority = os.getenv("KEYWORD_PRIORITY_SCHEDULING", "true").lower() in ["1", "true", "yes"]
+        # The few-shot part that follows the rules in the static prefix (empty with a few-shot store)
+        self._prefix_after_rules = self.prompt_prefix[len(EXTRACTION_RULES_PREFIXES[self.output_mode]):]
+        if self.keyword_narrowing:
+            self.keyword_narrowing = self._validate_keyword_narrowing(
+                os.getenv("KEYWORD_NARROWING_EVAL_PATH") or few_shot_path)
+        if self.keyword_narrowing:
+            self.prompt_version = hashlib.sha256(
+                f"{self.prompt_version}\nkeyword-narrowing\n{self.keyword_classifier.fingerprint}".encode("utf-8")
+            ).hexdigest()[:16]
 
         self.allowed_event_types = FIELD_VALUE_SCHEMA["event_type"]
         self.allowed_event_sub_types = ALL_EVENT_SUB_TYPES
         
-        # Create a mapping for common casing issues for literal fields
-        self.literal_field_corrections = {
-            "state_of_victim": {val.lower(): val for val in FIELD_VALUE_SCHEMA["state_of_victim"]},
-            "victim_gender": {val.lower(): val for val in FIELD_VALUE_SCHEMA["victim_gender"]},
-            "repeat_incident": {v.lower(): v for v in ["yes", "no", "not specified", "not applicable"]},
-            "need_ambulance": {v.lower(): v for v in ["yes", "no", "not specified", "not applicable"]},
-            "children_involved": {v.lower(): v for v in ["yes", "no", "not specified", "not applicable"]},
+        # Mapping for common casing issues for literal fields (shared, precomputed at import)
+        self.literal_field_corrections = LITERAL_FIELD_CORRECTIONS
+
+    def _validate_keyword_narrowing(self, eval_path: Optional[str]) -> bool:
+        """
+        Whether prompt narrowing keeps the labelled sub-type in at least KEYWORD_NARROWING_MIN_RECALL
+        of the narrowed examples, over at least KEYWORD_NARROWING_MIN_EXAMPLES labelled examples.
+        """
+        min_recall = float(os.getenv("KEYWORD_NARROWING_MIN_RECALL", "0.98"))
+        min_examples = int(os.getenv("KEYWORD_NARROWING_MIN_EXAMPLES", "20"))
+        examples = list(FEW_SHOT_EXAMPLES)
+        if eval_path:
+            try:
+                examples += load_examples_jsonl(eval_path)
+            except OSError as e:
+                logger.error(f"Could not load labelled examples '{eval_path}' for keyword narrowing: {e}")
+        report = self.keyword_classifier.narrowing_recall(examples)
+        if report["examples"] < min_examples:
+            logger.warning(f"KEYWORD_PROMPT_NARROWING disabled: only {report['examples']} labelled examples "
+                           f"(need {min_examples}; set KEYWORD_NARROWING_EVAL_PATH).")
+            return False
+        if report["recall"] < min_recall:
+            logger.warning(f"KEYWORD_PROMPT_NARROWING disabled: the labelled sub-type survived narrowing in "
+                           f"{report['recall']:.1%} of {report['narrowed']} narrowed examples (need {min_recall:.0%}).")
+            return False
+        logger.info(f"Keyword prompt narrowing enabled: {report['narrowed']}/{report['examples']} labelled examples "
+                    f"narrowed, {report['recall']:.1%} kept their sub-type.")
+        return True
+
+    def _get_gemini_cached_content(self, prefix: str) -> Optional[str]:
+        """
+        Returns the name of a Gemini cachedContents resource holding `prefix`, creating
+        (or re-creating after expiry) it when needed. Returns None if caching is
+        unavailable, in which case the caller should send the full prompt inline.
+        """
+        if not self.gemini_cache_enabled:
+            return None
+
+        with self._gemini_cache_lock:
+            # Refresh a little before the server-side TTL runs out
+            if (self._gemini_cache_name and self._gemini_cache_prefix == prefix
+                    and time.time() < self._gemini_cache_expires_at - 60):
+                return self._gemini_cache_name
+            if time.time() < self._gemini_cache_retry_at:
+                return None
+
+            try:
+                response = http_client.post(
+                    "gemini",
+                    f"{self.gemini_api_base}/cachedContents?key={self.api_key}",
+                    headers={'Content-Type': 'application/json'},
+                    json={
+                        "model": f"models/{self.model_name}",
+                        "contents": [
+                            {
+                                "role": "user",
+                                "parts": [{"text": prefix}]
+                            }
+                        ],
+                        "ttl": f"{self.gemini_cache_ttl_seconds}s"
+                    }
+                )
+                response.raise_for_status()
+                self._gemini_cache_name = response.json()["name"]
+                self._gemini_cache_prefix = prefix
+                self._gemini_cache_expires_at = time.time() + self.gemini_cache_ttl_seconds
+                self._gemini_cache_retry_delay = 30.0
+                logger.info(f"Created Gemini cached content '{self._gemini_cache_name}' for the static prompt prefix.")
+                return self._gemini_cache_name
+            except requests.exceptions.HTTPError as e:
+                self._gemini_cache_name = None
+                if e.response is not None and e.response.status_code == 400:
+                    # INVALID_ARGUMENT, e.g. the prefix is below the model's minimum cacheable size; won't change
+                    logger.warning(f"Gemini prompt caching unavailable, sending full prompts inline: {e}")
+                    self.gemini_cache_enabled = False
+                else:
+                    self._back_off_gemini_cache(e)
+                return None
+            except Exception as e:
+                self._gemini_cache_name = None
+                self._back_off_gemini_cache(e)
+                return None
+
+    def _back_off_gemini_cache(self, error: Exception):
+        """Send prompts inline for a while after a transient cache creation failure (timeout, 429, 5xx)."""
+        logger.warning(f"Could not create Gemini cached content, sending full prompts inline for "
+                       f"{self._gemini_cache_retry_delay:.0f}s: {error}")
+        self._gemini_cache_retry_at = time.time() + self._gemini_cache_retry_delay
+        self._gemini_cache_retry_delay = min(self._gemini_cache_retry_delay * 2, self.gemini_cache_ttl_seconds)
+
+    def _invalidate_gemini_cached_content(self):
+        with self._gemini_cache_lock:
+            self._gemini_cache_name = None
+            self._gemini_cache_prefix = None
+            self._gemini_cache_expires_at = 0.0
+
+    def warm_up(self):
+        """
+        Prime provider-side prefix reuse so the first real request does not pay the
+        full prefill cost: loads the Ollama model and evaluates the static prefix into
+        its KV cache, or creates the Gemini cached content.
+        """
+        try:
+            if self.llm_provider == "gemini":
+                if self.api_key:
+                    self._get_gemini_cached_content(self.prompt_prefix)
+            else:
+                http_client.post(
+                    "ollama",
+                    f"{self.ollama_base_url}/api/generate",
+                    json={
+                        "model": self.model_name,
+                        "prompt": self.prompt_prefix,
+                        "stream": False,
+                        "keep_alive": self.ollama_keep_alive,
+                        "options": {
+                            "temperature": 0.1,
+                            "num_ctx": 4096,
+                            "num_predict": 1
+                        }
+                    }
+                ).raise_for_status()
+            logger.info("LLM warm-up complete.")
+        except Exception as e:
+            logger.warning(f"LLM warm-up failed (continuing without it): {e}")
+
+    def _build_gemini_payload(self, prompt: str, cached_prefix: Optional[str] = None,
+                              max_output_tokens: Optional[int] = None):
+        """Returns (payload, cached content name or None) for a Gemini generateContent call."""
+        payload = {
+            "contents": [
+                {
+                    "role": "user",
+                    "parts": [{"text": prompt}]
+                }
+            ],
+            "generationConfig": {
+                "temperature": 0.1, 
+                "maxOutputTokens": max_output_tokens or 2048
+            }
         }
 
+        cache_name = None
+        if cached_prefix and prompt.startswith(cached_prefix):
+            cache_name = self._get_gemini_cached_content(cached_prefix)
+        if cache_name:
+            payload["cachedContent"] = cache_name
+            payload["contents"][0]["parts"][0]["text"] = prompt[len(cached_prefix):]
+
+        return payload, cache_name
+
     # This is now the *single* _call_llm method that handles both providers
-    def _call_llm(self, prompt: str) -> Dict[str, Any]:
+    def _call_llm(self, prompt: str, cached_prefix: Optional[str] = None,
+                  max_output_tokens: Optional[int] = None) -> Dict[str, Any]:
         """
         Calls the appropriate LLM API (Ollama or Gemini) based on the
         'LLM_PROVIDER' environment variable set during initialization.
+
+        `cached_prefix`, if given, must be a prefix of `prompt` that is identical across
+        calls; Gemini then sends only the remainder alongside the cached content.
+        `max_output_tokens` caps generation (Ollama num_predict, Gemini maxOutputTokens).
         """
         newline_char = '\n'
         
@@ -189,25 +732,16 @@ class TextProcessor:
             retry_delay_seconds = 60 
 
             for attempt in range(max_retries):
+                cache_name = None
                 try:
                     logger.info(f"TextProcessor calling Gemini LLM with prompt (first 200 chars): {prompt[:200].replace(newline_char, ' ')}... (Attempt {attempt + 1}/{max_retries})")
                     
-                    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent?key={self.api_key}"
+                    api_url = f"{self.gemini_api_base}/models/{self.model_name}:generateContent?key={self.api_key}"
 
-                    payload = {
-                        "contents": [
-                            {
-                                "role": "user",
-                                "parts": [{"text": prompt}]
-                            }
-                        ],
-                        "generationConfig": {
-                            "temperature": 0.1, 
-                            "maxOutputTokens": 2048 
-                        }
-                    }
+                    payload, cache_name = self._build_gemini_payload(prompt, cached_prefix, max_output_tokens)
 
-                    response = requests.post(
+                    response = http_client.post(
+                        "gemini",
                         api_url,
                         headers={'Content-Type': 'application/json'},
                         json=payload
@@ -220,13 +754,18 @@ class TextProcessor:
                        result["candidates"][0]["content"].get("parts") and result["candidates"][0]["content"]["parts"][0].get("text"):
                         generated_text = result["candidates"][0]["content"]["parts"][0]["text"]
                         logger.info("Successfully received response from Gemini API.")
-                        return {"response": generated_text} 
+                        return {"response": generated_text, "usage": result.get("usageMetadata", {})}
                     else:
                         logger.warning(f"Unexpected response structure from Gemini API: {result}")
                         return {"response": "Error: Could not parse LLM response."}
 
                 except requests.exceptions.HTTPError as http_err:
-                    if http_err.response.status_code == 429: 
+                    if cache_name and _gemini_cache_rejected(http_err.response, cache_name):
+                        # Cached content expired or was deleted server-side; send the remaining attempts inline
+                        logger.warning(f"Gemini cached content '{cache_name}' rejected ({http_err.response.status_code}). Retrying inline.")
+                        self._invalidate_gemini_cached_content()
+                        cached_prefix = None
+                    elif http_err.response.status_code == 429: 
                         logger.warning(f"Rate limit hit (HTTP 429). Retrying in {retry_delay_seconds} seconds... (Attempt {attempt + 1}/{max_retries})")
                         time.sleep(retry_delay_seconds)
                         # retry_delay_seconds *= 2 
@@ -251,16 +790,22 @@ class TextProcessor:
             try:
                 logger.info(f"TextProcessor calling Ollama LLM with prompt (first 200 chars): {prompt[:200].replace(newline_char, ' ')}...")
                 
-                response = requests.post(
+                options = {
+                    "temperature": 0.1, # Keep temperature low for structured extraction
+                    "num_ctx": 4096 # Adjust context window if prompt is long
+                }
+                if max_output_tokens:
+                    options["num_predict"] = max_output_tokens
+
+                response = http_client.post(
+                    "ollama",
                     f"{self.ollama_base_url}/api/generate",
                     json={
                         "model": self.model_name,
                         "prompt": prompt,
                         "stream": False,
-                        "options": {
-                            "temperature": 0.1, # Keep temperature low for structured extraction
-                            "num_ctx": 4096 # Adjust context window if prompt is long
-                        }
+                        "keep_alive": self.ollama_keep_alive,
+                        "options": options
                     }
                 )
                 response.raise_for_status()
@@ -275,77 +820,92 @@ class TextProcessor:
                 logger.error(f"Error calling Ollama LLM: {str(e)}")
                 raise
 
-    def _create_extraction_prompt(self, text: str) -> str:
-        safe_text = text.replace('"""', '\"\"\"')
-
-        return f"""
-SYSTEM ROLE:
-You are an AI system assisting the Emergency Response Support System (ERSS) project, analyzing 112 emergency call transcripts. Your task is to classify and extract accurate structured metadata from unstructured call conversations between the caller and the emergency call taker.
-
-GENERAL OBJECTIVE:
-Your primary focus is to determine the correct `event_sub_type` from the transcript. Then, ensure all other fields are filled strictly based on what is explicitly mentioned.
-
-YOUR RULES (Follow These STRICTLY):
-
-1.  **PRIORITY FIELD: event_sub_type (CRITICAL)**
-    * **MUST** choose EXACTLY ONE sub-type from the predefined list provided below.
-    * **NEVER** generate a sub-type that is not in the list.
-    * **ONLY** if the incident is genuinely and uniquely unclassifiable into ANY existing specific category (even loosely), then set `event_sub_type` to `OTHERS`. This should be a rare exception.
-    * If you set `event_sub_type` to `OTHERS`, then you **MUST** provide a brief, specific, and descriptive label (1-3 words, e.g., "VEHICLE SNATCHING", "CHEMICAL SPILL") for this new type in the `generated_event_sub_type_detail` field.
-    * If you successfully match an existing `event_sub_type`, then `generated_event_sub_type_detail` **MUST** be "not specified".
-    * Be flexible with phrasing: "bike stolen" should map to "VEHICLE THEFT"; "fire in house" to "BUILDING FIRE". Consider synonyms and related concepts.
-
-2.  **event_type:**
-    * Do NOT generate this field.
-    * It will be inferred automatically by the system based on the `event_sub_type` you provide.
-
-3.  **Categorical Fields** (like `state_of_victim`, `victim_gender`, `need_ambulance`, `repeat_incident`, `children_involved`):
-    * Only select from the **exact** allowed options.
-    * If unknown or not mentioned, set as "not specified".
-    * Be strict about casing: "not specified" for `state_of_victim`, "not specified" for `victim_gender`, `repeat_incident`, `need_ambulance`, `children_involved`, and `generated_event_sub_type_detail`.
-
-4.  **Text/Freeform Fields** (like `incident_location`, `specified_matter`, `suspect_description`, `area`, `contact_number`):
-    * If clearly present, extract the most accurate and specific text **as stated in the transcript**.
-    * If unclear or absent, write "not specified".
-
-5.  **Field-by-field logic:**
-    * `specified_matter`: Write a detailed 1–2 line summary of the incident in natural language from the transcript.
-    * `incident_location`, `area`: Extract location details if mentioned. `area` should be a broader geographical region.
-    * `contact_number`: Extract if a phone number is provided.
-    * `injury_type`, `used_weapons`, `offender_relation`, etc. — extract only if clearly mentioned.
-    * DO NOT hallucinate or assume facts not stated by the caller.
-
-FORMAT STRICTNESS:
-- OUTPUT MUST follow this format exactly: `field_name: value`
-- One field per line, in the order given in the schema.
-- Do NOT include any introductory or concluding remarks, explanations, or markdown fences (like ```json). Just the field: value pairs.
-
----
-
-SCHEMA DEFINITIONS:
-
-event_sub_type: One from the following predefined list (Choose one of these, or 'OTHERS' only if absolutely necessary):
-{', '.join(ALL_EVENT_SUB_TYPES)}
-
-event_type: Automatically derived internally based on event_sub_type (DO NOT GENERATE)
-
-state_of_victim: One of {FIELD_VALUE_SCHEMA['state_of_victim']}
+    def _stream_llm(self, prompt: str, cached_prefix: Optional[str] = None,
+                    stats: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Streaming counterpart of _call_llm: yields generated text chunks as they arrive.
+        Closing the generator early closes the HTTP response, which makes Ollama stop
+        generating and stops Gemini from sending further tokens. If `stats` is given, the
+        provider's usage report (Ollama's final chunk, Gemini's usageMetadata) is stored in it.
+        """
+        newline_char = '\n'
 
-victim_gender: One of {FIELD_VALUE_SCHEMA['victim_gender']}
+        if self.llm_provider == "gemini":
+            if not self.api_key:
+                logger.error("Cannot call Gemini LLM: GEMINI_API_KEY is not set.")
+                raise ValueError("GEMINI_API_KEY is required for Gemini LLM calls.")
 
-generated_event_sub_type_detail: (Optional) A specific label for 'OTHERS' event_sub_type (e.g., VEHICLE SNATCHING, CHEMICAL SPILL). Set to "not specified" if event_sub_type is NOT 'OTHERS'.
+            logger.info(f"TextProcessor streaming from Gemini LLM with prompt (first 200 chars): {prompt[:200].replace(newline_char, ' ')}...")
+            api_url = f"{self.gemini_api_base}/models/{self.model_name}:streamGenerateContent?alt=sse&key={self.api_key}"
+            payload, cache_name = self._build_gemini_payload(prompt, cached_prefix)
 
-(Other fields and options remain as described in the schema. Use "not specified" when not clear.)
+            response = http_client.post("gemini", api_url, headers={'Content-Type': 'application/json'}, json=payload, stream=True)
+            if cache_name and _gemini_cache_rejected(response, cache_name):
+                # Cached content expired or was deleted server-side; retry once with the full prompt inline
+                response.close()
+                self._invalidate_gemini_cached_content()
+                payload["contents"][0]["parts"][0]["text"] = prompt
+                payload.pop("cachedContent")
+                response = http_client.post("gemini", api_url, headers={'Content-Type': 'application/json'}, json=payload, stream=True)
 
----
+            with response:
+                response.raise_for_status()
+                # Server-sent events: one JSON document per "data:" line
+                for line in response.iter_lines():
+                    if not line.startswith(b"data:"):
+                        continue
+                    chunk = json.loads(line[len(b"data:"):])
+                    if stats is not None and chunk.get("usageMetadata"):
+                        stats["usage"] = chunk["usageMetadata"]
+                    for candidate in chunk.get("candidates", [])[:1]:
+                        for part in candidate.get("content", {}).get("parts", []):
+                            if part.get("text"):
+                                yield part["text"]
 
-FEW-SHOT EXAMPLES:
-{get_few_shot_examples_str()}
+        else:
+            logger.info(f"TextProcessor streaming from Ollama LLM with prompt (first 200 chars): {prompt[:200].replace(newline_char, ' ')}...")
+            response = http_client.post(
+                "ollama",
+                f"{self.ollama_base_url}/api/generate",
+                json={
+                    "model": self.model_name,
+                    "prompt": prompt,
+                    "stream": True,
+                    "keep_alive": self.ollama_keep_alive,
+                    "options": {
+                        "temperature": 0.1,
+                        "num_ctx": 4096
+                    }
+                },
+                stream=True
+            )
+            with response:
+                response.raise_for_status()
+                # Newline-delimited JSON: one object per generated chunk, the last has "done": true
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        if stats is not None:
+                            stats.update(chunk)
+                        break
 
----
+    def _create_extraction_prompt(self, text: str) -> str:
+        safe_text = text.replace('"""', '\"\"\"')
 
-INPUT TRANSCRIPT (verbatim):
-\"\"\"{safe_text}\"\"\"
+        # Only the transcript (and, with a few-shot store, the examples) varies between calls
+        prefix = self.prompt_prefix
+        if self.keyword_narrowing:
+            sub_types = self.keyword_classifier.candidate_sub_types(self.keyword_classifier.classify(text))
+            if sub_types is not None:
+                prefix = _narrowed_extraction_rules(self.output_mode, tuple(sub_types)) + self._prefix_after_rules
+        if self.few_shot_store is not None:
+            examples = self.few_shot_store.select(text, self.few_shot_token_budget, self.few_shot_max_examples)
+            prefix += '\n'.join(examples) + FEW_SHOT_SECTION_END
+        return prefix + f"""\"\"\"{safe_text}\"\"\"
 
 ---
 YOUR RESPONSE (STRICTLY in field: value format):
@@ -354,51 +914,19 @@ YOUR RESPONSE (STRICTLY in field: value format):
     def _fuzzy_match_field_name(self, llm_field_name: str) -> Optional[str]:
         """
         Attempts to fuzzy match an LLM-returned field name to a known ProcessedOutput field name.
-        Returns the matched schema f  ield name or None if no good match is found.
+        Returns the matched schema field name or None if no good match is found.
         """
-        llm_field_name_lower = llm_field_name.lower().replace('_', '')
-        
-        # Pre-process schema field names for matching (remove underscores for more robust fuzzy matching)
-        processed_model_fields = {f.lower().replace('_', ''): f for f in ProcessedOutput.model_fields.keys()}
-
-        # Try direct match after normalization
-        if llm_field_name_lower in processed_model_fields:
-            return processed_model_fields[llm_field_name_lower]
-
-        # Try fuzzy matching
-        # Consider a list of all normalized schema field names for get_close_matches
-        normalized_schema_fields = list(processed_model_fields.keys())
-
-        # Lower the cutoff if you want more aggressive matching, but be careful with false positives
-        matches = get_close_matches(llm_field_name_lower, normalized_schema_fields, n=1, cutoff=0.75) # Adjusted cutoff
-
-        if matches:
-            matched_normalized_field = matches[0]
-            original_schema_field = processed_model_fields[matched_normalized_field]
-            logger.info(f"Fuzzy matched LLM field '{llm_field_name}' to '{original_schema_field}'.")
-            return original_schema_field
-        
-        return None
+        matched_field, fuzzy = resolve_field_name(llm_field_name)
+        if fuzzy:
+            logger.info(f"Fuzzy matched LLM field '{llm_field_name}' to '{matched_field}'.")
+        return matched_field
 
 
     def _parse_llm_field_value_output(self, llm_output: str) -> dict:
         result = {}
-        model_fields = ProcessedOutput.model_fields.keys() # Original schema field names
-        
-        default_not_specified_mapping = {
-            "state_of_victim": "not specified",
-            "victim_gender": "not specified",
-            "repeat_incident": "not specified",
-            "need_ambulance": "not specified",
-            "children_involved": "not specified",
-            "generated_event_sub_type_detail": "not specified", # Default for new field
-            "area": "not specified", # Default for area
-            "date_of_birth": "not specified",
-            "contact_number": "not specified"
-        }
 
         for line in llm_output.splitlines():
-            if not line.strip() or ':' not in line:
+            if ':' not in line or not line.strip():
                 continue
             
             llm_field, value = line.split(':', 1)
@@ -406,23 +934,20 @@ YOUR RESPONSE (STRICTLY in field: value format):
             raw_value_from_llm = value.strip() # Keep the raw value for specific checks
 
             # --- Fuzzy match the LLM's field name to the schema's field name ---
-            matched_field = self._fuzzy_match_field_name(llm_field)
+            field = self._fuzzy_match_field_name(llm_field)
 
-            if not matched_field:
+            if not field:
                 logger.warning(f"Unknown field returned by LLM: '{llm_field}'. Skipping.")
                 continue
             
-            # Use the matched_field for all subsequent logic
-            field = matched_field
-            
             # Initialize value to the raw LLM output, will be refined below
             processed_value = raw_value_from_llm
 
-            # --- START OF NEW LOGIC FOR YES/NO EXTRACTION ---
-            if field in ["need_ambulance", "children_involved", "repeat_incident"]: # Apply to all relevant yes/no fields
+            # --- YES/NO EXTRACTION ---
+            if field in YES_NO_FIELDS:
                 lower_raw_value = raw_value_from_llm.lower()
-                yes_match = re.search(r'\byes\b', lower_raw_value)
-                no_match = re.search(r'\bno\b', lower_raw_value)
+                yes_match = _YES_RE.search(lower_raw_value)
+                no_match = _NO_RE.search(lower_raw_value)
 
                 if yes_match and not no_match: # Found 'yes' but not 'no'
                     processed_value = "yes"
@@ -435,10 +960,9 @@ YOUR RESPONSE (STRICTLY in field: value format):
                     logger.warning(f"Ambiguous 'yes' and 'no' found for '{field}': '{raw_value_from_llm}'. Defaulting to 'not specified'.")
                 # If neither 'yes' nor 'no' is found, processed_value remains raw_value_from_llm
                 # and will be handled by the general literal field correction below.
-            # --- END OF NEW LOGIC FOR YES/NO EXTRACTION ---
             
             # Normalize common "None", empty string, or invalid outputs to "not specified"
-            if processed_value.lower() in ["null", "none", "", "not_defined", "n/a"]:
+            if processed_value.lower() in NULL_LIKE_VALUES:
                 processed_value = "not specified" 
 
             # --- Special Handling for event_sub_type and generated_event_sub_type_detail ---
@@ -448,7 +972,7 @@ YOUR RESPONSE (STRICTLY in field: value format):
                 # Store it as is for now, will be corrected in post-processing if needed
                 result[field] = normalized_llm_value
                 # If LLM explicitly outputted OTHERS with a detail, handle that early
-                match = re.match(r"OTHERS:\s*(.+)", normalized_llm_value)
+                match = _OTHERS_DETAIL_RE.match(normalized_llm_value)
                 if match:
                     result["event_sub_type"] = "OTHERS"
                     detail = match.group(1).strip()
@@ -462,20 +986,19 @@ YOUR RESPONSE (STRICTLY in field: value format):
                 result[field] = processed_value if processed_value.lower() not in ["null", "none", ""] else "not specified"
             
             # --- General Literal Field Correction (case sensitivity & fuzzy matching) ---
-            elif field in self.literal_field_corrections:
+            elif field in LITERAL_FIELD_CORRECTIONS:
                 # Use processed_value for lookup
-                corrected_value = self.literal_field_corrections[field].get(processed_value.lower())
+                corrected_value = LITERAL_FIELD_CORRECTIONS[field].get(processed_value.lower())
                 if corrected_value: # If a direct lowercase match found, use its correct casing
                     result[field] = corrected_value
-                else: # If not found, try get_close_matches for more flexibility
-                    allowed_values_for_field = list(self.literal_field_corrections[field].keys())
-                    matches = get_close_matches(processed_value.lower(), allowed_values_for_field, n=1, cutoff=0.8) # Adjust cutoff
-                    if matches:
-                        result[field] = self.literal_field_corrections[field][matches[0]]
+                else: # If not found, try the closest allowed value for more flexibility
+                    closest_value = _closest_literal(field, processed_value.lower())
+                    if closest_value:
+                        result[field] = closest_value
                         logger.info(f"Corrected '{field}' value '{processed_value.lower()}' to closest match '{result[field]}'.")
                     else:
                         # If still no match, and it's a "not specified" type, use the default from mapping
-                        result[field] = default_not_specified_mapping.get(field, "not specified") 
+                        result[field] = DEFAULT_NOT_SPECIFIED_MAPPING.get(field, "not specified") 
                         logger.warning(f"LLM returned invalid literal for '{field}': '{processed_value}'. Defaulting to '{result[field]}'.")
             
             else: # For other fields (freeform text)
@@ -489,27 +1012,26 @@ YOUR RESPONSE (STRICTLY in field: value format):
         # Scenario 1: LLM outputted OTHERS for event_sub_type but provided a specific detail that IS a known sub-type
         if current_sub_type == "OTHERS" and current_generated_detail and current_generated_detail != "NOT SPECIFIED":
             # Try to directly match the generated detail to ALL_EVENT_SUB_TYPES
-            if current_generated_detail in ALL_EVENT_SUB_TYPES:
+            if current_generated_detail in SCHEMA_INDEX.event_sub_types:
                 result["event_sub_type"] = current_generated_detail # Promote the detail to the main sub_type
                 result["generated_event_sub_type_detail"] = "not specified" # Clear the detail field
                 logger.info(f"Promoted event_sub_type from 'OTHERS' to '{current_generated_detail}' based on 'generated_event_sub_type_detail'.")
             else:
                 # If not a direct match, try fuzzy matching the generated detail
-                close_matches_from_detail = get_close_matches(current_generated_detail, ALL_EVENT_SUB_TYPES, n=1, cutoff=0.65)
-                if close_matches_from_detail:
-                    corrected_sub_type = close_matches_from_detail[0]
+                corrected_sub_type = SCHEMA_INDEX.sub_type_matcher.closest(current_generated_detail, 0.65)
+                if corrected_sub_type:
                     result["event_sub_type"] = corrected_sub_type
                     result["generated_event_sub_type_detail"] = "not specified"
                     logger.info(f"Promoted event_sub_type from 'OTHERS' to '{corrected_sub_type}' (fuzzy match) based on 'generated_event_sub_type_detail'.")
                 # Else: it was OTHERS and the detail is genuinely not a known sub-type, so keep it as is.
         
         # Scenario 2: LLM outputted a non-OTHERS event_sub_type, but it's not a valid one
-        elif current_sub_type not in ALL_EVENT_SUB_TYPES:
+        elif current_sub_type not in SCHEMA_INDEX.event_sub_types:
             # Re-run fuzzy match for the primary event_sub_type field if it's currently invalid
-            close_matches = get_close_matches(current_sub_type, ALL_EVENT_SUB_TYPES, n=1, cutoff=0.65)
-            if close_matches:
-                result["event_sub_type"] = close_matches[0]
-                logger.info(f"Corrected invalid event_sub_type '{current_sub_type}' to closest match '{close_matches[0]}'.")
+            closest_sub_type = SCHEMA_INDEX.sub_type_matcher.closest(current_sub_type, 0.65)
+            if closest_sub_type:
+                result["event_sub_type"] = closest_sub_type
+                logger.info(f"Corrected invalid event_sub_type '{current_sub_type}' to closest match '{closest_sub_type}'.")
                 if "generated_event_sub_type_detail" in result and result["generated_event_sub_type_detail"].lower() != "not specified":
                     logger.warning(f"Cleared 'generated_event_sub_type_detail' as event_sub_type is now specific.")
                     result["generated_event_sub_type_detail"] = "not specified"
@@ -518,7 +1040,8 @@ YOUR RESPONSE (STRICTLY in field: value format):
                 original_invalid_sub_type = result.get("event_sub_type", "not specified")
                 result["event_sub_type"] = "OTHERS"
                 # If generated_event_sub_type_detail is not already set and it's not a generic "not specified", use original_invalid_sub_type
-                if result.get("generated_event_sub_type_detail", "").lower() == "not specified" and original_invalid_sub_type.lower() != "not specified":
+                # (an omitted detail line counts as "not specified", as sparse output mode relies on)
+                if result.get("generated_event_sub_type_detail", "not specified").lower() == "not specified" and original_invalid_sub_type.lower() != "not specified":
                     result["generated_event_sub_type_detail"] = original_invalid_sub_type
                 logger.warning(f"LLM returned persistently invalid event_sub_type '{original_invalid_sub_type}'. Forcing to 'OTHERS' and storing original in 'generated_event_sub_type_detail'.")
         
@@ -527,7 +1050,7 @@ YOUR RESPONSE (STRICTLY in field: value format):
             result["generated_event_sub_type_detail"] = "not specified"
 
         # --- Final check for missing required fields and default filling ---
-        for field_name, field_info in ProcessedOutput.model_fields.items():
+        for field_name in MODEL_FIELD_NAMES:
             if field_name not in result:
                 if field_name == "file_name":
                     continue # Handled during ProcessedOutput instantiation
@@ -536,50 +1059,377 @@ YOUR RESPONSE (STRICTLY in field: value format):
                     result[field_name] = "OTHERS" 
                 else:
                     # For other required/optional fields not returned by LLM, default
-                    result[field_name] = default_not_specified_mapping.get(field_name, "not specified")
+                    result[field_name] = DEFAULT_NOT_SPECIFIED_MAPPING.get(field_name, "not specified")
 
         return result
 
 
-    def process_text(self, text: str, file_name: Optional[str] = None) -> ProcessedOutput:
-        """Process text and extract structured information"""
+    def _cache_key(self, text: str, prompt_version: Optional[str] = None) -> str:
+        """Content address of an extraction: normalized transcript + model + prompt version."""
+        key_material = f"{self.llm_provider}\n{self.model_name}\n{prompt_version or self.prompt_version}\n{normalize_text(text)}"
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters of the extraction cache (empty if caching is disabled)."""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def _lookup_cache(self, text: str, file_name: Optional[str], start_time: float, use_cache: bool):
+        """Returns (cache key or None, cached ProcessedOutput or None)."""
+        if not use_cache or self.cache is None:
+            return None, None
+
+        cache_key = self._cache_key(text)
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return cache_key, None
+
+        extracted_data = json.loads(cached)
+        extracted_data.update({
+            "file_name": file_name if file_name is not None else "unspecified_file",
+            "processing_time": time.time() - start_time,
+            "file_text": text,
+            "timestamp": datetime.datetime.now().isoformat()
+        })
+        logger.info(f"Extraction cache hit for file '{file_name or 'unknown'}'.")
+        return cache_key, ProcessedOutput(**extracted_data)
+
+    def _build_output(self, text: str, file_name: Optional[str], response_text: str, start_time: float,
+                      timer: Optional[StageTimer] = None) -> ProcessedOutput:
+        """Parse the LLM's field: value output and validate it into a ProcessedOutput."""
+        timer = timer or StageTimer()
+
+        # Parse field: value output
+        with timer.stage("parse"):
+            extracted_data = self._parse_llm_field_value_output(response_text)
+
+        with timer.stage("gazetteer"):
+            self._check_location(text, extracted_data, file_name)
+        
+        # --- Assign file_name before Pydantic validation ---
+        extracted_data["file_name"] = file_name if file_name is not None else "unspecified_file"
+
+        # --- Derive event_type AFTER event_sub_type has been processed/corrected ---
+        # This is crucial for correct categorization
+        sub_type = extracted_data.get("event_sub_type", "OTHERS")
+        extracted_data["event_type"] = derive_event_type(sub_type)
+        
+        # Add processing metadata
+        extracted_data.update({
+            "processing_time": time.time() - start_time,
+            "file_text": text,
+            "timestamp": datetime.datetime.now().isoformat()
+        })
+        
+        # Create ProcessedOutput object
+        with timer.stage("validate"):
+            return ProcessedOutput(**extracted_data)
+
+    def _keyword_fallback_output(self, text: str, file_name: Optional[str], start_time: float,
+                                 timer: StageTimer, error: str) -> ProcessedOutput:
+        """
+        Classification from keywords alone, for when the LLM is unavailable: the best matched
+        sub-type of the top event type (OTHERS without any match), every other field left to
+        its default. Never cached; the keyword evidence is reported in the processing metrics.
+        """
+        with timer.stage("keywords"):
+            prediction = self.keyword_classifier.classify(text)
+        logger.warning(
+            f"LLM unavailable for file '{file_name or 'unknown'}' ({error}); using keyword classification "
+            f"{prediction.sub_type or 'OTHERS'} (confidence {prediction.confidence:.2f})."
+        )
+        output = self._build_output(text, file_name, f"event_sub_type: {prediction.sub_type or 'OTHERS'}", start_time, timer)
+        output._processing_metrics = {"stages": timer.rounded(), "llm": {}, "keyword": prediction.to_dict()}
+        return output
+
+    def process_text(self, text: str, file_name: Optional[str] = None, use_cache: bool = True) -> ProcessedOutput:
+        """
+        Process text and extract structured information.
+        Set `use_cache=False` to bypass the extraction cache and always call the LLM.
+        """
         start_time = time.time()
+        timer = StageTimer()
+        outcome, llm_stats = "error", {}
         
         try:
+            with timer.stage("cache_lookup"):
+                cache_key, cached = self._lookup_cache(text, file_name, start_time, use_cache)
+            if cached is not None:
+                outcome = "cache_hit"
+                cached._processing_metrics = {"stages": timer.rounded(), "llm": {}}
+                return cached
+
             # Create prompt
-            prompt = self._create_extraction_prompt(text)
+            with timer.stage("prompt"):
+                prompt = self._create_extraction_prompt(text)
             
             # Call LLM
             # Ensure _call_llm returns {"response": "..."} as expected
-            response = self._call_llm(prompt)
+            try:
+                with timer.stage("llm"):
+                    response = self._call_llm(prompt, cached_prefix=self.prompt_prefix)
+            except requests.exceptions.RequestException as e:
+                if not self.keyword_fallback:
+                    raise
+                response = {"response": f"Error: {e}"}
             response_text = response.get('response', '')
-            
-            # Parse field: value output
-            extracted_data = self._parse_llm_field_value_output(response_text)
-            
-            # --- Assign file_name before Pydantic validation ---
-            extracted_data["file_name"] = file_name if file_name is not None else "unspecified_file"
+            llm_stats = _llm_stats(response, timer.stages["llm"])
 
-            # --- Derive event_type AFTER event_sub_type has been processed/corrected ---
-            # This is crucial for correct categorization
-            sub_type = extracted_data.get("event_sub_type", "OTHERS")
-            extracted_data["event_type"] = derive_event_type(sub_type)
-            
-            # Add processing metadata
-            extracted_data.update({
-                "processing_time": time.time() - start_time,
-                "file_text": text,
-                "timestamp": datetime.datetime.now().isoformat()
-            })
+            if self.keyword_fallback and response_text.startswith("Error:"):
+                outcome = "keyword_fallback"
+                return self._keyword_fallback_output(text, file_name, start_time, timer, response_text)
             
-            # Create ProcessedOutput object
-            output = ProcessedOutput(**extracted_data)
+            output = self._build_output(text, file_name, response_text, start_time, timer)
+
+            # Only cache real extractions, never the placeholder returned when the LLM call failed
+            if cache_key is not None and not response_text.startswith("Error:"):
+                with timer.stage("cache_store"):
+                    self.cache.set(cache_key, output.model_dump_json(exclude=PROCESSING_METADATA_FIELDS))
             
+            outcome = "ok"
+            output._processing_metrics = {"stages": timer.rounded(), "llm": llm_stats}
             return output
             
         except Exception as e:
             logger.error(f"Error processing text for file '{file_name or 'unknown'}': {e}")
             raise # Re-raise to let main.py handle individual file failures
+        finally:
+            record_extraction(self.llm_provider, outcome, timer, llm_stats)
+
+    def _parse_stream_line(self, line: str) -> Optional[Tuple[str, str]]:
+        """
+        Lightly normalize one streamed `field: value` line into (schema field, value).
+        The ProcessedOutput returned at the end of the stream remains authoritative.
+        """
+        if not line.strip() or ':' not in line:
+            return None
+
+        llm_field, value = line.split(':', 1)
+        field = self._fuzzy_match_field_name(llm_field.strip())
+        if not field:
+            return None
+
+        value = value.strip()
+        if value.lower() in ["null", "none", "", "not_defined", "n/a"]:
+            value = "not specified"
+        if field in self.literal_field_corrections:
+            value = self.literal_field_corrections[field].get(value.lower(), value)
+        return field, value
+
+    def process_text_stream(self, text: str, file_name: Optional[str] = None,
+                            fields: Optional[List[str]] = None,
+                            on_field: Optional[Callable[[str, str], None]] = None,
+                            use_cache: bool = True) -> ProcessedOutput:
+        """
+        Streaming variant of process_text. `on_field(field, value)` is called as soon as each
+        requested field (all fields if `fields` is None) has been emitted by the LLM. When
+        `fields` is given, generation is cancelled once all of them have been seen; fields
+        the LLM never got to are back-filled with their defaults.
+        """
+        start_time = time.time()
+        wanted = set(fields) if fields else None
+        timer = StageTimer()
+        outcome, llm_stats = "error", {}
+
+        try:
+            with timer.stage("cache_lookup"):
+                cache_key, cached = self._lookup_cache(text, file_name, start_time, use_cache)
+            if cached is not None:
+                if on_field:
+                    for field in (fields or ProcessedOutput.model_fields.keys()):
+                        on_field(field, getattr(cached, field, None))
+                outcome = "cache_hit"
+                cached._processing_metrics = {"stages": timer.rounded(), "llm": {}}
+                return cached
+
+            with timer.stage("prompt"):
+                prompt = self._create_extraction_prompt(text)
+
+            seen = {}
+            received = []
+            pending_line = ''
+            stopped_early = False
+            provider_stats = {}
+            first_token_seconds = None
+            llm_started = time.perf_counter()
+            stream = self._stream_llm(prompt, cached_prefix=self.prompt_prefix, stats=provider_stats)
+            try:
+                for chunk in stream:
+                    if first_token_seconds is None:
+                        first_token_seconds = time.perf_counter() - llm_started
+                    received.append(chunk)
+                    *complete_lines, pending_line = (pending_line + chunk).split('\n')
+                    for line in complete_lines:
+                        parsed = self._parse_stream_line(line)
+                        if not parsed or parsed[0] in seen:
+                            continue
+                        seen[parsed[0]] = parsed[1]
+                        if on_field and (wanted is None or parsed[0] in wanted):
+                            on_field(*parsed)
+
+                    if wanted and wanted.issubset(seen):
+                        stopped_early = True
+                        logger.info(f"All requested fields {sorted(wanted)} received; cancelling generation.")
+                        break
+            finally:
+                # Closes the HTTP response, which cancels generation on the provider side
+                stream.close()
+                timer.stages["llm"] = time.perf_counter() - llm_started
+
+            llm_stats = _llm_stats(provider_stats, timer.stages["llm"])
+            if first_token_seconds is not None:
+                llm_stats["first_token_seconds"] = round(first_token_seconds, 6)
+
+            response_text = ''.join(received)
+            if stopped_early:
+                # Drop the partially generated line after the last complete one
+                response_text = response_text[:len(response_text) - len(pending_line)]
+            else:
+                parsed = self._parse_stream_line(pending_line)
+                if parsed and parsed[0] not in seen and on_field and (wanted is None or parsed[0] in wanted):
+                    on_field(*parsed)
+
+            output = self._build_output(text, file_name, response_text, start_time, timer)
+
+            # A truncated extraction must not be served later as if it were complete
+            if cache_key is not None and not stopped_early:
+                with timer.stage("cache_store"):
+                    self.cache.set(cache_key, output.model_dump_json(exclude=PROCESSING_METADATA_FIELDS))
+
+            outcome = "ok"
+            output._processing_metrics = {"stages": timer.rounded(), "llm": llm_stats}
+            return output
+
+        except Exception as e:
+            logger.error(f"Error processing text for file '{file_name or 'unknown'}': {e}")
+            raise
+        finally:
+            record_extraction(self.llm_provider, outcome, timer, llm_stats)
+
+    def _create_location_prompt(self, text: str) -> str:
+        safe_text = text.replace('"""', '\"\"\"')
+        return LOCATION_PROMPT_PREFIX + f"""\"\"\"{safe_text}\"\"\"
+
+---
+YOUR RESPONSE (STRICTLY in field: value format):
+"""
+
+    def _parse_location_output(self, llm_output: str) -> Dict[str, str]:
+        """Pick incident_location and area out of the location prompt's answer; missing ones are "not specified"."""
+        result = {field: "not specified" for field in LOCATION_FIELDS}
+        seen = set()
+        for line in llm_output.split('\n'):
+            parsed = self._parse_stream_line(line.strip().strip('*`'))
+            if parsed and parsed[0] in result and parsed[0] not in seen:
+                seen.add(parsed[0])
+                # Markdown emphasis around the field name ("**area:** ...") leaves stray markers
+                result[parsed[0]] = parsed[1].strip('*` ') or "not specified"
+        return result
+
+    def _check_location(self, text: str, fields: Dict[str, Any], file_name: Optional[str] = None,
+                        match=None) -> Optional[Dict[str, Any]]:
+        """
+        Cross-check the LLM's incident_location / area in `fields` against the gazetteer reading
+        of the transcript (`match`, located here if not given). With GAZETTEER_NORMALIZE, known
+        place spellings are canonicalized and "not specified" values are filled from a confident
+        reading, in place. Returns the reading as a dict, or None when no known place is named.
+        """
+        if self.gazetteer is None:
+            return None
+        match = match or self.gazetteer.locate(text)
+        if match is None:
+            return None
+
+        report = match.to_dict()
+        answered = [fields.get(field) for field in LOCATION_FIELDS if fields.get(field, "not specified") != "not specified"]
+        report["llm_agrees"] = any(self.gazetteer.mentions_hierarchy(value, match) for value in answered)
+        if answered and not report["llm_agrees"]:
+            logger.warning(f"LLM location for '{file_name or 'unknown'}' names none of the gazetteer places "
+                           f"({match.incident_location}, confidence {match.confidence:.2f}).")
+
+        if self.gazetteer_normalize:
+            for field in LOCATION_FIELDS:
+                value = fields.get(field, "not specified")
+                if value != "not specified":
+                    fields[field] = self.gazetteer.canonicalize(value)
+                elif match.confidence >= self.gazetteer_min_confidence:
+                    fields[field] = getattr(match, field)
+        return report
+
+    def process_location(self, text: str, file_name: Optional[str] = None, use_cache: bool = True) -> LocationOutput:
+        """
+        Location-only extraction for placing the map pin: a short prompt and a small output
+        budget (LOCATION_MAX_TOKENS) return just incident_location and area, without
+        running the full classification. A confident gazetteer match answers without the LLM.
+        """
+        start_time = time.time()
+        timer = StageTimer()
+        outcome, llm_stats = "error", {}
+        match = None
+
+        def build(fields: Dict[str, str]) -> LocationOutput:
+            return LocationOutput(
+                file_name=file_name if file_name is not None else "unspecified_file",
+                file_text=text,
+                processing_time=time.time() - start_time,
+                timestamp=datetime.datetime.now().isoformat(),
+                **fields
+            )
+
+        try:
+            if self.gazetteer is not None:
+                with timer.stage("gazetteer"):
+                    match = self.gazetteer.locate(text)
+                if match is not None and match.confidence >= self.gazetteer_min_confidence:
+                    outcome = "gazetteer"
+                    output = build({"incident_location": match.incident_location, "area": match.area,
+                                    "location_source": "gazetteer"})
+                    output._processing_metrics = {"stages": timer.rounded(), "llm": {}, "gazetteer": match.to_dict()}
+                    return output
+
+            cache_key = None
+            if use_cache and self.cache is not None:
+                with timer.stage("cache_lookup"):
+                    cache_key = self._cache_key(text, self.location_prompt_version)
+                    cached = self.cache.get(cache_key)
+                if cached is not None:
+                    outcome = "cache_hit"
+                    output = build(json.loads(cached))
+                    output._processing_metrics = {"stages": timer.rounded(), "llm": {}}
+                    return output
+
+            with timer.stage("prompt"):
+                prompt = self._create_location_prompt(text)
+
+            # The short prompt gains nothing from Gemini context caching (and is below its minimum size)
+            with timer.stage("llm"):
+                response = self._call_llm(prompt, max_output_tokens=self.location_max_tokens)
+            response_text = response.get('response', '')
+            llm_stats = _llm_stats(response, timer.stages["llm"])
+            # A failed call must not look like "no location mentioned"
+            if response_text.startswith("Error:"):
+                raise RuntimeError(f"LLM call failed: {response_text[len('Error:'):].strip()}")
+
+            with timer.stage("parse"):
+                fields = self._parse_location_output(response_text)
+            report = self._check_location(text, fields, file_name, match)
+            with timer.stage("validate"):
+                output = build(fields)
+
+            if cache_key is not None:
+                with timer.stage("cache_store"):
+                    self.cache.set(cache_key, json.dumps(fields, ensure_ascii=False))
+
+            outcome = "ok"
+            output._processing_metrics = {"stages": timer.rounded(), "llm": llm_stats}
+            if report is not None:
+                output._processing_metrics["gazetteer"] = report
+            return output
+
+        except Exception as e:
+            logger.error(f"Error extracting location for file '{file_name or 'unknown'}': {e}")
+            raise
+        finally:
+            record_extraction(self.llm_provider, outcome, timer, llm_stats, task="location")
 
     def process_batch(self, texts: List[str], file_names: Optional[List[str]] = None) -> List[ProcessedOutput]:
         """Process a batch of texts"""
@@ -595,4 +1445,46 @@ YOUR RESPONSE (STRICTLY in field: value format):
                 logger.error(f"Failed to process text for file '{file_name}': {str(e)}")
                 continue # Continue to next file if an error occurs.
                 
-        return results
\ No newline at end of file
+        return results
+
+    async def aprocess_batch(self, texts: List[str], file_names: Optional[List[str]] = None,
+                             max_concurrency: Optional[int] = None) -> List[Union[ProcessedOutput, BatchItemError]]:
+        """
+        Process a batch of texts concurrently with at most `max_concurrency` LLM requests in flight.
+        Results are returned in input order; an item that fails is reported as a BatchItemError
+        at its position instead of being dropped. With KEYWORD_PRIORITY_SCHEDULING, requests
+        start in order of keyword priority (e.g. medical emergencies before public nuisance).
+        """
+        if file_names is None:
+            file_names = [f"unspecified_file_{i}.txt" for i in range(len(texts))]
+        if len(file_names) != len(texts):
+            raise ValueError("texts and file_names must have the same length")
+        if max_concurrency is None:
+            max_concurrency = self.batch_concurrency
+        max_concurrency = max(1, max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        # process_text is blocking; give every in-flight request its own thread
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-batch") as executor:
+
+            async def run_one(index: int, text: str, file_name: str) -> Union[ProcessedOutput, BatchItemError]:
+                async with semaphore:
+                    try:
+                        return await loop.run_in_executor(executor, self.process_text, text, file_name)
+                    except Exception as e:
+                        logger.error(f"Failed to process text for file '{file_name}': {str(e)}")
+                        return BatchItemError(index=index, file_name=file_name, error=str(e), error_type=type(e).__name__)
+
+            # Tasks acquire the semaphore in creation order, so creating them by priority schedules them that way
+            order = list(range(len(texts)))
+            if self.keyword_priority and len(texts) > 1:
+                priorities = self.keyword_classifier.priorities(texts)
+                order.sort(key=lambda i: -priorities[i])
+
+            results = await asyncio.gather(*(run_one(i, texts[i], file_names[i]) for i in order))
+            ordered = [None] * len(texts)
+            for i, result in zip(order, results):
+                ordered[i] = result
+            return ordered
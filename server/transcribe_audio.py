@@ -1,7 +1,8 @@
 import sys
+import io
 import json
 import os
-import tempfile
+import wave
 from pathlib import Path
 
 # Add the current directory to Python path to import modules
@@ -9,7 +10,7 @@ current_dir = Path(__file__).parent
 sys.path.append(str(current_dir))
 
 try:
-    from bhashini_api import transcribe_audio_file
+    from bhashini_api import transcribe_audio_bytes, SAMPLING_RATE
     # Try to import pydub for audio conversion
     try:
         from pydub import AudioSegment
@@ -17,113 +18,126 @@ try:
     except ImportError:
         PYDUB_AVAILABLE = False
         print("Warning: pydub not available. Install with: pip install pydub", file=sys.stderr)
-        
+
 except ImportError as e:
     print(json.dumps({"success": False, "error": f"Error importing required modules: {e}"}), file=sys.stderr)
     sys.exit(1)
 
-def convert_to_wav(input_path, output_path):
-    """Convert audio file to WAV format using pydub"""
+# Format expected by the Bhashini API (the rate is the one its payload declares)
+TARGET_FRAME_RATE = SAMPLING_RATE
+TARGET_CHANNELS = 1        # Mono
+TARGET_SAMPLE_WIDTH = 2    # 16-bit
+
+def read_wav_header(audio_bytes):
+    """Read audio info from a PCM WAV header without decoding the samples. Returns None if not WAV."""
+    try:
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+            return {
+                "duration": wav.getnframes() / float(wav.getframerate()),  # Duration in seconds
+                "channels": wav.getnchannels(),
+                "frame_rate": wav.getframerate(),
+                "sample_width": wav.getsampwidth()
+            }
+    except (wave.Error, EOFError):
+        return None
+
+def get_audio_info(audio):
+    """Get audio information from an already decoded AudioSegment"""
+    return {
+        "duration": len(audio) / 1000.0,  # Duration in seconds
+        "channels": audio.channels,
+        "frame_rate": audio.frame_rate,
+        "sample_width": audio.sample_width
+    }
+
+def convert_to_wav(audio):
+    """Resample a decoded AudioSegment in memory and return WAV bytes"""
     try:
-        if not PYDUB_AVAILABLE:
-            # If pydub is not available, try to use the file as-is
-            if input_path.lower().endswith('.wav'):
-                return input_path
-            else:
-                raise Exception("pydub is required for audio format conversion. Install with: pip install pydub")
-        
-        # Load audio file
-        audio = AudioSegment.from_file(input_path)
-        
         # Convert to WAV with specific parameters for Bhashini API
-        audio = audio.set_frame_rate(16000)  # 16kHz sample rate
-        audio = audio.set_channels(1)        # Mono
-        audio = audio.set_sample_width(2)    # 16-bit
-        
-        # Export as WAV
-        audio.export(output_path, format="wav")
-        return output_path
-        
+        audio = audio.set_frame_rate(TARGET_FRAME_RATE)
+        audio = audio.set_channels(TARGET_CHANNELS)
+        audio = audio.set_sample_width(TARGET_SAMPLE_WIDTH)
+
+        # Export as WAV into memory
+        buffer = io.BytesIO()
+        audio.export(buffer, format="wav")
+        return buffer.getvalue()
+
     except Exception as e:
         raise Exception(f"Audio conversion failed: {str(e)}")
 
-def get_audio_info(file_path):
-    """Get audio file information"""
-    try:
-        if PYDUB_AVAILABLE:
-            audio = AudioSegment.from_file(file_path)
-            return {
-                "duration": len(audio) / 1000.0,  # Duration in seconds
-                "channels": audio.channels,
-                "frame_rate": audio.frame_rate,
-                "sample_width": audio.sample_width
-            }
-    except:
-        pass
-    return {}
+def prepare_audio(audio_bytes, audio_format=None):
+    """
+    Decode the upload at most once and return (wav_bytes, audio_info).
+    WAV input is passed on as-is (bhashini_api resamples and trims it) and its info comes
+    from the header alone.
+    """
+    wav_info = read_wav_header(audio_bytes)
+    if wav_info is not None:
+        return audio_bytes, wav_info
+
+    if not PYDUB_AVAILABLE:
+        raise Exception("pydub is required for audio format conversion. Install with: pip install pydub")
+
+    # Single decode: the same AudioSegment provides the info and the resampled WAV
+    audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format=audio_format)
+    return convert_to_wav(audio), get_audio_info(audio)
+
+def parse_args(argv):
+    """Return (audio source, format hint). The source is a file path or '-' for stdin."""
+    args = list(argv)
+    audio_format = None
+    if "--format" in args:
+        index = args.index("--format")
+        if index + 1 >= len(args):
+            return None, None
+        audio_format = args[index + 1].lstrip(".").lower() or None
+        del args[index:index + 2]
+
+    if len(args) != 1:
+        return None, None
+    return args[0], audio_format
 
 def main():
-    if len(sys.argv) != 2:
-        print(json.dumps({"success": False, "error": "Audio file path required"}), file=sys.stderr)
+    source, audio_format = parse_args(sys.argv[1:])
+    if source is None:
+        print(json.dumps({"success": False, "error": "Audio file path (or '-' for stdin) required"}), file=sys.stderr)
         sys.exit(1)
-    
-    input_audio_path = sys.argv[1]
-    
-    if not os.path.exists(input_audio_path):
+
+    if source != "-" and not os.path.exists(source):
         print(json.dumps({"success": False, "error": "Audio file not found"}), file=sys.stderr)
         sys.exit(1)
-    
+
     try:
-        # Get original file info
-        audio_info = get_audio_info(input_audio_path)
-        
-        # Check if conversion is needed
-        file_extension = Path(input_audio_path).suffix.lower()
-        needs_conversion = file_extension != '.wav'
-        
-        if needs_conversion:
-            # Create temporary WAV file
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_wav:
-                temp_wav_path = temp_wav.name
-            
-            try:
-                # Convert to WAV
-                convert_to_wav(input_audio_path, temp_wav_path)
-                audio_file_path = temp_wav_path
-                
-            except Exception as conv_error:
-                # If conversion fails, try using original file
-                print(f"Warning: Conversion failed ({conv_error}), trying original file", file=sys.stderr)
-                audio_file_path = input_audio_path
-                
+        # Read the upload into memory once, from stdin or from disk
+        if source == "-":
+            audio_bytes = sys.stdin.buffer.read()
         else:
-            audio_file_path = input_audio_path
-        
-        # Transcribe the audio file
-        result = transcribe_audio_file(audio_file_path)
-        
+            with open(source, "rb") as f:
+                audio_bytes = f.read()
+            audio_format = audio_format or Path(source).suffix.lstrip(".").lower() or None
+
+        if not audio_bytes:
+            raise Exception("Empty audio input")
+
+        try:
+            wav_bytes, audio_info = prepare_audio(audio_bytes, audio_format)
+        except Exception as conv_error:
+            # If conversion fails, try sending the original audio
+            print(f"Warning: Conversion failed ({conv_error}), trying original audio", file=sys.stderr)
+            wav_bytes, audio_info = audio_bytes, {}
+
+        # Transcribe straight from memory; no temp file round trip
+        result = transcribe_audio_bytes(wav_bytes)
+
         # Add audio info to result
         if audio_info:
             result['audio_info'] = audio_info
-        
-        # Clean up temporary file if created
-        if needs_conversion and 'temp_wav_path' in locals() and os.path.exists(temp_wav_path):
-            try:
-                os.unlink(temp_wav_path)
-            except:
-                pass
-        
+
         # Output the result as JSON
         print(json.dumps(result, ensure_ascii=False))
-        
+
     except Exception as e:
-        # Clean up temporary file if created
-        if 'temp_wav_path' in locals() and os.path.exists(temp_wav_path):
-            try:
-                os.unlink(temp_wav_path)
-            except:
-                pass
-                
         # Output error as JSON
         error_data = {
             "success": False,
@@ -134,4 +148,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()